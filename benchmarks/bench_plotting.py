@@ -0,0 +1,176 @@
+"""
+Benchmarks for the analytics and graph functions in ``plotting.py`` on generated result frames.
+
+Needs pytest-benchmark and is skipped without it. The sizes come from the environment:
+``TG_BENCH_ROWS`` (default ``10000,1000000``), ``TG_BENCH_TERMS`` (default ``10,1000``) and
+``TG_BENCH_PLOT_TERMS`` for the graphs, which draw one line or figure per term (default
+``10,100``). For example, to include 10M rows::
+
+    TG_BENCH_ROWS=10000,1000000,10000000 python -m pytest benchmarks/bench_plotting.py \\
+        --benchmark-autosave --benchmark-compare --benchmark-compare-fail=median:15% \\
+        --memory-baseline benchmarks/memory-baseline.json
+
+Each benchmark also records its tracemalloc peak from one untimed call (see ``conftest.py``).
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.plotting import (
+    calculate_percentage_over_time,
+    calculate_rolling_percentage_over_time,
+    calculate_total_daily_messages,
+    plot_adjusted_keyword_frequency,
+    plot_keyword_frequency_aggregate,
+    plot_keyword_frequency_per_channel,
+    plot_percentage_over_time,
+    plot_rolling_percentage_over_time,
+)
+
+
+MESSAGE_TEXTS = tuple(f"Synthetic message {number} about the news of the day" for number in range(64))
+# Functions this slow are timed over a few rounds instead of pytest-benchmark's calibrated loop.
+PEDANTIC_ROWS = 1_000_000
+PEDANTIC_ROUNDS = 3
+
+
+def env_sizes(key, default):
+    return [int(value.replace("_", "")) for value in os.environ.get(key, default).split(",") if value.strip()]
+
+
+ROWS = env_sizes("TG_BENCH_ROWS", "10000,1000000")
+TERMS = env_sizes("TG_BENCH_TERMS", "10,1000")
+PLOT_TERMS = env_sizes("TG_BENCH_PLOT_TERMS", "10,100")
+
+
+def result_frame(rows, terms, *, channels=50, days=365, zipf_exponent=1.1, seed=0):
+    """
+    Return ``rows`` result rows over ``days`` days with Zipf-distributed terms, shaped like a run's results.
+
+    Message IDs count up with time in every channel, as the ID-based activity estimate expects.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.integers(0, days * 86400, rows))
+    weights = 1 / np.arange(1, terms + 1) ** zipf_exponent
+    term_indexes = rng.choice(terms, size=rows, p=weights / weights.sum())
+    labels = np.array([f"term{rank:04d}" for rank in range(1, terms + 1)], dtype=object)
+    channel_ids = rng.integers(1, channels + 1, rows)
+
+    return pd.DataFrame(
+        {
+            "time": pd.to_datetime(seconds + 1_735_689_600, unit="s", utc=True),
+            "message": np.array(MESSAGE_TEXTS, dtype=object)[rng.integers(0, len(MESSAGE_TEXTS), rows)],
+            "message_id": seconds // 30 + 1,
+            "channel_id": channel_ids,
+            "channel_title": pd.Categorical([f"Channel {channel_id}" for channel_id in range(1, channels + 1)])[
+                channel_ids - 1
+            ],
+            "search_group": pd.Categorical.from_codes(term_indexes, labels),
+            "search_term": pd.Categorical.from_codes(term_indexes, labels),
+            "term_mask": np.zeros(rows, dtype=np.int64),
+        }
+    )
+
+
+def grouped_results(frame):
+    """Split a result frame into the ``{group: [DataFrame]}`` shape of ``dataframes_dict``."""
+    groups = {label: [] for label in frame["search_group"].cat.categories}
+    for label, group in frame.groupby("search_group", observed=True):
+        groups[label] = [group.reset_index(drop=True)]
+    return groups
+
+
+@pytest.fixture(scope="module", params=[(rows, terms) for rows in ROWS for terms in TERMS], ids=lambda size: f"{size[0]}x{size[1]}")
+def analytics_results(request):
+    rows, terms = request.param
+    return rows, terms, grouped_results(result_frame(rows, terms))
+
+
+@pytest.fixture(scope="module", params=[(rows, terms) for rows in ROWS for terms in PLOT_TERMS], ids=lambda size: f"{size[0]}x{size[1]}")
+def plot_results(request):
+    rows, terms = request.param
+    return rows, terms, grouped_results(result_frame(rows, terms))
+
+
+def run_benchmark(benchmark, memory_baseline, request, rows, terms, function, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    peak_mb = peak / 2**20
+    benchmark.extra_info.update(rows=rows, terms=terms, peak_memory_mb=round(peak_mb, 3))
+    if rows >= PEDANTIC_ROWS:
+        benchmark.pedantic(function, args=args, kwargs=kwargs, rounds=PEDANTIC_ROUNDS, iterations=1)
+    else:
+        benchmark(function, *args, **kwargs)
+    memory_baseline.check(request.node.name, peak_mb)
+
+
+def test_calculate_total_daily_messages(benchmark, memory_baseline, request, analytics_results):
+    rows, terms, results = analytics_results
+    run_benchmark(benchmark, memory_baseline, request, rows, terms, calculate_total_daily_messages, results)
+
+
+def test_calculate_percentage_over_time(benchmark, memory_baseline, request, analytics_results):
+    rows, terms, results = analytics_results
+    run_benchmark(benchmark, memory_baseline, request, rows, terms, calculate_percentage_over_time, results)
+
+
+def test_calculate_rolling_percentage_over_time(benchmark, memory_baseline, request, analytics_results):
+    rows, terms, results = analytics_results
+    run_benchmark(benchmark, memory_baseline, request, rows, terms, calculate_rolling_percentage_over_time, results)
+
+
+def test_plot_percentage_over_time(benchmark, memory_baseline, request, plot_results, tmp_path):
+    rows, terms, results = plot_results
+    run_benchmark(benchmark, memory_baseline, request, rows, terms, plot_percentage_over_time, results, tmp_path)
+
+
+def test_plot_rolling_percentage_over_time(benchmark, memory_baseline, request, plot_results, tmp_path):
+    rows, terms, results = plot_results
+    run_benchmark(
+        benchmark, memory_baseline, request, rows, terms, plot_rolling_percentage_over_time, results, tmp_path
+    )
+
+
+def test_plot_adjusted_keyword_frequency(benchmark, memory_baseline, request, plot_results, tmp_path):
+    rows, terms, results = plot_results
+    run_benchmark(
+        benchmark, memory_baseline, request, rows, terms, plot_adjusted_keyword_frequency, results, tmp_path, "bench"
+    )
+
+
+def test_plot_keyword_frequency_aggregate(benchmark, memory_baseline, request, plot_results, tmp_path):
+    rows, terms, results = plot_results
+    run_benchmark(benchmark, memory_baseline, request, rows, terms, plot_keyword_frequency_aggregate, results, tmp_path)
+
+
+def test_plot_keyword_frequency_per_channel(benchmark, memory_baseline, request, plot_results, tmp_path):
+    rows, terms, results = plot_results
+    run_benchmark(
+        benchmark, memory_baseline, request, rows, terms, plot_keyword_frequency_per_channel, results, tmp_path
+    )
@@ -0,0 +1,248 @@
+"""
+End-to-end benchmark of ``run_search_workflow`` against ``FakeTelegramClient``.
+
+Run from the repository root, for example::
+
+    python -m benchmarks.bench_workflow --channels 20 --messages 500000 --terms 50 --modes server local auto
+
+Each run happens in a fresh interpreter inside a temporary folder with its own ``.env``, so the
+reported peak RSS belongs to that run alone. The corpus is generated before the clock starts;
+``corpus_rss_mb`` is the peak RSS at that point, so the workflow's own share is roughly the
+difference. Peak RSS is not available on Windows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from benchmarks.fake_telegram import FakeTelegramClient, RecordedCorpus, SyntheticCorpus
+
+
+DEFAULT_END_DATE = "2026-01-01"
+RESULT_COLUMNS = (
+    ("mode", "mode", "{}"),
+    ("wall_seconds", "wall s", "{:.2f}"),
+    ("api_calls", "API calls", "{}"),
+    ("flood_waits", "FloodWaits", "{}"),
+    ("messages_served", "messages", "{}"),
+    ("result_rows", "rows", "{}"),
+    ("peak_rss_mb", "peak RSS MB", "{:.0f}"),
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark run_search_workflow against a fake Telegram client.")
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--channels", type=int, default=10, help="synthetic channels (default: 10)")
+    corpus.add_argument("--messages", type=int, default=100_000, help="messages per synthetic channel")
+    corpus.add_argument("--vocabulary", type=int, default=200, help="distinct synthetic terms")
+    corpus.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of term frequencies")
+    corpus.add_argument("--match-share", type=float, default=0.1, help="share of posts mentioning a term")
+    corpus.add_argument("--days", type=int, default=365, help="days of history per channel")
+    corpus.add_argument("--end-date", default=DEFAULT_END_DATE, help="last day of history (YYYY-MM-DD)")
+    corpus.add_argument("--seed", type=int, default=0)
+    corpus.add_argument("--fixture", metavar="JSONL", help="replay a recorded fixture instead (needs --terms-file)")
+
+    run = parser.add_argument_group("run")
+    run.add_argument("--terms", type=int, default=20, help="search the N most frequent synthetic terms")
+    run.add_argument("--groups", type=int, default=1, help="spread the terms over N search groups")
+    run.add_argument("--terms-file", metavar="FILE", help="search terms file to use instead of synthetic terms")
+    run.add_argument("--last-days", type=int, help="only search the last N days of history")
+    run.add_argument("--modes", nargs="+", default=["server"], choices=["server", "local", "auto", "global"])
+    run.add_argument("--count-only", action="store_true", help="benchmark count-only runs")
+    run.add_argument("--download-media", action="store_true")
+    run.add_argument("--formats", default="", help="outputs besides CSV/JSONL, e.g. graphs,report")
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--requests-per-second", type=float, default=1000.0, help="rate limiter budget")
+    run.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra .env setting")
+    run.add_argument("--repeat", type=int, default=1)
+
+    client = parser.add_argument_group("fake client")
+    client.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    client.add_argument("--latency-jitter", type=float, default=0.0, help="extra random seconds per request")
+    client.add_argument("--flood-wait-rate", type=float, default=0.0, help="chance of a FloodWait per request")
+    client.add_argument("--flood-wait-seconds", type=int, default=1)
+
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep each run's temporary folder")
+    parser.add_argument("--child", metavar="CONFIG", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.fixture and not args.terms_file:
+        parser.error("--fixture needs --terms-file")
+    if args.count_only and args.download_media:
+        parser.error("--count-only cannot be combined with --download-media")
+    return args
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def synthetic_terms_lines(terms, groups):
+    if groups <= 1:
+        return terms
+    return [f"Group {number}: " + " | ".join(terms[number - 1::groups]) for number in range(1, groups + 1)]
+
+
+def build_corpus(config):
+    if config["fixture"]:
+        return RecordedCorpus.load(config["fixture"])
+    return SyntheticCorpus(
+        config["channels"],
+        config["messages"],
+        vocabulary_size=config["vocabulary"],
+        zipf_exponent=config["zipf"],
+        match_share=config["match_share"],
+        days=config["days"],
+        end_date=date.fromisoformat(config["end_date"]),
+        seed=config["seed"],
+    )
+
+
+def run_once(config):
+    """Run the workflow once in a temporary folder and return its measurements."""
+    from tg_keyword_trends.app import run_search_workflow
+    from tg_keyword_trends.jobs import parse_job
+
+    workdir = Path(tempfile.mkdtemp(prefix="tg-bench-"))
+    os.chdir(workdir)
+    try:
+        env_lines = {
+            "SEARCH_MODE": config["mode"],
+            "SEARCH_CONCURRENCY": config["concurrency"],
+            "SEARCH_REQUESTS_PER_SECOND": config["requests_per_second"],
+            "SEARCH_MAX_REQUESTS_PER_SECOND": config["requests_per_second"],
+        }
+        env_lines.update(entry.split("=", 1) for entry in config["env"])
+        Path(".env").write_text("".join(f"{key}={value}\n" for key, value in env_lines.items()), encoding="utf-8")
+
+        corpus_started = time.perf_counter()
+        corpus = build_corpus(config).build_all()
+        corpus_seconds = time.perf_counter() - corpus_started
+        corpus_rss_mb = peak_rss_mb()
+
+        terms_path = Path(config["terms_file"]) if config["terms_file"] else workdir / "terms.txt"
+        if not config["terms_file"]:
+            lines = synthetic_terms_lines(corpus.terms(config["terms"]), config["groups"])
+            terms_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        record = {
+            "name": "bench",
+            "search_terms_file": str(terms_path),
+            "output_dir": str(workdir),
+            "formats": [value for value in config["formats"].split(",") if value.strip()],
+            "download_media": config["download_media"],
+            "media_output_dir": str(workdir / "media"),
+            "count_only": config["count_only"],
+        }
+        if config["last_days"]:
+            record["last_days"] = config["last_days"]
+        job = parse_job(record, today=date.fromisoformat(config["end_date"]))
+
+        client = FakeTelegramClient(
+            corpus,
+            latency=config["latency"],
+            latency_jitter=config["latency_jitter"],
+            flood_wait_rate=config["flood_wait_rate"],
+            flood_wait_seconds=config["flood_wait_seconds"],
+            seed=config["seed"],
+        )
+        with open(workdir / "run.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            started = time.perf_counter()
+            asyncio.run(run_search_workflow(client, "bench", job=job))
+            wall_seconds = time.perf_counter() - started
+
+        results_path = workdir / "TG-Search_bench" / "all_results__bench.csv"
+        result_rows = None
+        if results_path.exists():
+            with results_path.open("r", encoding="utf-8", newline="") as results_file:
+                result_rows = sum(1 for _ in csv.reader(results_file)) - 1
+
+        return {
+            "mode": config["mode"] + (" (count-only)" if config["count_only"] else ""),
+            "wall_seconds": wall_seconds,
+            **client.summary(),
+            "result_rows": result_rows,
+            "corpus_seconds": corpus_seconds,
+            "corpus_rss_mb": corpus_rss_mb,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    finally:
+        os.chdir(REPO_ROOT)
+        if not config["keep"]:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"Kept {workdir}", file=sys.stderr)
+
+
+def run_in_subprocess(config):
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_workflow", "--child", json.dumps(config)],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark run failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_table(results):
+    rows = [[label for _, label, _ in RESULT_COLUMNS]]
+    for result in results:
+        rows.append(
+            ["-" if result.get(key) is None else template.format(result[key]) for key, _, template in RESULT_COLUMNS]
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(len(RESULT_COLUMNS))]
+    return "\n".join("  ".join(value.rjust(width) for value, width in zip(row, widths)) for row in rows)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        print(json.dumps(run_once(json.loads(args.child))))
+        return None
+
+    settings = {key: value for key, value in vars(args).items() if key not in {"child", "json", "modes", "repeat"}}
+    for key in ("fixture", "terms_file"):
+        if settings[key]:
+            settings[key] = str(Path(settings[key]).resolve())
+
+    results = []
+    print(format_table(results), flush=True)
+    for mode in args.modes:
+        for _ in range(args.repeat):
+            results.append(run_in_subprocess({**settings, "mode": mode}))
+            print(format_table(results).splitlines()[-1], flush=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"settings": settings, "runs": results}, indent=2), encoding="utf-8")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Peak-memory regression checks for the benchmark suite.
+
+pytest-benchmark compares timings between saved runs (``--benchmark-autosave`` and
+``--benchmark-compare-fail``), but not memory. Benchmarks report their tracemalloc peak to the
+``memory_baseline`` fixture, which compares it with ``--memory-baseline`` or, with
+``--memory-baseline-save``, records it there.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("memory baseline")
+    group.addoption("--memory-baseline", metavar="PATH", help="JSON file of peak traced memory (MiB) per benchmark")
+    group.addoption(
+        "--memory-baseline-save",
+        action="store_true",
+        help="record this run's peaks in --memory-baseline instead of comparing against it",
+    )
+    group.addoption(
+        "--memory-tolerance",
+        type=float,
+        default=0.2,
+        help="growth over the baseline peak that fails a benchmark (default: 0.2, i.e. 20%%)",
+    )
+
+
+class MemoryBaseline:
+    def __init__(self, path=None, *, tolerance=0.2, save=False):
+        self.path = Path(path) if path else None
+        self.tolerance = tolerance
+        self.save_peaks = save
+        self.baseline = {}
+        if self.path is not None and self.path.exists():
+            self.baseline = json.loads(self.path.read_text(encoding="utf-8"))
+        self.peaks = {}
+
+    def check(self, name, peak_mb):
+        self.peaks[name] = round(peak_mb, 3)
+        expected = self.baseline.get(name)
+        if self.save_peaks or expected is None:
+            return
+        if peak_mb > expected * (1 + self.tolerance):
+            pytest.fail(
+                f"{name}: peak traced memory {peak_mb:.1f} MiB is more than {self.tolerance:.0%} "
+                f"above the baseline {expected:.1f} MiB"
+            )
+
+    def save(self):
+        if not self.save_peaks or self.path is None or not self.peaks:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({**self.baseline, **self.peaks}, indent=2, sort_keys=True), encoding="utf-8")
+
+
+@pytest.fixture(scope="session")
+def memory_baseline(request):
+    config = request.config
+    baseline = MemoryBaseline(
+        config.getoption("memory_baseline", default=None),
+        tolerance=config.getoption("memory_tolerance", default=0.2),
+        save=config.getoption("memory_baseline_save", default=False),
+    )
+    yield baseline
+    baseline.save()
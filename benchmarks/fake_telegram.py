@@ -0,0 +1,649 @@
+"""
+Telethon stand-in for end-to-end benchmarks, serving a synthetic or recorded corpus.
+
+``FakeTelegramClient`` answers the calls the workflow makes (``get_dialogs``, ``get_entity``,
+``get_input_entity``, ``get_messages``, ``iter_messages`` and ``download_media``) from a corpus
+held in memory, with configurable per-request latency and injected FloodWait errors, and counts
+every request it serves. ``SyntheticCorpus`` generates bursty channel histories with
+Zipf-distributed terms; ``RecordedCorpus`` replays a JSON Lines fixture, e.g. one written by
+``record_fixture`` from a real account or by ``write_fixture`` from a synthetic corpus.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import random
+import sys
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.matching import normalize_match_text
+
+
+MESSAGES_PER_PAGE = 100
+DOWNLOAD_PART_BYTES = 512 * 1024
+FILLER_WORDS = (
+    "update", "report", "video", "morning", "city", "region", "photo", "statement", "official",
+    "evening", "source", "local", "road", "night", "map", "footage", "breaking", "channel",
+)
+
+
+@dataclass(frozen=True)
+class FakeChannel:
+    """The entity for one channel; ``channel_id`` is what the app keys channels by."""
+
+    channel_id: int
+    title: str
+    username: str | None = None
+
+    @property
+    def id(self):
+        return self.channel_id
+
+
+class MessageMediaDocument:
+    """Media placeholder; the class name is what the archive records as the media type."""
+
+    __slots__ = ("size",)
+
+    def __init__(self, size):
+        self.size = size
+
+
+class FakeMessage:
+    __slots__ = ("id", "date", "message", "media", "file", "fwd_from", "peer_id", "chat_id")
+
+
+class TotalList(list):
+    """List of messages with the search total, as Telethon's ``get_messages`` returns."""
+
+    total = 0
+
+
+def marked_channel_id(channel_id):
+    return int(f"-100{channel_id}")
+
+
+class ChannelHistory:
+    """
+    One channel's messages in ID order; ``ids`` and ``dates`` (UTC epoch seconds) both ascend.
+
+    ``text``, ``media_size`` and ``forward`` are called with a message's index, so messages are
+    only built when they are served. Searches are case- and space-insensitive substring matches,
+    like local scans; ``term_index`` holds the matches for terms known in advance, and other
+    searches scan the history once and are cached.
+    """
+
+    def __init__(self, channel, ids, dates, text, *, media_size=None, forward=None, term_index=None):
+        self.channel = channel
+        self.ids = ids
+        self.dates = dates
+        self._text = text
+        self._media_size = media_size or (lambda index: 0)
+        self._forward = forward or (lambda index: None)
+        self._matches = dict(term_index or {})
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matches(self, search):
+        key = normalize_match_text(search)
+        if key not in self._matches:
+            self._matches[key] = array(
+                "q", (index for index in range(len(self.ids)) if key in normalize_match_text(self._text(index)))
+            )
+        return self._matches[key]
+
+    def bounds(self, *, offset_date=None, offset_id=0, min_id=0, max_id=0, reverse=False):
+        """Return the index range ``[low, high)`` that Telethon's paging arguments select."""
+        low, high = 0, len(self.ids)
+        if min_id:
+            low = max(low, bisect.bisect_right(self.ids, min_id))
+        if max_id:
+            high = min(high, bisect.bisect_left(self.ids, max_id))
+        if reverse:
+            if offset_date is not None:
+                low = max(low, bisect.bisect_left(self.dates, _epoch(offset_date)))
+            if offset_id:
+                low = max(low, bisect.bisect_right(self.ids, offset_id))
+        else:
+            if offset_date is not None:
+                high = min(high, bisect.bisect_left(self.dates, _epoch(offset_date)))
+            if offset_id:
+                high = min(high, bisect.bisect_left(self.ids, offset_id))
+        return low, max(low, high)
+
+    def select(self, search=None, **bounds):
+        """Return the ascending indexes of the messages a request selects."""
+        low, high = self.bounds(**bounds)
+        if not search:
+            return range(low, high)
+        matches = self.matches(search)
+        return matches[bisect.bisect_left(matches, low):bisect.bisect_left(matches, high)]
+
+    def message(self, index):
+        message = FakeMessage()
+        message.id = self.ids[index]
+        message.date = datetime.fromtimestamp(self.dates[index], timezone.utc)
+        message.message = self._text(index)
+        size = self._media_size(index)
+        message.media = MessageMediaDocument(size) if size else None
+        message.file = SimpleNamespace(name=None, mime_type="image/jpeg", size=size, ext=".jpg") if size else None
+        origin = self._forward(index)
+        message.fwd_from = None
+        if origin is not None:
+            message.fwd_from = SimpleNamespace(from_id=SimpleNamespace(channel_id=origin[0]), channel_post=origin[1])
+        message.peer_id = SimpleNamespace(channel_id=self.channel.channel_id)
+        message.chat_id = marked_channel_id(self.channel.channel_id)
+        return message
+
+
+class Corpus:
+    """Channels and their histories; subclasses build a channel's history on first use."""
+
+    def __init__(self, channels):
+        self.channels = list(channels)
+        self._channels = {channel.channel_id: channel for channel in self.channels}
+        self._histories = {}
+
+    def channel(self, channel_id):
+        return self._channels.get(int(channel_id))
+
+    def history(self, channel_id):
+        channel_id = int(channel_id)
+        if channel_id not in self._histories:
+            self._histories[channel_id] = self._build_history(self._channels[channel_id])
+        return self._histories[channel_id]
+
+    def build_all(self):
+        """Build every channel's history up front, e.g. so a benchmark does not time generation."""
+        for channel in self.channels:
+            self.history(channel.channel_id)
+        return self
+
+    def _build_history(self, channel):
+        raise NotImplementedError
+
+
+class SyntheticCorpus(Corpus):
+    """
+    Generated channel histories with bursty daily volume and Zipf-distributed search terms.
+
+    Each channel posts ``messages_per_channel`` messages over the ``days`` days up to
+    ``end_date``. Days burst to a Pareto-distributed multiple of the usual volume with
+    probability ``burst_probability``, and on a burst day half of the matching posts mention that
+    day's burst term. ``match_share`` of the posts mention a vocabulary term, picked with
+    probability proportional to ``1 / rank ** zipf_exponent``. The vocabulary is
+    ``term0001``, ``term0002``... in rank order; no term contains another. Everything is derived
+    from ``seed`` and ``end_date`` (today by default), so a corpus is the same on every run.
+    """
+
+    def __init__(
+        self,
+        channels=10,
+        messages_per_channel=100_000,
+        *,
+        vocabulary_size=200,
+        zipf_exponent=1.1,
+        match_share=0.1,
+        days=365,
+        end_date=None,
+        burst_probability=0.05,
+        burst_scale=8.0,
+        media_share=0.2,
+        media_bytes=4096,
+        forward_share=0.05,
+        seed=0,
+    ):
+        super().__init__(
+            FakeChannel(channel_id=1000 + number, title=f"Synthetic channel {number}", username=f"synthetic{number}")
+            for number in range(1, channels + 1)
+        )
+        self.messages_per_channel = messages_per_channel
+        self.vocabulary = tuple(f"term{rank:04d}" for rank in range(1, vocabulary_size + 1))
+        self.zipf_exponent = zipf_exponent
+        self.match_share = match_share
+        self.days = days
+        self.end_date = end_date or datetime.now(timezone.utc).date()
+        self.burst_probability = burst_probability
+        self.burst_scale = burst_scale
+        self.media_share = media_share
+        self.media_bytes = media_bytes
+        self.forward_share = forward_share
+        self.seed = seed
+
+    @property
+    def first_day(self):
+        return self.end_date - timedelta(days=self.days - 1)
+
+    def terms(self, count):
+        """Return the ``count`` most frequent vocabulary terms."""
+        return list(self.vocabulary[:count])
+
+    def _build_history(self, channel):
+        rng = random.Random(f"{self.seed}:{channel.channel_id}")
+        day_weights = []
+        burst_terms = []
+        term_weights = list(itertools.accumulate(1 / rank**self.zipf_exponent for rank in range(1, len(self.vocabulary) + 1)))
+        for _ in range(self.days):
+            if rng.random() < self.burst_probability:
+                day_weights.append(self.burst_scale * rng.paretovariate(1.5))
+                burst_terms.append(rng.choices(range(len(self.vocabulary)), cum_weights=term_weights)[0])
+            else:
+                day_weights.append(1.0)
+                burst_terms.append(None)
+
+        first_midnight = _epoch(datetime.combine(self.first_day, time.min, tzinfo=timezone.utc))
+        message_days = rng.choices(range(self.days), weights=day_weights, k=self.messages_per_channel)
+        dates = array("q", sorted(first_midnight + day * 86400 + rng.randrange(86400) for day in message_days))
+
+        terms = array("H", bytes(2 * len(dates)))
+        term_index = {}
+        for index, posted in enumerate(dates):
+            if rng.random() >= self.match_share:
+                continue
+            burst_term = burst_terms[(posted - first_midnight) // 86400]
+            if burst_term is not None and rng.random() < 0.5:
+                term = burst_term
+            else:
+                term = rng.choices(range(len(self.vocabulary)), cum_weights=term_weights)[0]
+            terms[index] = term + 1
+            term_index.setdefault(self.vocabulary[term], array("q")).append(index)
+
+        vocabulary = self.vocabulary
+        others = [other.channel_id for other in self.channels if other.channel_id != channel.channel_id]
+        media_cutoff = int(self.media_share * 1000)
+        forward_cutoff = int(self.forward_share * 1000)
+
+        def text(index):
+            mixed = _mix(channel.channel_id, index)
+            words = [FILLER_WORDS[mixed % len(FILLER_WORDS)], FILLER_WORDS[(mixed >> 8) % len(FILLER_WORDS)]]
+            if terms[index]:
+                words.insert(1, vocabulary[terms[index] - 1])
+            return f"Post {index + 1}: " + " ".join(words)
+
+        def media_size(index):
+            return self.media_bytes if (_mix(channel.channel_id, index) >> 16) % 1000 < media_cutoff else 0
+
+        def forward(index):
+            mixed = _mix(index, channel.channel_id)
+            if not others or mixed % 1000 >= forward_cutoff:
+                return None
+            return others[(mixed >> 10) % len(others)], 1 + (mixed >> 4) % self.messages_per_channel
+
+        return ChannelHistory(
+            channel,
+            range(1, len(dates) + 1),
+            dates,
+            text,
+            media_size=media_size,
+            forward=forward,
+            term_index={key: matches for key, matches in term_index.items()}
+            | {term: array("q") for term in vocabulary if term not in term_index},
+        )
+
+
+class RecordedCorpus(Corpus):
+    """Channel histories replayed from a JSON Lines fixture with one message per line."""
+
+    def __init__(self, channels, records):
+        super().__init__(channels)
+        self._records = records
+
+    @classmethod
+    def load(cls, path):
+        channels = {}
+        records = {}
+        with Path(path).open("r", encoding="utf-8") as fixture:
+            for line in fixture:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                channel_id = int(record["channel_id"])
+                if channel_id not in channels:
+                    channels[channel_id] = FakeChannel(
+                        channel_id=channel_id,
+                        title=record.get("channel_title") or str(channel_id),
+                        username=record.get("username"),
+                    )
+                records.setdefault(channel_id, []).append(record)
+        return cls(channels.values(), records)
+
+    def _build_history(self, channel):
+        records = sorted(self._records.get(channel.channel_id, []), key=lambda record: int(record["id"]))
+
+        def forward(index):
+            record = records[index]
+            if record.get("fwd_from_channel_id") is None:
+                return None
+            return int(record["fwd_from_channel_id"]), int(record["fwd_from_message_id"])
+
+        return ChannelHistory(
+            channel,
+            array("q", (int(record["id"]) for record in records)),
+            array("q", (_epoch(datetime.fromisoformat(record["date"])) for record in records)),
+            lambda index: records[index].get("message") or "",
+            media_size=lambda index: int(records[index].get("media_size") or 0),
+            forward=forward,
+        )
+
+
+def fixture_record(channel, message):
+    """Return the fixture line for a Telethon (or fake) message posted in ``channel``."""
+    forward = getattr(message, "fwd_from", None)
+    fwd_channel_id = getattr(getattr(forward, "from_id", None), "channel_id", None)
+    fwd_message_id = getattr(forward, "channel_post", None)
+    return {
+        "channel_id": channel.channel_id,
+        "channel_title": channel.title,
+        "username": channel.username,
+        "id": message.id,
+        "date": message.date.astimezone(timezone.utc).isoformat(),
+        "message": message.message,
+        "media_size": (getattr(getattr(message, "file", None), "size", None) or 0) if message.media else 0,
+        "fwd_from_channel_id": fwd_channel_id if fwd_message_id is not None else None,
+        "fwd_from_message_id": fwd_message_id if fwd_channel_id is not None else None,
+    }
+
+
+def write_fixture(corpus, path, channel_ids=None):
+    """Write a corpus (or some of its channels) as a fixture ``RecordedCorpus.load`` can replay."""
+    written = 0
+    with Path(path).open("w", encoding="utf-8") as fixture:
+        for channel in corpus.channels:
+            if channel_ids is not None and channel.channel_id not in channel_ids:
+                continue
+            history = corpus.history(channel.channel_id)
+            for index in range(len(history)):
+                fixture.write(json.dumps(fixture_record(channel, history.message(index)), ensure_ascii=False) + "\n")
+                written += 1
+    return written
+
+
+async def record_fixture(client, references, path, *, limit=None):
+    """
+    Record channels' recent history from a connected Telethon client into a fixture.
+
+    ``limit`` caps the messages recorded per channel. Returns the number of messages written.
+    """
+    written = 0
+    with Path(path).open("w", encoding="utf-8") as fixture:
+        for reference in references:
+            entity = await client.get_entity(reference)
+            channel = FakeChannel(
+                channel_id=entity.id,
+                title=getattr(entity, "title", None) or str(entity.id),
+                username=getattr(entity, "username", None),
+            )
+            async for message in client.iter_messages(entity, limit=limit):
+                fixture.write(json.dumps(fixture_record(channel, message), ensure_ascii=False) + "\n")
+                written += 1
+    return written
+
+
+class FakeTelegramClient:
+    """
+    Serve a corpus through the Telethon client methods the workflow calls.
+
+    ``joined`` lists the channel IDs the account has joined (all of the corpus by default); only
+    those appear in dialogs and in global searches. Each request waits ``latency`` seconds plus up
+    to ``latency_jitter``, and fails with a FloodWait of ``flood_wait_seconds`` with probability
+    ``flood_wait_rate``. ``iter_messages`` makes one request per page of 100 messages,
+    ``get_messages`` by ``ids`` one request, and ``download_media`` one per 512 KiB part.
+    ``api_calls`` counts requests by method.
+    """
+
+    def __init__(
+        self,
+        corpus,
+        *,
+        joined=None,
+        latency=0.0,
+        latency_jitter=0.0,
+        flood_wait_rate=0.0,
+        flood_wait_seconds=1,
+        seed=0,
+    ):
+        self.corpus = corpus
+        self.joined = [int(channel_id) for channel_id in joined] if joined is not None else [
+            channel.channel_id for channel in corpus.channels
+        ]
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.flood_wait_rate = flood_wait_rate
+        self.flood_wait_seconds = flood_wait_seconds
+        self.api_calls = Counter()
+        self.flood_waits = 0
+        self.messages_served = 0
+        self.bytes_downloaded = 0
+        self._rng = random.Random(seed)
+
+    async def _request(self, method):
+        self.api_calls[method] += 1
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(self.latency + self._rng.uniform(0, self.latency_jitter))
+        if self.flood_wait_rate and self._rng.random() < self.flood_wait_rate:
+            from telethon.errors import FloodWaitError
+
+            self.flood_waits += 1
+            raise FloodWaitError(request=None, capture=self.flood_wait_seconds)
+
+    def summary(self):
+        return {
+            "api_calls": sum(self.api_calls.values()),
+            "api_calls_by_method": dict(sorted(self.api_calls.items())),
+            "flood_waits": self.flood_waits,
+            "messages_served": self.messages_served,
+            "bytes_downloaded": self.bytes_downloaded,
+        }
+
+    async def connect(self):
+        return None
+
+    async def disconnect(self):
+        return None
+
+    async def is_user_authorized(self):
+        return True
+
+    async def get_dialogs(self, limit=None, **kwargs):
+        await self._request("get_dialogs")
+        dialogs = []
+        for channel_id in self.joined[:limit]:
+            channel = self.corpus.channel(channel_id)
+            dialogs.append(
+                SimpleNamespace(
+                    id=marked_channel_id(channel_id),
+                    title=channel.title,
+                    name=channel.title,
+                    entity=channel,
+                    is_channel=True,
+                    is_group=False,
+                    is_user=False,
+                )
+            )
+        return dialogs
+
+    async def get_input_entity(self, peer):
+        # Telethon answers this from its entity cache for dialogs and known IDs.
+        return self._resolve(peer)
+
+    async def get_entity(self, entity):
+        await self._request("get_entity")
+        return self._resolve(entity)
+
+    def _resolve(self, reference):
+        if isinstance(reference, FakeChannel):
+            return reference
+        if getattr(reference, "entity", None) is not None:
+            return self._resolve(reference.entity)
+
+        channel = None
+        channel_id = getattr(reference, "channel_id", None)
+        if channel_id is None and isinstance(reference, int):
+            channel_id = reference
+        if channel_id is None and isinstance(reference, str):
+            name = reference.strip().rstrip("/").rsplit("/", 1)[-1].lstrip("@")
+            if name.lstrip("-").isdigit():
+                channel_id = int(name)
+            else:
+                channel = next(
+                    (item for item in self.corpus.channels if (item.username or "").lower() == name.lower()), None
+                )
+        if channel_id is not None:
+            text = str(channel_id)
+            channel = self.corpus.channel(int(text[4:]) if text.startswith("-100") else int(text))
+        if channel is None:
+            raise ValueError(f'Cannot find any entity corresponding to "{reference}"')
+        return channel
+
+    def iter_messages(
+        self,
+        entity,
+        limit=None,
+        *,
+        offset_date=None,
+        offset_id=0,
+        max_id=0,
+        min_id=0,
+        search=None,
+        reverse=False,
+        wait_time=None,
+        **kwargs,
+    ):
+        bounds = {
+            "offset_date": offset_date,
+            "offset_id": offset_id or 0,
+            "min_id": min_id or 0,
+            "max_id": max_id or 0,
+            "reverse": reverse,
+        }
+        return FakeMessageIterator(self, None if entity is None else self._resolve(entity), limit, search, bounds)
+
+    async def get_messages(self, entity, limit=1, *, ids=None, **kwargs):
+        if ids is not None:
+            # Like Telethon, messages by ID come back in the order asked for, with None for missing IDs.
+            await self._request("get_messages")
+            history = self.corpus.history(self._resolve(entity).channel_id)
+            messages = []
+            for message_id in ids:
+                index = bisect.bisect_left(history.ids, message_id)
+                found = index < len(history.ids) and history.ids[index] == message_id
+                messages.append(history.message(index) if found else None)
+            self.messages_served += sum(message is not None for message in messages)
+            return messages
+        iterator = self.iter_messages(entity, limit, **kwargs)
+        messages = TotalList([message async for message in iterator])
+        messages.total = iterator.total
+        return messages
+
+    async def download_media(self, message, file=None, *, progress_callback=None, **kwargs):
+        size = getattr(getattr(message, "file", None), "size", None) or 0
+        if not getattr(message, "media", None):
+            return None
+        for part in range(max(1, -(-size // DOWNLOAD_PART_BYTES))):
+            await self._request("download_media")
+            if progress_callback is not None:
+                progress_callback(min((part + 1) * DOWNLOAD_PART_BYTES, size), size)
+
+        path = Path(file) if file is not None else Path(f"{message.chat_id}_{message.id}")
+        if path.is_dir():
+            path = path / f"{message.chat_id}_{message.id}"
+        if not path.suffix:
+            path = path.with_suffix(message.file.ext)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes(size))
+        self.bytes_downloaded += size
+        return str(path)
+
+
+class FakeMessageIterator:
+    """Async iterator over a request's messages, newest first, with Telethon's ``total``."""
+
+    def __init__(self, client, channel, limit, search, bounds):
+        self.client = client
+        self.channel = channel
+        self.limit = limit
+        self.search = search
+        self.bounds = bounds
+        self.total = None
+        self._messages = None
+        self._yielded = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._messages is None:
+            await self.client._request("iter_messages")
+            self._messages = self._select()
+        if self.limit is not None and self._yielded >= self.limit:
+            raise StopAsyncIteration
+        if self._yielded and self._yielded % MESSAGES_PER_PAGE == 0:
+            if self._yielded >= self.total:
+                raise StopAsyncIteration
+            await self.client._request("iter_messages")
+        message = next(self._messages, None)
+        if message is None:
+            raise StopAsyncIteration
+        self._yielded += 1
+        self.client.messages_served += 1
+        return message
+
+    async def aclose(self):
+        self._messages = iter(())
+
+    def _select(self):
+        if self.channel is not None:
+            history = self.client.corpus.history(self.channel.channel_id)
+            indexes = history.select(self.search, **self.bounds)
+            self.total = len(indexes)
+            ordered = indexes if self.bounds["reverse"] else reversed(indexes)
+            return (history.message(index) for index in ordered)
+
+        # A global search covers every joined channel, merged newest first by date.
+        offset_date = self.bounds["offset_date"]
+        selections = []
+        for channel_id in self.client.joined:
+            history = self.client.corpus.history(channel_id)
+            selections.append((history, history.select(self.search, offset_date=offset_date)))
+        self.total = sum(len(indexes) for _, indexes in selections)
+        merged = heapq.merge(*(_newest_first(history, indexes) for history, indexes in selections), key=lambda item: item[:3])
+        return (history.message(-negative_index) for _, _, negative_index, history in merged)
+
+
+def _newest_first(history, indexes):
+    for index in reversed(indexes):
+        yield -history.dates[index], history.channel.channel_id, -index, history
+
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    if isinstance(value, date):
+        return int(datetime.combine(value, time.min, tzinfo=timezone.utc).timestamp())
+    return int(value)
+
+
+def _mix(first, second):
+    """Cheap deterministic hash of two integers, for per-message attributes that need no storage."""
+    value = (first * 0x9E3779B1 + second * 0x85EBCA77) & 0xFFFFFFFF
+    value ^= value >> 15
+    value = (value * 0x2C1B3C6D) & 0xFFFFFFFF
+    return value ^ (value >> 12)
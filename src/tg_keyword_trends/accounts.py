@@ -0,0 +1,173 @@
+"""Extra Telegram accounts and how channels are split between them."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from .channels import target_from_dialog
+from .constants import (
+    ENV_FILE_PATH,
+    TELEGRAM_2FA_PASSWORD_KEY,
+    TELEGRAM_API_HASH_KEY,
+    TELEGRAM_API_ID_KEY,
+    TELEGRAM_PHONE_KEY,
+    TELEGRAM_SESSION_KEY,
+)
+from .env import read_env_file
+
+
+PRIMARY_ACCOUNT_NAME = "1"
+
+
+@dataclass(frozen=True)
+class TelegramAccount:
+    """
+    Credentials for one Telegram session.
+
+    The primary account uses the plain ``TELEGRAM_*`` keys. Extra accounts use the same keys with
+    a numeric suffix (``TELEGRAM_SESSION_2``, ``TELEGRAM_PHONE_2`` ...), and fall back to the
+    primary API ID and hash when their own are not set.
+    """
+
+    name: str
+    session_name: str
+    api_id: int
+    api_hash: str
+    phone_key: str = TELEGRAM_PHONE_KEY
+    password_key: str = TELEGRAM_2FA_PASSWORD_KEY
+
+
+@dataclass
+class AccountShard:
+    """One connected account with its own rate budget and the channels routed to it."""
+
+    name: str
+    client: Any
+    rate_limiter: Any
+    dialog_targets: dict = field(default_factory=dict)
+    channel_ids: set = field(default_factory=set)
+
+
+def numbered_key(key, number):
+    return f"{key}_{number}"
+
+
+def load_extra_accounts(env_values=None, env_file_path=ENV_FILE_PATH, *, default_api_id=None, default_api_hash=None):
+    """Return the accounts configured as ``TELEGRAM_SESSION_2``, ``TELEGRAM_SESSION_3`` and so on."""
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    accounts = []
+    number = 2
+    while str(env_values.get(numbered_key(TELEGRAM_SESSION_KEY, number)) or "").strip():
+        api_id = str(env_values.get(numbered_key(TELEGRAM_API_ID_KEY, number)) or default_api_id or "").strip()
+        api_hash = str(env_values.get(numbered_key(TELEGRAM_API_HASH_KEY, number)) or default_api_hash or "").strip()
+        if not api_id or not api_hash:
+            raise ValueError(f"Telegram account {number} needs {TELEGRAM_API_ID_KEY} and {TELEGRAM_API_HASH_KEY}.")
+        try:
+            api_id = int(api_id)
+        except ValueError as exc:
+            raise ValueError(f"{numbered_key(TELEGRAM_API_ID_KEY, number)} must be a number.") from exc
+
+        accounts.append(
+            TelegramAccount(
+                name=str(number),
+                session_name=env_values[numbered_key(TELEGRAM_SESSION_KEY, number)].strip(),
+                api_id=api_id,
+                api_hash=api_hash,
+                phone_key=numbered_key(TELEGRAM_PHONE_KEY, number),
+                password_key=numbered_key(TELEGRAM_2FA_PASSWORD_KEY, number),
+            )
+        )
+        number += 1
+
+    return accounts
+
+
+async def load_dialog_targets(shard, dialogs=None):
+    """Record the channels ``shard``'s account has joined, keyed by channel ID."""
+    if dialogs is None:
+        dialogs = await shard.rate_limiter.call(shard.client.get_dialogs)
+
+    for dialog in dialogs:
+        if dialog.is_channel:
+            target = await target_from_dialog(shard.client, dialog)
+            shard.dialog_targets[str(target.channel_id)] = target
+    return shard.dialog_targets
+
+
+def add_extra_account_channels(shards, channels, channel_ids=None):
+    """
+    Append channels that only extra accounts have joined.
+
+    With ``channel_ids`` only those channels are added, e.g. saved channels the primary account
+    could not resolve.
+    """
+    known = {str(channel.channel_id) for channel in channels}
+    merged = list(channels)
+    for shard in shards[1:]:
+        for channel_id, target in shard.dialog_targets.items():
+            if channel_id in known or (channel_ids is not None and channel_id not in channel_ids):
+                continue
+            merged.append(target)
+            known.add(channel_id)
+    return merged
+
+
+def assign_channels_to_accounts(channel_ids, memberships, default_account=0):
+    """
+    Return the index of the account that should search each channel.
+
+    ``memberships`` holds, per account, the set of channel IDs that account has joined. A channel
+    joined by one account goes to that account. A channel joined by several goes to the least
+    loaded of them, and a channel nobody has joined stays with ``default_account``, which
+    resolved it.
+    """
+    memberships = [{str(channel_id) for channel_id in joined} for joined in memberships]
+    loads = [0] * len(memberships)
+    assignments = [None] * len(channel_ids)
+    shared = []
+
+    for position, channel_id in enumerate(channel_ids):
+        members = [index for index, joined in enumerate(memberships) if str(channel_id) in joined]
+        if len(members) > 1:
+            shared.append((position, members))
+            continue
+        assignments[position] = members[0] if members else default_account
+        loads[assignments[position]] += 1
+
+    for position, members in shared:
+        account_index = min(members, key=lambda index: (loads[index], index))
+        assignments[position] = account_index
+        loads[account_index] += 1
+
+    return assignments
+
+
+def shard_channels(shards, channels):
+    """
+    Route ``channels`` to ``shards`` and return the targets to search with.
+
+    Each channel's target is taken from its shard's own dialogs, so every request uses an entity
+    resolved by the account that sends it.
+    """
+    assignments = assign_channels_to_accounts(
+        [channel.channel_id for channel in channels],
+        [set(shard.dialog_targets) for shard in shards],
+    )
+
+    targets = []
+    for channel, shard_index in zip(channels, assignments):
+        shard = shards[shard_index]
+        target = shard.dialog_targets.get(str(channel.channel_id), channel)
+        shard.channel_ids.add(str(target.channel_id))
+        targets.append(target)
+    return targets
+
+
+def shard_for_channel(shards, channel_id):
+    for shard in shards:
+        if str(channel_id) in shard.channel_ids:
+            return shard
+    return shards[0]
@@ -0,0 +1,272 @@
+"""Daily channel activity sampled from message-ID boundaries, used as graph denominators."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+from .constants import ENV_FILE_PATH
+from .env import env_flag, env_int, read_env_file
+from .search import message_id_before
+
+
+ACTIVITY_SAMPLING_KEY = "ACTIVITY_SAMPLING"
+ACTIVITY_SAMPLE_DAYS_KEY = "ACTIVITY_SAMPLE_DAYS"
+ACTIVITY_MAX_PROBES_KEY = "ACTIVITY_MAX_PROBES"
+ACTIVITY_INDEX_KEY = "ACTIVITY_INDEX"
+ACTIVITY_INDEX_PATH_KEY = "ACTIVITY_INDEX_PATH"
+DEFAULT_ACTIVITY_SAMPLE_DAYS = 1
+DEFAULT_ACTIVITY_MAX_PROBES = 5000
+DEFAULT_ACTIVITY_INDEX_PATH = "TG-Archive/activity.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_days (
+    channel_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    count REAL NOT NULL,
+    PRIMARY KEY (channel_id, day)
+);
+"""
+
+
+@dataclass(frozen=True)
+class ActivitySettings:
+    enabled: bool = False
+    sample_days: int = DEFAULT_ACTIVITY_SAMPLE_DAYS
+    max_probes: int = DEFAULT_ACTIVITY_MAX_PROBES
+    index_path: Path | None = None
+
+
+@dataclass(frozen=True)
+class ActivityDay:
+    """One channel's messages on one UTC day, between message IDs ``first_id`` and ``last_id``."""
+
+    day: date
+    first_id: int
+    last_id: int
+    count: float
+
+
+@dataclass(frozen=True)
+class ActivitySample:
+    """Estimated messages posted per day, summed over the sampled channels."""
+
+    daily_messages: dict
+    channels: int
+    probes: int
+    sample_days: int
+    indexed_days: int = 0
+
+
+def resolve_activity_settings(env_values=None, env_file_path=ENV_FILE_PATH, base_dir=None):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    index_path = None
+    if env_flag(env_values, ACTIVITY_INDEX_KEY, default=True):
+        configured_path = str((env_values or {}).get(ACTIVITY_INDEX_PATH_KEY) or "").strip()
+        index_path = Path(configured_path or DEFAULT_ACTIVITY_INDEX_PATH).expanduser()
+        if not index_path.is_absolute():
+            index_path = (Path(base_dir) if base_dir is not None else Path.cwd()) / index_path
+
+    return ActivitySettings(
+        enabled=env_flag(env_values, ACTIVITY_SAMPLING_KEY),
+        sample_days=env_int(env_values, ACTIVITY_SAMPLE_DAYS_KEY, DEFAULT_ACTIVITY_SAMPLE_DAYS, minimum=1),
+        max_probes=env_int(env_values, ACTIVITY_MAX_PROBES_KEY, DEFAULT_ACTIVITY_MAX_PROBES, minimum=1),
+        index_path=index_path,
+    )
+
+
+class ActivityIndex:
+    """
+    SQLite index of (channel_id, day) -> (first_id, last_id, count), reused across runs.
+
+    Only finished UTC days measured one day at a time are stored, since their counts cannot
+    change apart from later deletions.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        self._connection.commit()
+
+    def channel_days(self, channel_id, first_day, last_day):
+        rows = self._connection.execute(
+            "SELECT day, first_id, last_id, count FROM channel_days WHERE channel_id = ? AND day BETWEEN ? AND ?",
+            (int(channel_id), first_day.isoformat(), last_day.isoformat()),
+        ).fetchall()
+        return {
+            date.fromisoformat(day): ActivityDay(date.fromisoformat(day), first_id, last_id, count)
+            for day, first_id, last_id, count in rows
+        }
+
+    def store(self, channel_id, activity_days):
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO channel_days (channel_id, day, first_id, last_id, count) VALUES (?, ?, ?, ?, ?)",
+            [
+                (int(channel_id), activity.day.isoformat(), activity.first_id, activity.last_id, activity.count)
+                for activity in activity_days
+            ],
+        )
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+
+def activity_days(start_date=None, end_date=None, first_result=None, last_result=None):
+    """Return the UTC days to sample: the search's date range, or the span of the results where it is open."""
+    first = start_date or first_result
+    last = end_date or last_result
+    if first is None or last is None:
+        return []
+
+    first_day, last_day = _utc_day(first), _utc_day(last)
+    return [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+
+
+def boundary_days(days, sample_days=1):
+    """Return the midnights to probe: every ``sample_days`` from the first day, plus the end of the last day."""
+    if not days:
+        return []
+    end = days[-1] + timedelta(days=1)
+    boundaries = [days[0] + timedelta(days=offset) for offset in range(0, (end - days[0]).days, sample_days)]
+    return boundaries + [end]
+
+
+def contiguous_runs(days):
+    """Split sorted days into runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][-1] == timedelta(days=1):
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+def choose_sample_days(run_lengths, settings):
+    """Widen the sampling step until probing runs of ``run_lengths`` days fits in ``settings.max_probes``."""
+    sample_days = settings.sample_days
+    longest = max(run_lengths, default=0)
+    while (
+        sum(math.ceil(length / sample_days) + 1 for length in run_lengths) > settings.max_probes
+        and sample_days < longest
+    ):
+        sample_days += 1
+    return sample_days
+
+
+async def sample_channel_activity(client, entity, days, *, sample_days=1, rate_limiter=None, known_boundaries=None):
+    """
+    Estimate a channel's messages per day from the newest message ID before each boundary midnight.
+
+    Channel message IDs increase by one per post, so the difference between two boundaries is
+    the number of posts between them, deleted ones included. With ``sample_days`` above one the
+    span is spread evenly over the days it covers. ``known_boundaries`` maps midnights whose ID
+    is already known to it, and those are not probed. Returns ``([ActivityDay], probes)``.
+    """
+    known_boundaries = known_boundaries or {}
+    boundaries = boundary_days(days, sample_days)
+    ids = []
+    probes = 0
+    for boundary in boundaries:
+        if boundary in known_boundaries:
+            ids.append(known_boundaries[boundary])
+            continue
+        offset_date = datetime.combine(boundary, time.min, tzinfo=timezone.utc)
+        ids.append(await message_id_before(client, entity, offset_date, rate_limiter) or 0)
+        probes += 1
+
+    wanted = set(days)
+    activity = []
+    for (first, first_id), (last, last_id) in zip(zip(boundaries, ids), zip(boundaries[1:], ids[1:])):
+        span_days = (last - first).days
+        per_day = max(0, last_id - first_id) / span_days
+        for offset in range(span_days):
+            day = first + timedelta(days=offset)
+            if day in wanted:
+                activity.append(ActivityDay(day=day, first_id=first_id + 1, last_id=last_id, count=per_day))
+    return activity, probes
+
+
+async def sample_daily_activity(channel_clients, days, settings, index=None, today=None):
+    """
+    Sample every channel concurrently and sum the per-day estimates.
+
+    ``channel_clients`` holds ``(client, channel, rate_limiter)`` for each channel; channels
+    without a resolved entity are left out. With an ``ActivityIndex`` only the days it lacks are
+    probed, the IDs it holds for neighbouring midnights are reused, and newly measured finished
+    days are added to it. Keys of ``daily_messages`` are naive UTC midnights, the form the
+    plotting code indexes dates by.
+    """
+    channel_clients = [entry for entry in channel_clients if getattr(entry[1], "entity", None) is not None]
+    if not days or not channel_clients:
+        return ActivitySample(daily_messages={}, channels=0, probes=0, sample_days=settings.sample_days)
+
+    today = today or datetime.now(timezone.utc).date()
+    one_day = timedelta(days=1)
+    plans = []
+    for client, channel, rate_limiter in channel_clients:
+        indexed = {}
+        if index is not None:
+            indexed = index.channel_days(channel.channel_id, days[0] - one_day, days[-1] + one_day)
+        missing = [day for day in days if day not in indexed]
+        plans.append((client, channel, rate_limiter, indexed, contiguous_runs(missing)))
+
+    sample_days = choose_sample_days([len(run) for *_, runs in plans for run in runs], settings)
+
+    async def sample_channel(client, channel, rate_limiter, indexed, runs):
+        known_boundaries = {}
+        for day, activity in indexed.items():
+            known_boundaries[day] = activity.first_id - 1
+            known_boundaries[day + one_day] = activity.last_id
+
+        activity = [indexed[day] for day in days if day in indexed]
+        probes = 0
+        for run in runs:
+            run_activity, run_probes = await sample_channel_activity(
+                client,
+                channel.entity,
+                run,
+                sample_days=sample_days,
+                rate_limiter=rate_limiter,
+                known_boundaries=known_boundaries,
+            )
+            activity.extend(run_activity)
+            probes += run_probes
+            if index is not None and sample_days == 1:
+                index.store(channel.channel_id, [entry for entry in run_activity if entry.day < today])
+        return activity, probes
+
+    samples = await asyncio.gather(*(sample_channel(*plan) for plan in plans))
+
+    totals = {}
+    for activity, _ in samples:
+        for entry in activity:
+            totals[entry.day] = totals.get(entry.day, 0.0) + entry.count
+
+    return ActivitySample(
+        daily_messages={datetime.combine(day, time.min): messages for day, messages in sorted(totals.items())},
+        channels=len(channel_clients),
+        probes=sum(probes for _, probes in samples),
+        sample_days=sample_days,
+        indexed_days=sum(len([day for day in days if day in plan[3]]) for plan in plans),
+    )
+
+
+def _utc_day(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    return value
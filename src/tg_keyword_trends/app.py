@@ -1,37 +1,187 @@
+import argparse
 import asyncio
 from collections import Counter
+from dataclasses import replace
+from datetime import datetime
 import os
-import re
 import threading
 import time as t
 import traceback
 from pathlib import Path
 
-import pandas as pd
-import pytz
 from colorama import Fore
 
-from .auth import connect_to_telegram
-from .channels import render_message_link, select_channels
+from .accounts import (
+    PRIMARY_ACCOUNT_NAME,
+    AccountShard,
+    add_extra_account_channels,
+    load_dialog_targets,
+    shard_channels,
+    shard_for_channel,
+)
+from .activity import ActivityIndex, activity_days, resolve_activity_settings, sample_daily_activity
+from .archive import MessageArchive, resolve_archive_settings
+from .auth import connect_extra_accounts, connect_to_telegram
+from .channels import (
+    followed_channel_selection,
+    render_message_link,
+    resolve_saved_channels,
+    select_channels,
+    select_listed_channels,
+)
+from .checkpoints import SearchCheckpointStore, checkpoints_enabled, resolve_checkpoint_dir
 from .console import printC
 from .constants import SCRIPT_DESCRIPTION, SCRIPT_WARNING
-from .files import check_search_terms_file, create_output_directory, open_file_dialog, render_url
+from .counts import COUNT_RESULT_COLUMNS, CountStats, DailyCountWriter, count_rows, count_unit, daily_counts_path
+from .distributed import merge_queue_results, publish_search_queue, run_queue_worker
+from .exports import (
+    StreamingResultWriter,
+    resolve_parquet_settings,
+    resolve_result_writer_buffer_rows,
+    result_export_paths,
+    rewrite_result_files,
+    write_html_from_csv,
+    write_json_from_jsonl,
+    write_results_parquet,
+)
+from .files import check_search_terms_file, create_output_directory, open_file_dialog
 from .inputs import parse_search_term_groups, prompt_date_range
+from .jobs import JOB_FORMATS, job_from_args, load_job_file, load_job_search_terms
+from .journal import RunInputs, RunJournal, journal_unit_key, search_terms_sha256
 from .media import (
     MediaDownloadJob,
+    MediaQueueStats,
     download_media_queue,
     load_media_manifest,
     media_manifest_path,
+    refetch_media_messages,
     resolve_media_download_concurrency,
     resolve_media_output_dir,
 )
-from .plotting import plot_keyword_frequency
-from .progress import progress_display
+from .metrics import RunMetrics, RunProfiler, file_size, metrics_span, resolve_metrics_settings
+from .openmetrics import OPENMETRICS_HOST, OPENMETRICS_PATH, OpenMetricsExporter, resolve_openmetrics_settings
+from .progress import (
+    FIELD_SECONDS,
+    ProgressDashboard,
+    ProgressField,
+    UnitCostEta,
+    resolve_progress_refresh_seconds,
+)
 from .reports import generate_txt_report
+from .results import (
+    ResultAccumulator,
+    build_result_row,
+    message_origin,
+    resolve_originals_only,
+)
+from .search import (
+    SEARCH_MODE_GLOBAL,
+    SEARCH_MODE_LOCAL,
+    SearchStats,
+    build_rate_limiter,
+    build_search_units,
+    iter_batch_results,
+    iter_search_results,
+    plan_search_batches,
+    resolve_search_settings,
+    run_search_batch,
+)
+from .terms import compile_search_terms
 
 
-def main():
-    return run_async(async_main())
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search Telegram channels for keywords and plot their trends.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume",
+        metavar="OUTPUT_FOLDER",
+        help="continue an interrupted run in its TG-Search_<timestamp> folder, skipping finished searches",
+    )
+    mode.add_argument(
+        "--publish-queue",
+        metavar="QUEUE_DB",
+        help="choose channels, terms and dates as usual, then publish the searches to a shared work queue",
+    )
+    mode.add_argument(
+        "--worker",
+        metavar="QUEUE_DB",
+        help="search units from a shared work queue until it is empty",
+    )
+    mode.add_argument(
+        "--merge",
+        metavar="QUEUE_DB",
+        help="combine a work queue's finished results into the usual output files and graphs",
+    )
+    mode.add_argument(
+        "--job-file",
+        metavar="JOB_FILE",
+        help="run every job in a TOML or YAML job file without prompting, one after another",
+    )
+
+    headless = parser.add_argument_group("headless run", "run one search without prompts; --terms is required")
+    headless.add_argument("--terms", metavar="FILE", help="search terms .txt file")
+    headless.add_argument(
+        "--channel",
+        action="append",
+        metavar="CHANNEL",
+        help="channel username, link or ID to search (repeatable; default: followed channels)",
+    )
+    headless.add_argument("--channels-file", metavar="FILE", help="channel list .txt file")
+    headless.add_argument("--start-date", metavar="DD/MM/YYYY", help="first day to search")
+    headless.add_argument("--end-date", metavar="DD/MM/YYYY", help="last day to search")
+    headless.add_argument("--last-days", type=int, metavar="N", help="search from N days before today")
+    headless.add_argument("--download-media", action="store_true", default=None, help="download matching media")
+    headless.add_argument("--media-dir", metavar="FOLDER", help="folder for downloaded media")
+    headless.add_argument("--output-dir", metavar="FOLDER", help="folder to create the TG-Search_<timestamp> folder in")
+    headless.add_argument(
+        "--formats",
+        metavar="LIST",
+        help="comma-separated outputs besides CSV/JSONL: html, json, parquet, graphs, report",
+    )
+    headless.add_argument(
+        "--count-only",
+        action="store_true",
+        default=None,
+        help="count matches per day from search totals instead of downloading them (graphs and report only)",
+    )
+
+    args = parser.parse_args(argv)
+    headless_values = [
+        args.channel,
+        args.channels_file,
+        args.start_date,
+        args.end_date,
+        args.last_days,
+        args.download_media,
+        args.media_dir,
+        args.output_dir,
+        args.formats,
+        args.count_only,
+    ]
+    if args.terms is None and any(value is not None for value in headless_values):
+        parser.error("the headless run options need --terms")
+    if args.terms is not None and any([args.resume, args.publish_queue, args.worker, args.merge, args.job_file]):
+        parser.error("--terms cannot be combined with --resume, the work queue options or --job-file")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.merge:
+        output_folder = merge_queue_results(args.merge, export_results)
+        printC(f'\nMerged results saved in {output_folder}', Fore.GREEN)
+        return output_folder
+    jobs = None
+    if args.job_file:
+        jobs = load_job_file(args.job_file)
+    elif args.terms:
+        jobs = [job_from_args(args)]
+
+    failed_jobs = run_async(
+        async_main(resume_folder=args.resume, publish_queue=args.publish_queue, worker_queue=args.worker, jobs=jobs)
+    )
+    if failed_jobs:
+        raise SystemExit(1)
 
 
 def run_async(coro):
@@ -57,237 +207,928 @@ def run_async(coro):
     return result.get("value")
 
 
-async def async_main():
-    now = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+async def async_main(resume_folder=None, publish_queue=None, worker_queue=None, jobs=None):
+    now = datetime.now().strftime('%Y%m%d_%H%M%S')
     printC(SCRIPT_DESCRIPTION, Fore.LIGHTYELLOW_EX)
     printC(SCRIPT_WARNING, Fore.LIGHTRED_EX)
 
     client = await connect_to_telegram()
+    extra_clients = []
 
     try:
-        await run_search_workflow(client, now)
+        if worker_queue is not None:
+            await run_queue_worker(client, worker_queue)
+        elif publish_queue is not None:
+            await publish_queue_workflow(client, now, publish_queue)
+        elif jobs:
+            extra_clients = await connect_extra_accounts()
+            return await run_jobs(client, jobs, extra_clients=extra_clients)
+        else:
+            extra_clients = await connect_extra_accounts()
+            await run_search_workflow(client, now, resume_folder=resume_folder, extra_clients=extra_clients)
     finally:
+        for _, extra_client in extra_clients:
+            await extra_client.disconnect()
         await client.disconnect()
 
 
-async def run_search_workflow(client, now):
-    dialogs = await client.get_dialogs()
-    channel_selection = await select_channels(client, dialogs)
-    channels = channel_selection.targets
+async def run_jobs(client, jobs, extra_clients=()):
+    """Run ``jobs`` back to back on the same connections and return the names of those that failed."""
+    failed_jobs = []
+    for number, job in enumerate(jobs, start=1):
+        now = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job.run_suffix}"
+        printC(f"\nJob {number}/{len(jobs)}: {job.name}", Fore.LIGHTYELLOW_EX)
+        try:
+            await run_search_workflow(client, now, extra_clients=extra_clients, job=job)
+        except Exception as exc:
+            printC(f"Job {job.name} failed: {exc}", Fore.RED)
+            traceback.print_exc()
+            failed_jobs.append(job.name)
+
+    if len(jobs) > 1:
+        printC(
+            f"\n{len(jobs) - len(failed_jobs)} of {len(jobs)} jobs completed"
+            + (f"; failed: {', '.join(failed_jobs)}" if failed_jobs else ""),
+            Fore.RED if failed_jobs else Fore.GREEN,
+        )
+    return failed_jobs
+
+
+async def run_search_workflow(client, now, resume_folder=None, extra_clients=(), job=None):
+    metrics_settings = resolve_metrics_settings()
+    profiler = RunProfiler(metrics_settings.profiler).start() if metrics_settings.profiler else None
+    metrics = RunMetrics(trace_memory=metrics_settings.trace_memory)
+    metrics.stage("setup")
+
+    exporter = None
+    try:
+        search_settings = resolve_search_settings()
+        # Rate limits are per account, so every account gets its own client and rate budget.
+        shards = [
+            AccountShard(name=PRIMARY_ACCOUNT_NAME, client=client, rate_limiter=build_rate_limiter(search_settings))
+        ]
+        shards.extend(
+            AccountShard(name=account.name, client=extra_client, rate_limiter=build_rate_limiter(search_settings))
+            for account, extra_client in extra_clients
+        )
+        rate_limiter = shards[0].rate_limiter
+        add_rate_limiter_sources(metrics, shards)
+
+        resume_inputs = None
+        if resume_folder is not None:
+            journal = RunJournal.load(resume_folder)
+            resume_inputs = journal.load_inputs()
+            now = resume_inputs.now
+            printC(f"Resuming run {now} from {resume_folder} ({len(journal.completed_units)} searches already finished)", Fore.CYAN)
+
+        dialogs = await rate_limiter.call(client.get_dialogs)
+        # Global search only sees joined chats, so the planner needs each account's joined channels.
+        if len(shards) > 1 or search_settings.mode == SEARCH_MODE_GLOBAL:
+            await asyncio.gather(
+                *(load_dialog_targets(shard, dialogs if shard is shards[0] else None) for shard in shards)
+            )
+
+        if resume_inputs is None:
+            if job is None:
+                channel_selection = await select_channels(client, dialogs, rate_limiter=rate_limiter)
+            elif job.channels is None:
+                channel_selection = await followed_channel_selection(client, dialogs)
+            else:
+                channel_selection = await select_listed_channels(client, job.channels, rate_limiter=rate_limiter)
+            channels = channel_selection.targets
+            if not channel_selection.custom_list:
+                channels = add_extra_account_channels(shards, channels)
+        else:
+            channel_selection = await resolve_saved_channels(client, dialogs, resume_inputs.channels, rate_limiter)
+            channels = add_extra_account_channels(
+                shards,
+                channel_selection.targets,
+                channel_ids={unresolved.entry for unresolved in channel_selection.unresolved},
+            )
+            resolved_ids = {str(channel.channel_id) for channel in channels}
+            for unresolved in channel_selection.unresolved:
+                if unresolved.entry not in resolved_ids:
+                    print(f"Could not resolve channel '{unresolved.entry}': {unresolved.reason}")
+            if not channels:
+                raise ValueError("None of the run's channels could be resolved.")
+
+        channels = shard_channels(shards, channels)
+        if len(shards) > 1:
+            for shard in shards:
+                print(f"Account {shard.name} will search {len(shard.channel_ids)} channels")
+
+        result_accumulator = ResultAccumulator(COUNT_RESULT_COLUMNS if job is not None and job.count_only else None)
+
+        if job is not None:
+            search_terms_file = job.search_terms_file
+            search_terms = load_job_search_terms(job)
+            search_terms_hash = search_terms_sha256(search_terms)
+            search_term_groups = parse_search_term_groups(search_terms)
+        elif resume_inputs is None:
+            printC(
+                'Select the .txt file with search terms. Use one term per line or "Group: term | term" for grouped terms.',
+                Fore.BLUE,
+            )
+            search_terms_file = open_file_dialog()
+            search_terms = check_search_terms_file(search_terms_file)
+            search_terms_hash = search_terms_sha256(search_terms)
+            search_term_groups = parse_search_term_groups(search_terms)
+        else:
+            search_terms_file = resume_inputs.search_terms_file
+            search_terms_hash = resume_inputs.search_terms_sha256
+            search_term_groups = resume_inputs.search_term_groups
+            if os.path.exists(search_terms_file):
+                with open(search_terms_file, 'r', encoding='utf-8') as f:
+                    if search_terms_sha256(f.read().splitlines()) != search_terms_hash:
+                        printC(
+                            f"{search_terms_file} has changed since the run started; resuming with the saved search terms.",
+                            Fore.YELLOW,
+                        )
+        if not search_term_groups:
+            raise ValueError("Search terms file does not contain any active search terms.")
+        compiled_terms = compile_search_terms(search_term_groups)
+        dataframes_dict = result_accumulator.groups(
+            (search_group.label for search_group in search_term_groups),
+            masks=compiled_terms.group_masks,
+            originals_only=resolve_originals_only(),
+        )
+
+        if job is not None:
+            start_date, end_date = job.start_date, job.end_date
+            download_media_enabled = job.download_media
+        elif resume_inputs is None:
+            date_range = prompt_date_range()
+            start_date, end_date = date_range
+
+            download_media_enabled = input("Do you want to download media files? (yes/no): ").strip().lower() in {"yes", "y"}
+        else:
+            start_date, end_date = resume_inputs.start_date, resume_inputs.end_date
+            download_media_enabled = resume_inputs.download_media
+
+        search_stats = SearchStats()
+        metrics.add_source("messages_fetched", lambda: search_stats.messages_fetched)
+        metrics.add_source("pages_fetched", lambda: search_stats.pages_fetched)
+        group_matches = Counter()
+        queued_media = set()
+        media_stats = MediaQueueStats()
+        exporter = start_openmetrics_exporter(
+            now, job, metrics, shards, search_stats, group_matches, queued_media, media_stats
+        )
 
-    all_results = pd.DataFrame(
-        columns=[
-            'time',
-            'message',
-            'message_id',
-            'channel_id',
-            'channel_title',
-            'search_group',
-            'search_term',
-            'link',
+        if job is not None and job.count_only:
+            output_folder = await run_count_workflow(
+                shards,
+                channels,
+                search_term_groups,
+                result_accumulator,
+                dataframes_dict,
+                start_date=start_date,
+                end_date=end_date,
+                job=job,
+                now=now,
+                concurrency=search_settings.concurrency * len(shards),
+                metrics=metrics,
+                group_matches=group_matches,
+            )
+            finish_run_metrics(metrics, metrics_settings, profiler, output_folder, now, exporter)
+            return
+
+        media_jobs = {shard.name: [] for shard in shards}
+        media_output_dir = None
+        media_manifest_file = None
+        media_manifest_records = None
+        media_download_concurrency = None
+
+        if download_media_enabled:
+            media_output_dir = (
+                job.media_output_dir if job is not None and job.media_output_dir else resolve_media_output_dir()
+            )
+            media_manifest_file = media_manifest_path(media_output_dir)
+            media_manifest_records = load_media_manifest(media_manifest_file)
+            media_download_concurrency = resolve_media_download_concurrency()
+            print(f"Media files will be saved to {media_output_dir}")
+            print(f"Previously downloaded media will be read from {media_manifest_file}")
+
+        checkpoints = None
+        if checkpoints_enabled():
+            checkpoint_dir = resolve_checkpoint_dir()
+            checkpoints = SearchCheckpointStore.load(checkpoint_dir)
+            print(f"Incremental search checkpoints will be read from {checkpoint_dir}")
+
+        archive = None
+        archive_settings = resolve_archive_settings()
+        if archive_settings.enabled:
+            archive = MessageArchive.from_settings(archive_settings)
+            print(f"Fetched messages will be archived in {archive_settings.path}")
+
+        if resume_inputs is None:
+            output_folder = f'TG-Search_{now}'
+            if job is not None and job.output_dir is not None:
+                output_folder = str(job.output_dir / output_folder)
+            output_folder = create_output_directory(output_folder)
+            journal = RunJournal(output_folder)
+            journal.save_inputs(
+                RunInputs(
+                    now=now,
+                    search_terms_file=str(search_terms_file),
+                    search_terms_sha256=search_terms_hash,
+                    search_term_groups=search_term_groups,
+                    channels=[{"title": channel.title, "channel_id": channel.channel_id} for channel in channels],
+                    start_date=start_date,
+                    end_date=end_date,
+                    download_media=download_media_enabled,
+                )
+            )
+        else:
+            output_folder = str(resume_folder)
+
+        export_paths = result_export_paths(output_folder, now)
+        result_writer = StreamingResultWriter(
+            export_paths['csv'],
+            export_paths['jsonl'],
+            buffer_rows=resolve_result_writer_buffer_rows(),
+        )
+        print(
+            f"Results will be written to {export_paths['csv']} and {export_paths['jsonl']} as each search finishes;"
+            " messages found by several terms are merged into one row when the search ends"
+        )
+
+        metrics.stage("plan")
+        units = build_search_units(channels, search_term_groups)
+
+        def collect_unit_rows(rows):
+            # Rows are streamed as each unit finishes; the accumulator merges rows for the same message.
+            result_accumulator.merge_rows(rows, compiled_terms)
+            result_writer.write_rows(rows)
+
+        pending_units = [
+            unit
+            for unit in units
+            if not journal.completed(unit.channel.channel_id, unit.search_group.label, unit.search_term)
         ]
+        if len(pending_units) < len(units):
+            # Finished units are replayed from the journal so the result files start complete.
+            finished_units = {
+                journal_unit_key(unit.channel.channel_id, unit.search_group.label, unit.search_term): unit
+                for unit in units
+            }
+            for entry in journal.iter_entries():
+                unit = finished_units.get(entry.key)
+                if unit is None:
+                    continue
+                if checkpoints is not None:
+                    checkpoints.record_results(
+                        unit.channel.channel_id, unit.search_term, entry.search_filter, entry.rows, start_date
+                    )
+                collect_unit_rows(entry.rows)
+        if len(pending_units) < len(units):
+            print(f"Skipping {len(units) - len(pending_units)} searches finished before the run was interrupted")
+
+        batches = []
+        for shard in shards:
+            batches.extend(
+                await plan_search_batches(
+                    shard.client,
+                    [unit for unit in pending_units if shard_for_channel(shards, unit.channel.channel_id) is shard],
+                    search_settings,
+                    start_date=start_date,
+                    end_date=end_date,
+                    rate_limiter=shard.rate_limiter,
+                    archive=archive,
+                    joined_channel_ids=set(shard.dialog_targets),
+                )
+            )
+        batches.sort(key=lambda batch: batch.units[0].index)
+        search_concurrency = search_settings.concurrency * len(shards)
+        local_scans = sum(1 for batch in batches if batch.mode == SEARCH_MODE_LOCAL)
+        global_searches = [batch for batch in batches if batch.mode == SEARCH_MODE_GLOBAL]
+        global_note = ""
+        if global_searches:
+            global_units = sum(len(batch.units) for batch in global_searches)
+            global_note = f", {global_units} covered by {len(global_searches)} global searches"
+        print(
+            f"Searching {len(pending_units)} channel/term combinations with concurrency {search_concurrency}"
+            f" ({local_scans} channels scanned locally{global_note})..."
+        )
+
+        unit_costs = UnitCostEta(Counter(unit.channel.channel_id for unit in pending_units))
+
+        async def search_batch(batch):
+            shard = shard_for_channel(shards, batch.units[0].channel.channel_id)
+            started = t.perf_counter()
+            results = await run_search_batch(
+                shard.client,
+                batch,
+                start_date=start_date,
+                end_date=end_date,
+                rate_limiter=shard.rate_limiter,
+                checkpoints=checkpoints,
+                archive=archive,
+                stats=search_stats,
+                metrics=metrics,
+            )
+            unit_costs.record_units(batch.units, t.perf_counter() - started)
+            return results
+
+        metrics.stage("search")
+        progress = ProgressDashboard(
+            len(pending_units),
+            "Searching",
+            fields=[
+                ProgressField("msg/s", lambda: search_stats.messages_fetched),
+                *rate_limiter_progress_fields(shards),
+            ],
+            eta=unit_costs,
+            refresh_seconds=resolve_progress_refresh_seconds(),
+        )
+        try:
+            async for unit_result in iter_batch_results(batches, search_batch, max_concurrency=search_concurrency):
+                unit = unit_result.unit
+                channel_target = unit.channel
+                channel_id = channel_target.channel_id
+                search_group = unit.search_group
+                search_string = unit.search_term
+
+                rows = []
+
+                for message in unit_result.messages:
+                    message_link = render_message_link(channel_id, message.id)
+
+                    # Media is keyed by the original post, so forwards of it are only downloaded once.
+                    # Archived hits only keep a media descriptor and are refetched before downloading.
+                    media_key = message_origin(channel_id, message)
+                    has_media = message.media or getattr(message, "media_descriptor", None)
+                    if download_media_enabled and has_media and media_key not in queued_media:
+                        queued_media.add(media_key)
+                        filename = f"{media_key[0]}_{media_key[1]}"
+                        media_jobs[shard_for_channel(shards, channel_id).name].append(
+                            MediaDownloadJob(
+                                message=message,
+                                file_path=Path(media_output_dir) / filename,
+                                channel_id=media_key[0],
+                                message_id=media_key[1],
+                                metadata={
+                                    "channel_title": channel_target.title,
+                                    "search_group": search_group.label,
+                                    "search_term": search_string,
+                                    "message_date": _format_message_date(message.date),
+                                    "link": message_link,
+                                    "found_in_channel_id": channel_id,
+                                    "found_in_message_id": message.id,
+                                },
+                            )
+                        )
+
+                    rows.append(
+                        build_result_row(
+                            message, channel_target, search_group.label, search_string, message_link, unit.term_mask
+                        )
+                    )
+
+                new_results = len(rows)
+                group_matches[search_group.label] += new_results
+                if checkpoints is not None:
+                    checkpoints.record_results(channel_id, search_string, unit_result.search_filter, rows, start_date)
+                    rows = rows + unit_result.previous_rows
+
+                journal.record_unit(
+                    channel_id,
+                    search_group.label,
+                    search_string,
+                    unit_result.search_filter,
+                    rows,
+                    new_results=new_results,
+                )
+
+                collect_unit_rows(rows)
+                progress.update()
+        finally:
+            progress.close()
+            result_writer.close()
+            journal.close()
+
+        if checkpoints is not None:
+            checkpoints.save()
+
+        rows_written = result_writer.rows_written
+        if result_accumulator.merged_rows:
+            rows_written = rewrite_result_files(
+                export_paths['csv'],
+                export_paths['jsonl'],
+                result_accumulator.iter_rows(),
+                buffer_rows=result_writer.buffer_rows,
+            )
+        all_results = result_accumulator.to_frame()
+
+        if archive is not None:
+            await archive.close()
+            print(
+                f"Archive: {archive.messages_written} messages written, {archive.messages_served} served from {archive.path}"
+            )
+
+        if download_media_enabled:
+            media_stage = metrics.stage("media")
+            # Media is downloaded by the account that fetched the message.
+            channel_entities = {str(channel.channel_id): channel.entity for channel in channels}
+            for shard in [shard for shard in shards if media_jobs[shard.name]] or shards[:1]:
+                shard_media_jobs, refetched = await refetch_media_messages(
+                    shard.client, media_jobs[shard.name], channel_entities, shard.rate_limiter
+                )
+                if refetched:
+                    print(f"Refetched {refetched} archived messages to download their media")
+                media_results = await download_queued_media(
+                    shard.client,
+                    shard_media_jobs,
+                    media_manifest_file,
+                    media_manifest_records,
+                    media_download_concurrency,
+                    shard.rate_limiter,
+                    stats=media_stats,
+                )
+                downloaded = [result for result in media_results if result.file_path is not None]
+                media_stage.add(
+                    media_files=len(downloaded),
+                    media_bytes=sum(file_size(result.file_path) for result in downloaded),
+                )
+
+        for shard in shards:
+            print_rate_limiter_summary(shard.rate_limiter, label=f"Account {shard.name}" if len(shards) > 1 else None)
+        print_search_stats_summary(search_stats)
+
+        metrics.stage("activity")
+        total_daily_messages = await sample_run_activity(shards, channels, start_date, end_date, all_results, job)
+
+        metrics.stage("exports")
+        export_results(
+            all_results,
+            dataframes_dict,
+            channels,
+            search_term_groups,
+            output_folder,
+            now,
+            export_paths,
+            rows_written,
+            formats=job.formats if job is not None else None,
+            total_daily_messages=total_daily_messages,
+            metrics=metrics,
+        )
+        metrics.totals.update(result_rows=rows_written, channels=len(channels), units=len(units))
+        finish_run_metrics(metrics, metrics_settings, profiler, output_folder, now, exporter)
+
+        printC('\nProcess completed', Fore.GREEN)
+    finally:
+        # A failed run must not leave the refresh task reporting it as active, the port bound, or
+        # the profiler and tracemalloc slowing down the next job. After a successful run these
+        # were already stopped by finish_run_metrics and do nothing.
+        if exporter is not None:
+            exporter.stop()
+        if profiler is not None:
+            profiler.stop(None, now)
+        metrics.close()
+
+
+def add_rate_limiter_sources(metrics, shards):
+    """Register the accounts' request, FloodWait and pacing totals with ``metrics``."""
+    metrics.add_source("api_calls", lambda: sum(shard.rate_limiter.api_calls for shard in shards))
+    metrics.add_source("flood_waits", lambda: sum(shard.rate_limiter.flood_waits for shard in shards))
+    metrics.add_source(
+        "flood_wait_seconds", lambda: round(sum(shard.rate_limiter.flood_wait_seconds for shard in shards), 3)
+    )
+    metrics.add_source(
+        "rate_wait_seconds", lambda: round(sum(shard.rate_limiter.waited_seconds for shard in shards), 3)
+    )
+
+
+def rate_limiter_progress_fields(shards):
+    """Progress line fields for the accounts' API call rate and time spent in FloodWaits."""
+    return [
+        ProgressField("API/s", lambda: sum(shard.rate_limiter.api_calls for shard in shards)),
+        ProgressField(
+            "FloodWait", lambda: sum(shard.rate_limiter.flood_wait_seconds for shard in shards), kind=FIELD_SECONDS
+        ),
+    ]
+
+
+def start_openmetrics_exporter(now, job, metrics, shards, search_stats, group_matches, queued_media, media_stats):
+    """Start the OpenMetrics textfile/endpoint for this run, or return None when neither is configured."""
+    settings = resolve_openmetrics_settings()
+    if not settings.enabled:
+        return None
+
+    labels = {"run": now}
+    if job is not None:
+        labels["job"] = job.name
+    exporter = OpenMetricsExporter(settings, labels=labels, textfile_name=f"tg_keyword_trends_{now}.prom")
+    exporter.counter(
+        "messages_fetched", "Messages fetched from Telegram by searches and scans.", lambda: search_stats.messages_fetched
+    )
+    exporter.counter("matches", "Matching messages found per search group.", lambda: group_matches, label="group")
+    exporter.counter(
+        "api_calls",
+        "Telegram requests made per account.",
+        lambda: {shard.name: shard.rate_limiter.api_calls for shard in shards},
+        label="account",
+    )
+    exporter.counter(
+        "flood_wait_seconds",
+        "Seconds spent waiting out Telegram FloodWait errors per account.",
+        lambda: {shard.name: shard.rate_limiter.flood_wait_seconds for shard in shards},
+        label="account",
+        unit="seconds",
+    )
+    exporter.gauge(
+        "media_queue_depth",
+        "Media files queued for download and not finished yet.",
+        lambda: len(queued_media) - media_stats.finished,
+    )
+    exporter.counter(
+        "media_downloaded_bytes", "Media bytes downloaded.", lambda: media_stats.bytes_downloaded, unit="bytes"
+    )
+    exporter.gauge(
+        "stage_duration_seconds",
+        "Seconds spent in each stage of the run so far.",
+        metrics.stage_seconds,
+        label="stage",
+        unit="seconds",
+    )
+    exporter.start()
+    targets = [str(target) for target in (exporter.textfile_path,) if target is not None]
+    if exporter.server is not None:
+        targets.append(f"http://{OPENMETRICS_HOST}:{settings.port}{OPENMETRICS_PATH}")
+    if targets:
+        printC(f"OpenMetrics: {' and '.join(targets)}, refreshed every {settings.interval_seconds:g}s", Fore.CYAN)
+    return exporter
+
+
+def finish_run_metrics(metrics, metrics_settings, profiler, output_folder, now, exporter=None):
+    metrics.end_stage()
+    if exporter is not None:
+        exporter.stop()
+    if profiler is not None:
+        profile_path = profiler.stop(output_folder, now)
+        if profile_path is not None:
+            printC(f"Saved profile {profile_path}", Fore.CYAN)
+    if metrics_settings.enabled:
+        printC(f"Saved run metrics {metrics.write(output_folder)}", Fore.CYAN)
+    else:
+        metrics.close()
+
+
+async def sample_run_activity(shards, channels, start_date, end_date, all_results, job=None):
+    """Return the channels' sampled daily activity for the ratio graphs, or None when sampling is off."""
+    activity_settings = resolve_activity_settings()
+    if not activity_settings.enabled or (job is not None and job.formats is not None and 'graphs' not in job.formats):
+        return None
+
+    days = activity_days(
+        start_date,
+        end_date,
+        all_results['time'].min() if len(all_results) else None,
+        all_results['time'].max() if len(all_results) else None,
     )
+    print(f"Sampling daily activity of {len(channels)} channels over {len(days)} days...")
+    activity_index = ActivityIndex(activity_settings.index_path) if activity_settings.index_path else None
+    try:
+        activity = await sample_daily_activity(
+            [
+                (shard.client, channel, shard.rate_limiter)
+                for channel in channels
+                for shard in [shard_for_channel(shards, channel.channel_id)]
+            ],
+            days,
+            activity_settings,
+            index=activity_index,
+        )
+    finally:
+        if activity_index is not None:
+            activity_index.close()
+    if not activity.daily_messages:
+        return None
+
+    step_note = f", one probe every {activity.sample_days} days" if activity.sample_days > 1 else ""
+    index_note = ""
+    if activity_index is not None:
+        index_note = f", {activity.indexed_days} channel-days read from {activity_settings.index_path}"
+    print(f"Sampled {activity.channels} channels with {activity.probes} requests{step_note}{index_note}")
+    return activity.daily_messages
+
+
+async def run_count_workflow(
+    shards,
+    channels,
+    search_term_groups,
+    result_accumulator,
+    dataframes_dict,
+    *,
+    start_date,
+    end_date,
+    job,
+    now,
+    concurrency,
+    metrics=None,
+    group_matches=None,
+):
+    """
+    Build the trend graphs and report from per-day match counts instead of downloaded messages.
+
+    Each unique term is counted once per channel. A group's daily count is the sum of its terms'
+    counts, so a message matching two terms of the same group is counted twice. Returns the
+    output folder.
+    """
+    output_folder = f'TG-Search_{now}'
+    if job.output_dir is not None:
+        output_folder = str(job.output_dir / output_folder)
+    output_folder = create_output_directory(output_folder)
+    counts_path = daily_counts_path(output_folder, now)
+
+    units = [unit for unit in build_search_units(channels, search_term_groups) if unit.channel.entity is not None]
+    count_stats = CountStats()
+    print(f"Counting {len(units)} channel/term combinations per day with concurrency {concurrency}...")
+
+    unit_costs = UnitCostEta(Counter(unit.channel.channel_id for unit in units))
+
+    async def count_search_unit(unit):
+        shard = shard_for_channel(shards, unit.channel.channel_id)
+        started = t.perf_counter()
+        unit_counts = await count_unit(
+            shard.client,
+            unit,
+            start_date=start_date,
+            end_date=end_date,
+            rate_limiter=shard.rate_limiter,
+            stats=count_stats,
+        )
+        unit_costs.record(unit.channel.channel_id, t.perf_counter() - started)
+        if group_matches is not None:
+            group_matches[unit.search_group.label] += sum(unit_counts.counts.values())
+        if metrics is not None:
+            metrics.record_unit(
+                unit.channel.channel_id,
+                unit.channel.title,
+                [unit.search_term],
+                "count",
+                t.perf_counter() - started,
+                sum(unit_counts.counts.values()),
+            )
+        return unit_counts
+
+    if metrics is not None:
+        metrics.stage("count")
+    progress = ProgressDashboard(
+        len(units),
+        "Counting",
+        fields=rate_limiter_progress_fields(shards),
+        eta=unit_costs,
+        refresh_seconds=resolve_progress_refresh_seconds(),
+    )
+    with DailyCountWriter(counts_path) as count_writer, progress:
+        async for unit_counts in iter_search_results(units, count_search_unit, max_concurrency=concurrency):
+            count_writer.write_counts(unit_counts)
+            result_accumulator.append_rows(count_rows(unit_counts))
+            progress.update()
+
+    for shard in shards:
+        print_rate_limiter_summary(shard.rate_limiter, label=f"Account {shard.name}" if len(shards) > 1 else None)
+    printC(
+        f"Counted {count_stats.days} channel/term days with {count_stats.requests} count requests; "
+        f"saved {counts_path} ({count_writer.rows_written} rows)",
+        Fore.CYAN,
+    )
+
+    all_results = result_accumulator.to_frame()
+    if metrics is not None:
+        metrics.stage("activity")
+    total_daily_messages = await sample_run_activity(shards, channels, start_date, end_date, all_results, job)
+    if metrics is not None:
+        metrics.stage("exports")
+        metrics.totals.update(count_rows=count_writer.rows_written, channels=len(channels), units=len(units))
+    export_results(
+        all_results,
+        dataframes_dict,
+        channels,
+        search_term_groups,
+        output_folder,
+        now,
+        None,
+        None,
+        formats=(job.formats or frozenset(JOB_FORMATS)) & {'graphs', 'report'},
+        total_daily_messages=total_daily_messages,
+        metrics=metrics,
+    )
+    printC('\nProcess completed', Fore.GREEN)
+    return output_folder
+
+
+async def publish_queue_workflow(client, now, queue_path):
+    rate_limiter = build_rate_limiter(resolve_search_settings())
+    dialogs = await rate_limiter.call(client.get_dialogs)
+    channel_selection = await select_channels(client, dialogs, rate_limiter=rate_limiter)
+    channels = channel_selection.targets
 
     printC(
         'Select the .txt file with search terms. Use one term per line or "Group: term | term" for grouped terms.',
         Fore.BLUE,
     )
     search_terms_file = open_file_dialog()
-    search_term_groups = parse_search_term_groups(check_search_terms_file(search_terms_file))
+    search_terms = check_search_terms_file(search_terms_file)
+    search_term_groups = parse_search_term_groups(search_terms)
     if not search_term_groups:
         raise ValueError("Search terms file does not contain any active search terms.")
-    dataframes_dict = {search_group.label: [] for search_group in search_term_groups}
-
-    count, start_time, total_channels = 0, t.time(), len(channels)
-
-    reset_colour = '\033[0m'
-    green_colour = '\033[32m'
-    yellow_colour = '\033[33m'
-
-    date_range = prompt_date_range(timezone=pytz.UTC)
-    start_date, end_date = date_range
-
-    download_media_enabled = input("Do you want to download media files? (yes/no): ").strip().lower() in {"yes", "y"}
-    media_jobs = []
-    media_output_dir = None
-    media_manifest_file = None
-    media_manifest_records = None
-    media_download_concurrency = None
-
-    if download_media_enabled:
-        media_output_dir = resolve_media_output_dir()
-        media_manifest_file = media_manifest_path(media_output_dir)
-        media_manifest_records = load_media_manifest(media_manifest_file)
-        media_download_concurrency = resolve_media_download_concurrency()
-        print(f"Media files will be saved to {media_output_dir}")
-        print(f"Previously downloaded media will be read from {media_manifest_file}")
-
-    for channel_target in channels:
-        count = count + 1
-        channel = channel_target.entity
-        channel_id = channel_target.channel_id
-
-        channels_progress = str(count) + "/" + str(total_channels)
-        print(channels_progress + " | Searching Channel: " + f"{channel_target.title}")
-
-        for search_group in search_term_groups:
-            for search_string in search_group.terms:
-                display_search = (
-                    f"{search_group.label} / {search_string}"
-                    if search_group.label != search_string
-                    else search_string
-                )
-                print(f"{yellow_colour}Searching term: {reset_colour}" + display_search + "... [RUNNING]", end='',
-                      flush=True)
-
-                messages, time, message_ids = [], [], []
-
-                pattern = re.compile(search_string, re.IGNORECASE)
-                search_string = pattern.pattern
-
-                async for message in client.iter_messages(channel, search=search_string):
-                    if (start_date is None or message.date >= start_date) and (
-                            end_date is None or message.date <= end_date):
-
-                        message_text = message.message
-
-                        message_link = render_message_link(channel_id, message.id)
-
-                        if download_media_enabled and message.media:
-                            filename = f"{channel_id}_{message.id}"
-                            media_jobs.append(
-                                MediaDownloadJob(
-                                    message=message,
-                                    file_path=Path(media_output_dir) / filename,
-                                    channel_id=channel_id,
-                                    message_id=message.id,
-                                    metadata={
-                                        "channel_title": channel_target.title,
-                                        "search_group": search_group.label,
-                                        "search_term": search_string,
-                                        "message_date": _format_message_date(message.date),
-                                        "link": message_link,
-                                    },
-                                )
-                            )
 
-                        messages.append(message_text)
-                        time.append(message.date)
-                        message_ids.append(message.id)
-
-                if messages:
-                    links = [render_message_link(channel_id, message_id) for message_id in message_ids]
-                    data = {
-                        'time': time,
-                        'message': messages,
-                        'message_id': message_ids,
-                        'channel_id': channel_id,
-                        'channel_title': channel_target.title,
-                        'search_group': search_group.label,
-                        'search_term': search_string,
-                        'link': links,
-                    }
-                    df = pd.DataFrame(data)
-
-                    print(
-                        f'\r{reset_colour}OK{green_colour} Searched term: {reset_colour}{display_search} - {green_colour}Results: {len(messages)}{reset_colour}',
-                        flush=True)
-
-                    all_results = pd.concat([all_results, df], ignore_index=True)
-                    dataframes_dict[search_group.label].append(df)
-                else:
-                    print(
-                        f'\r{reset_colour}OK{green_colour} Searched term: {reset_colour}{display_search} - {yellow_colour}No results{reset_colour}',
-                        flush=True)
-
-                t.sleep(1)
-
-        progress_display(start_time, total_channels, count)
-
-    if download_media_enabled:
-        await download_queued_media(
-            client,
-            media_jobs,
-            media_manifest_file,
-            media_manifest_records,
-            media_download_concurrency,
-        )
+    start_date, end_date = prompt_date_range()
 
-    try:
-        output_folder = create_output_directory(f'TG-Search_{now}')
+    published, counts = publish_search_queue(
+        queue_path,
+        RunInputs(
+            now=now,
+            search_terms_file=str(search_terms_file),
+            search_terms_sha256=search_terms_sha256(search_terms),
+            search_term_groups=search_term_groups,
+            channels=[{"title": channel.title, "channel_id": channel.channel_id} for channel in channels],
+            start_date=start_date,
+            end_date=end_date,
+        ),
+        channels,
+    )
+    printC(
+        f"Published {published} new units to {queue_path} ({counts['pending']} pending, {counts['done']} done). "
+        f"Start workers with --worker {queue_path}, then combine their results with --merge {queue_path}.",
+        Fore.GREEN,
+    )
 
-        filename_html = os.path.join(output_folder, f'all_results__{now}.html')
-        filename_csv = os.path.join(output_folder, f'all_results__{now}.csv')
-        filename_json = os.path.join(output_folder, f'all_results__{now}.json')
 
-        try:
-            try:
-                with open(filename_html, 'w', encoding='utf-8') as f:
+def export_results(
+    all_results,
+    dataframes_dict,
+    channels,
+    search_term_groups,
+    output_folder,
+    now,
+    export_paths,
+    rows_written,
+    formats=None,
+    total_daily_messages=None,
+    metrics=None,
+):
+    """
+    Write the outputs built after the search. ``formats`` limits them to a job's chosen formats.
+
+    ``total_daily_messages`` is the sampled channel activity used by the ratio graphs, if any.
+    ``export_paths`` is None for count-only runs, which have no streamed result files. Each
+    output is timed as a span of ``metrics``, if given.
+    """
+
+    def wanted(output_format):
+        return formats is None or output_format in formats
+
+    try:
+        if export_paths is not None:
+            printC(f"Saved {export_paths['csv']} and {export_paths['jsonl']} ({rows_written} rows)", Fore.GREEN)
+
+        if wanted('html'):
+            with metrics_span(metrics, "html"):
+                try:
                     printC('Making HTML output file...', Fore.YELLOW)
-                    print("DataFrame before exporting to HTML:")
-                    print(all_results)
-                    html = all_results.to_html(index=False, formatters={'link': render_url}, escape=False)
-                    f.write(html)
-                    printC(f"Saved {filename_html}", Fore.GREEN)
-            except IOError as e:
-                print(f'Error making HTML file: {e}')
-                traceback.print_exc()
-
-            try:
-                printC('Exporting to csv...', Fore.YELLOW)
-                all_results.to_csv(filename_csv, index=False, encoding='utf-8')
-                printC(f"Saved {filename_csv}", Fore.GREEN)
-            except IOError as e:
-                print(f'Error making CSV: {e}')
-                traceback.print_exc()
-
-            try:
-                printC('Exporting to json...', Fore.YELLOW)
-                all_results.to_json(filename_json, orient='records', indent=4, force_ascii=False)
-                printC(f"Saved {filename_json}", Fore.GREEN)
-            except IOError as e:
-                print(f'Error making JSON: {e}')
-                traceback.print_exc()
-
-            plot_keyword_frequency(all_results, dataframes_dict, output_folder, now)
-
-            try:
-                printC('Generating .txt report...', Fore.YELLOW)
-                generate_txt_report(all_results, channels, search_term_groups, output_folder, now)
-                printC('Report .txt generated.', Fore.GREEN)
-            except Exception as e:
-                print(f'Error generating .txt report: {e}')
-                traceback.print_exc()
-
-        except ValueError:
-            printC('Error.', Fore.RED)
-            traceback.print_exc()
+                    write_html_from_csv(export_paths['csv'], export_paths['html'])
+                    printC(f"Saved {export_paths['html']}", Fore.GREEN)
+                except IOError as e:
+                    print(f'Error making HTML file: {e}')
+                    traceback.print_exc()
+
+        if wanted('json'):
+            with metrics_span(metrics, "json"):
+                try:
+                    printC('Exporting to json...', Fore.YELLOW)
+                    write_json_from_jsonl(export_paths['jsonl'], export_paths['json'])
+                    printC(f"Saved {export_paths['json']}", Fore.GREEN)
+                except IOError as e:
+                    print(f'Error making JSON: {e}')
+                    traceback.print_exc()
+
+        parquet_settings = resolve_parquet_settings()
+        parquet_wanted = parquet_settings.enabled if formats is None else 'parquet' in formats
+        if parquet_wanted:
+            with metrics_span(metrics, "parquet"):
+                try:
+                    printC('Exporting to parquet...', Fore.YELLOW)
+                    parquet_path = write_results_parquet(
+                        all_results,
+                        export_paths['parquet'],
+                        partitioned=parquet_settings.partitioned,
+                    )
+                    if parquet_path is None:
+                        printC('Skipped parquet export: pyarrow is not installed.', Fore.YELLOW)
+                    else:
+                        printC(f"Saved {parquet_path}", Fore.GREEN)
+                except (IOError, ValueError) as e:
+                    print(f'Error making parquet: {e}')
+                    traceback.print_exc()
+
+        if wanted('graphs'):
+            with metrics_span(metrics, "graphs"):
+                # matplotlib and reportlab are only imported once there is something to plot.
+                from .plotting import plot_keyword_frequency
+
+                plot_keyword_frequency(
+                    all_results, dataframes_dict, output_folder, now, total_daily_messages, metrics=metrics
+                )
+
+        if wanted('report'):
+            with metrics_span(metrics, "report"):
+                try:
+                    printC('Generating .txt report...', Fore.YELLOW)
+                    generate_txt_report(all_results, channels, search_term_groups, output_folder, now)
+                    printC('Report .txt generated.', Fore.GREEN)
+                except Exception as e:
+                    print(f'Error generating .txt report: {e}')
+                    traceback.print_exc()
 
     except ValueError:
         printC('Error.', Fore.RED)
-
-    printC('\nProcess completed', Fore.GREEN)
+        traceback.print_exc()
 
 
-async def download_queued_media(client, media_jobs, manifest_file, manifest_records, concurrency):
+async def download_queued_media(
+    client, media_jobs, manifest_file, manifest_records, concurrency, rate_limiter=None, stats=None
+):
     if not media_jobs:
         printC("No matching media files found for download.", Fore.YELLOW)
         return []
 
     printC(f"Downloading {len(media_jobs)} media files with concurrency {concurrency}...", Fore.YELLOW)
-    results = await download_media_queue(
-        client,
-        media_jobs,
-        max_concurrency=concurrency,
-        manifest_path=manifest_file,
-        manifest_records=manifest_records,
+    # Progress is counted in bytes: Telethon reports each file's bytes as they arrive, and files
+    # that finish without reporting them (duplicates and failures) are counted in full.
+    sizes = {(job.channel_id, job.message_id): media_file_size(job.message) for job in media_jobs}
+    received = Counter()
+    fields = []
+    if rate_limiter is not None:
+        fields.append(ProgressField("FloodWait", lambda: rate_limiter.flood_wait_seconds, kind=FIELD_SECONDS))
+    progress = ProgressDashboard(
+        sum(sizes.values()),
+        "Downloading media",
+        unit="B",
+        unit_scale=True,
+        fields=fields,
+        refresh_seconds=resolve_progress_refresh_seconds(),
     )
+
+    def report_bytes(key, current, downloaded=True):
+        received_now = max(current - received[key], 0)
+        received[key] += received_now
+        progress.update(received_now)
+        if stats is not None and downloaded:
+            stats.bytes_downloaded += received_now
+
+    def track_job(job):
+        key = (job.channel_id, job.message_id)
+        if job.progress_callback is not None:
+            return job
+        return replace(job, progress_callback=lambda current, total: report_bytes(key, current))
+
+    def report_result(result):
+        key = (result.job.channel_id, result.job.message_id)
+        report_bytes(key, sizes[key], downloaded=result.file_path is not None)
+        if stats is not None:
+            stats.finished += 1
+
+    with progress:
+        results = await download_media_queue(
+            client,
+            [track_job(job) for job in media_jobs],
+            max_concurrency=concurrency,
+            manifest_path=manifest_file,
+            manifest_records=manifest_records,
+            rate_limiter=rate_limiter,
+            result_callback=report_result,
+        )
     status_counts = Counter(result.status for result in results)
     summary = ", ".join(f"{status}: {count}" for status, count in sorted(status_counts.items()))
     printC(f"Media download summary: {summary}", Fore.GREEN)
     return results
 
 
+def media_file_size(message):
+    return getattr(getattr(message, "file", None), "size", None) or 0
+
+
+def print_rate_limiter_summary(rate_limiter, label=None):
+    prefix = f"{label}: " if label else ""
+    printC(
+        f"{prefix}Telegram requests: {rate_limiter.api_calls}, FloodWait pauses: {rate_limiter.flood_waits} "
+        f"({rate_limiter.flood_wait_seconds:.0f}s lost), final rate: {rate_limiter.rate:.2f} requests/s",
+        Fore.CYAN,
+    )
+
+
+def print_search_stats_summary(search_stats):
+    printC(
+        f"Fetched {search_stats.messages_fetched} messages in ~{search_stats.pages_fetched} pages over "
+        f"{search_stats.searches} searches. Date and checkpoint bounds skipped ~{search_stats.messages_saved} "
+        f"messages (~{search_stats.pages_saved} pages); {search_stats.stopped_early} searches stopped at the start date.",
+        Fore.CYAN,
+    )
+
+
 def _format_message_date(value):
     if hasattr(value, "isoformat"):
         return value.isoformat()
@@ -0,0 +1,334 @@
+"""On-disk SQLite archive of fetched Telegram messages, used as a read-through cache."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from .constants import ENV_FILE_PATH
+from .env import env_flag, env_int, read_env_file
+from .results import forward_origin
+
+
+MESSAGE_ARCHIVE_KEY = "MESSAGE_ARCHIVE"
+MESSAGE_ARCHIVE_PATH_KEY = "MESSAGE_ARCHIVE_PATH"
+MESSAGE_ARCHIVE_BATCH_SIZE_KEY = "MESSAGE_ARCHIVE_BATCH_SIZE"
+MESSAGE_ARCHIVE_MAX_MESSAGES_KEY = "MESSAGE_ARCHIVE_MAX_MESSAGES"
+MESSAGE_ARCHIVE_MAX_AGE_DAYS_KEY = "MESSAGE_ARCHIVE_MAX_AGE_DAYS"
+DEFAULT_MESSAGE_ARCHIVE_PATH = "TG-Archive/messages.sqlite3"
+DEFAULT_MESSAGE_ARCHIVE_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    text TEXT,
+    views INTEGER,
+    forwards INTEGER,
+    media TEXT,
+    archived_at REAL NOT NULL,
+    fwd_from_channel_id INTEGER,
+    fwd_from_message_id INTEGER,
+    PRIMARY KEY (channel_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS messages_date ON messages (date);
+CREATE TABLE IF NOT EXISTS scan_coverage (
+    channel_id INTEGER PRIMARY KEY,
+    covered_from TEXT,
+    max_message_id INTEGER NOT NULL
+);
+"""
+_FORWARD_COLUMNS = ("fwd_from_channel_id", "fwd_from_message_id")
+
+
+@dataclass(frozen=True)
+class ArchiveSettings:
+    enabled: bool = False
+    path: Path = Path(DEFAULT_MESSAGE_ARCHIVE_PATH)
+    batch_size: int = DEFAULT_MESSAGE_ARCHIVE_BATCH_SIZE
+    max_messages: int = 0
+    max_age_days: int = 0
+
+
+@dataclass(frozen=True)
+class ArchivedMessage:
+    """Message read back from the archive, exposing the attributes the search code uses."""
+
+    id: int
+    date: datetime
+    message: str | None
+    views: int | None = None
+    forwards: int | None = None
+    media_descriptor: dict | None = None
+    media: Any = None
+    fwd_from_channel_id: int | None = None
+    fwd_from_message_id: int | None = None
+
+
+@dataclass(frozen=True)
+class ScanCoverage:
+    channel_id: int
+    covered_from: str | None
+    max_message_id: int
+
+    def covers(self, start_date):
+        if self.covered_from is None:
+            return True
+        if start_date is None:
+            return False
+        return datetime.fromisoformat(self.covered_from) <= start_date
+
+
+def resolve_archive_settings(env_values=None, env_file_path=ENV_FILE_PATH, base_dir=None):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    configured_path = str((env_values or {}).get(MESSAGE_ARCHIVE_PATH_KEY) or "").strip()
+    path = Path(configured_path or DEFAULT_MESSAGE_ARCHIVE_PATH).expanduser()
+    if not path.is_absolute():
+        path = (Path(base_dir) if base_dir is not None else Path.cwd()) / path
+
+    return ArchiveSettings(
+        enabled=env_flag(env_values, MESSAGE_ARCHIVE_KEY),
+        path=path,
+        batch_size=env_int(env_values, MESSAGE_ARCHIVE_BATCH_SIZE_KEY, DEFAULT_MESSAGE_ARCHIVE_BATCH_SIZE, minimum=1),
+        max_messages=env_int(env_values, MESSAGE_ARCHIVE_MAX_MESSAGES_KEY, 0, minimum=0),
+        max_age_days=env_int(env_values, MESSAGE_ARCHIVE_MAX_AGE_DAYS_KEY, 0, minimum=0),
+    )
+
+
+def media_descriptor(message):
+    media = getattr(message, "media", None)
+    if media is None:
+        return None
+
+    descriptor = {"type": type(media).__name__}
+    file = getattr(message, "file", None)
+    for attribute in ("name", "mime_type", "size"):
+        value = getattr(file, attribute, None)
+        if value is not None:
+            descriptor[attribute] = value
+    return descriptor
+
+
+class MessageArchive:
+    """
+    SQLite archive keyed by (channel_id, message_id).
+
+    The database runs in WAL mode. Messages are buffered and written with one ``executemany``
+    per batch on a worker thread, so archiving never blocks the event loop. ``scan_coverage``
+    records, per channel, the newest message ID up to which the full history from
+    ``covered_from`` has been archived by local scans.
+    """
+
+    def __init__(self, path, *, batch_size=DEFAULT_MESSAGE_ARCHIVE_BATCH_SIZE, max_messages=0, max_age_days=0):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.max_messages = max_messages
+        self.max_age_days = max_age_days
+        self.messages_written = 0
+        self.messages_served = 0
+        self._pending = []
+        self._db_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        # Archives created before forwards were recorded get the origin columns added in place.
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(messages)")}
+        for column in _FORWARD_COLUMNS:
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE messages ADD COLUMN {column} INTEGER")
+        self._connection.commit()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            settings.path,
+            batch_size=settings.batch_size,
+            max_messages=settings.max_messages,
+            max_age_days=settings.max_age_days,
+        )
+
+    async def add_messages(self, channel_id, messages):
+        archived_at = time.time()
+        for message in messages:
+            if isinstance(message, ArchivedMessage):
+                continue
+            descriptor = media_descriptor(message)
+            fwd_from_channel_id, fwd_from_message_id = forward_origin(message)
+            self._pending.append(
+                (
+                    int(channel_id),
+                    int(message.id),
+                    message.date.isoformat(),
+                    getattr(message, "message", None),
+                    getattr(message, "views", None),
+                    getattr(message, "forwards", None),
+                    json.dumps(descriptor, ensure_ascii=False, default=str) if descriptor else None,
+                    archived_at,
+                    fwd_from_channel_id,
+                    fwd_from_message_id,
+                )
+            )
+
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, batch):
+        with self._db_lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO messages "
+                "(channel_id, message_id, date, text, views, forwards, media, archived_at, "
+                "fwd_from_channel_id, fwd_from_message_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            self._connection.commit()
+        self.messages_written += len(batch)
+
+    async def load_scan_coverage(self, channel_id, start_date=None):
+        """Run ``scan_coverage`` on a worker thread, like the writes, so a held lock never blocks the loop."""
+        return await asyncio.to_thread(self.scan_coverage, channel_id, start_date)
+
+    def scan_coverage(self, channel_id, start_date=None):
+        """Return the channel's scan coverage when it reaches back to ``start_date``."""
+        with self._db_lock:
+            row = self._connection.execute(
+                "SELECT channel_id, covered_from, max_message_id FROM scan_coverage WHERE channel_id = ?",
+                (int(channel_id),),
+            ).fetchone()
+
+        if row is None:
+            return None
+        coverage = ScanCoverage(*row)
+        return coverage if coverage.covers(start_date) else None
+
+    async def record_scan(self, channel_id, start_date, max_message_id):
+        """Mark the channel's history from ``start_date`` up to ``max_message_id`` as archived."""
+        await self.flush()
+        await asyncio.to_thread(self._record_scan, int(channel_id), start_date, max_message_id)
+
+    def _record_scan(self, channel_id, start_date, max_message_id):
+        existing = self.scan_coverage(channel_id, start_date)
+        covered_from = existing.covered_from if existing is not None else _format_date(start_date)
+        if existing is not None:
+            max_message_id = max(existing.max_message_id, max_message_id or 0)
+        if not max_message_id:
+            return
+
+        with self._db_lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO scan_coverage (channel_id, covered_from, max_message_id) VALUES (?, ?, ?)",
+                (channel_id, covered_from, max_message_id),
+            )
+            self._connection.commit()
+
+    async def load_channel_messages(self, channel_id, *, start_date=None, end_date=None, max_message_id=None):
+        """Return archived messages for a channel, newest first, within the date and ID bounds."""
+        messages = await asyncio.to_thread(
+            self._load_channel_messages,
+            int(channel_id),
+            start_date,
+            end_date,
+            max_message_id,
+        )
+        self.messages_served += len(messages)
+        return messages
+
+    def _load_channel_messages(self, channel_id, start_date, end_date, max_message_id):
+        query = (
+            "SELECT message_id, date, text, views, forwards, media, fwd_from_channel_id, fwd_from_message_id "
+            "FROM messages WHERE channel_id = ?"
+        )
+        parameters = [channel_id]
+        if max_message_id is not None:
+            query += " AND message_id <= ?"
+            parameters.append(max_message_id)
+        query += " ORDER BY message_id DESC"
+
+        with self._db_lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+
+        messages = []
+        for message_id, date, text, views, forwards, media, fwd_from_channel_id, fwd_from_message_id in rows:
+            message_date = datetime.fromisoformat(date)
+            if start_date is not None and message_date < start_date:
+                continue
+            if end_date is not None and message_date > end_date:
+                continue
+            messages.append(
+                ArchivedMessage(
+                    id=message_id,
+                    date=message_date,
+                    message=text,
+                    views=views,
+                    forwards=forwards,
+                    media_descriptor=json.loads(media) if media else None,
+                    fwd_from_channel_id=fwd_from_channel_id,
+                    fwd_from_message_id=fwd_from_message_id,
+                )
+            )
+        return messages
+
+    def evict(self, now=None):
+        """Apply the age and size limits, moving scan coverage forward past evicted history."""
+        now = now or datetime.now(timezone.utc)
+        evicted = 0
+
+        with self._db_lock:
+            if self.max_age_days:
+                cutoff = (now - timedelta(days=self.max_age_days)).isoformat()
+                evicted += self._connection.execute("DELETE FROM messages WHERE date < ?", (cutoff,)).rowcount
+
+            if self.max_messages:
+                total = self._connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+                excess = total - self.max_messages
+                if excess > 0:
+                    evicted += self._connection.execute(
+                        "DELETE FROM messages WHERE rowid IN (SELECT rowid FROM messages ORDER BY date LIMIT ?)",
+                        (excess,),
+                    ).rowcount
+
+            if evicted:
+                # Coverage may only claim history that is still archived.
+                self._connection.execute(
+                    "UPDATE scan_coverage SET covered_from = ("
+                    "SELECT MIN(date) FROM messages WHERE messages.channel_id = scan_coverage.channel_id"
+                    ") WHERE covered_from IS NULL OR covered_from < ("
+                    "SELECT MIN(date) FROM messages WHERE messages.channel_id = scan_coverage.channel_id)"
+                )
+                self._connection.execute(
+                    "DELETE FROM scan_coverage WHERE channel_id NOT IN (SELECT DISTINCT channel_id FROM messages)"
+                )
+            self._connection.commit()
+
+        return evicted
+
+    async def close(self):
+        await self.flush()
+        await asyncio.to_thread(self.evict)
+        with self._db_lock:
+            self._connection.close()
+
+
+def _format_date(value):
+    if value is None:
+        return None
+    return value.isoformat()
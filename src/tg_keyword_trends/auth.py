@@ -1,16 +1,23 @@
 import sys
 
 from colorama import Fore
-from telethon.errors import PasswordHashInvalidError, SessionPasswordNeededError
-from telethon import TelegramClient
 
+from .accounts import load_extra_accounts
 from .console import printC
-from .constants import ENV_FILE_PATH, TELEGRAM_2FA_PASSWORD_KEY, TELEGRAM_PHONE_KEY
-from .env import load_telegram_env_credentials, prompt_for_env_value, write_env_file
+from .constants import (
+    ENV_FILE_PATH,
+    TELEGRAM_2FA_PASSWORD_KEY,
+    TELEGRAM_API_HASH_KEY,
+    TELEGRAM_API_ID_KEY,
+    TELEGRAM_PHONE_KEY,
+)
+from .env import load_telegram_env_credentials, prompt_for_env_value, read_env_file, write_env_file
 
 
-async def sign_in_with_2fa_password(client, env_values):
-    password = env_values.get(TELEGRAM_2FA_PASSWORD_KEY, "")
+async def sign_in_with_2fa_password(client, env_values, password_key=TELEGRAM_2FA_PASSWORD_KEY):
+    from telethon.errors import PasswordHashInvalidError
+
+    password = env_values.get(password_key, "")
 
     for _ in range(2):
         if not password:
@@ -20,20 +27,21 @@ async def sign_in_with_2fa_password(client, env_values):
 
         try:
             await client.sign_in(password=password)
-            env_values[TELEGRAM_2FA_PASSWORD_KEY] = password
+            env_values[password_key] = password
             write_env_file(env_values)
             return
         except PasswordHashInvalidError:
             printC("The Telegram 2FA password was rejected.", Fore.RED)
             password = ""
 
-    sys.exit(f"Could not sign in. Please update {TELEGRAM_2FA_PASSWORD_KEY} in {ENV_FILE_PATH} and try again.")
+    sys.exit(f"Could not sign in. Please update {password_key} in {ENV_FILE_PATH} and try again.")
 
 
-async def connect_to_telegram():
+async def connect_to_telegram(account=None):
     """
      Connects to Telegram using credentials stored in '.env'.
      If credentials are missing, it prompts the user and saves them for future runs.
+     Pass a TelegramAccount to connect one of the extra accounts instead of the primary one.
 
      Returns:
          TelegramClient: A connected TelegramClient instance.
@@ -41,9 +49,19 @@ async def connect_to_telegram():
      Raises:
          SystemExit: If the connection to the Telegram client fails.
      """
-
-    print("Connecting to Telegram...")
-    env_values, api_id, api_hash, session_name = load_telegram_env_credentials()
+    # Telethon is imported here so runs that never connect (--help, --merge) start quickly.
+    from telethon import TelegramClient
+    from telethon.errors import SessionPasswordNeededError
+
+    if account is None:
+        print("Connecting to Telegram...")
+        env_values, api_id, api_hash, session_name = load_telegram_env_credentials()
+        phone_key, password_key = TELEGRAM_PHONE_KEY, TELEGRAM_2FA_PASSWORD_KEY
+    else:
+        print(f"Connecting Telegram account {account.name} ({account.session_name})...")
+        env_values = read_env_file()
+        api_id, api_hash, session_name = account.api_id, account.api_hash, account.session_name
+        phone_key, password_key = account.phone_key, account.password_key
     client = TelegramClient(session_name, api_id, api_hash)
 
     try:
@@ -52,7 +70,7 @@ async def connect_to_telegram():
         if not await client.is_user_authorized():
             phone = prompt_for_env_value(
                 env_values,
-                TELEGRAM_PHONE_KEY,
+                phone_key,
                 "Type your Telegram phone number, including country code: ",
             )
 
@@ -63,14 +81,37 @@ async def connect_to_telegram():
             try:
                 await client.sign_in(phone=phone, code=code)
             except SessionPasswordNeededError:
-                await sign_in_with_2fa_password(client, env_values)
+                await sign_in_with_2fa_password(client, env_values, password_key)
 
         if not await client.is_user_authorized():
             sys.exit(f"Error connecting to Telegram client. Please check credentials in {ENV_FILE_PATH}.")
 
+        # Login calls above keep Telethon's own FloodWait sleeping. From here on every request goes
+        # through the shared rate limiter, so FloodWait errors are surfaced to it instead.
+        client.flood_sleep_threshold = 0
         print("Connection to Telegram established.")
         print("Please wait...")
         return client
     except Exception:
         await client.disconnect()
         raise
+
+
+async def connect_extra_accounts():
+    """Connect every extra account configured in '.env' and return ``(account, client)`` pairs."""
+    env_values = read_env_file()
+    accounts = load_extra_accounts(
+        env_values,
+        default_api_id=env_values.get(TELEGRAM_API_ID_KEY),
+        default_api_hash=env_values.get(TELEGRAM_API_HASH_KEY),
+    )
+
+    connected = []
+    try:
+        for account in accounts:
+            connected.append((account, await connect_to_telegram(account)))
+    except BaseException:
+        for _, client in connected:
+            await client.disconnect()
+        raise
+    return connected
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Any, Callable
 
 from .files import open_file_dialog
@@ -22,6 +22,7 @@ class UnresolvedChannel:
 class ChannelSelection:
     targets: list[ChannelTarget]
     unresolved: list[UnresolvedChannel]
+    custom_list: bool = False
 
 
 def get_channel_id(entity):
@@ -58,14 +59,20 @@ async def target_from_dialog(client, dialog):
     )
 
 
-async def resolve_channel_entries(client, lines):
+async def get_entity(client, reference, rate_limiter=None):
+    if rate_limiter is None:
+        return await client.get_entity(reference)
+    return await rate_limiter.call(client.get_entity, reference)
+
+
+async def resolve_channel_entries(client, lines, rate_limiter=None):
     targets = []
     unresolved = []
 
     for line in content_lines(lines):
         try:
             reference = normalize_channel_entry(line)
-            entity = await client.get_entity(reference)
+            entity = await get_entity(client, reference, rate_limiter)
             targets.append(
                 ChannelTarget(
                     title=get_channel_title(entity, entity),
@@ -79,24 +86,65 @@ async def resolve_channel_entries(client, lines):
     return ChannelSelection(targets=targets, unresolved=unresolved)
 
 
+async def resolve_saved_channels(client, dialogs, saved_channels, rate_limiter=None):
+    """Resolve channels saved as ``{"title", "channel_id"}`` records, preferring the user's dialogs."""
+    from telethon.tl.types import PeerChannel
+
+    dialog_targets = {}
+    for dialog in dialogs:
+        if dialog.is_channel:
+            target = await target_from_dialog(client, dialog)
+            dialog_targets[str(target.channel_id)] = target
+
+    targets = []
+    unresolved = []
+    for saved_channel in saved_channels:
+        channel_id = saved_channel["channel_id"]
+        target = dialog_targets.get(str(channel_id))
+        if target is None:
+            try:
+                entity = await get_entity(client, PeerChannel(int(channel_id)), rate_limiter)
+                target = ChannelTarget(
+                    title=saved_channel.get("title") or get_channel_title(entity, entity),
+                    entity=entity,
+                    channel_id=get_channel_id(entity),
+                )
+            except Exception as exc:
+                unresolved.append(UnresolvedChannel(entry=str(channel_id), reason=str(exc)))
+                continue
+        targets.append(target)
+
+    return ChannelSelection(targets=targets, unresolved=unresolved)
+
+
 async def select_channels(
     client,
     dialogs,
     input_func: Callable[[str], str] = input,
     output_func: Callable[[str], None] = print,
     file_picker: Callable[[str], str] = open_file_dialog,
+    rate_limiter=None,
 ):
     use_custom_list = input_func("Use a custom channel list? (yes/no): ").strip().lower()
 
     if use_custom_list not in {"yes", "y"}:
-        return ChannelSelection(
-            targets=[await target_from_dialog(client, dialog) for dialog in dialogs if dialog.is_channel],
-            unresolved=[],
-        )
+        return await followed_channel_selection(client, dialogs)
 
     channel_list_file = file_picker("Select the channel list .txt file")
     with open(channel_list_file, "r", encoding="utf-8") as file:
-        selection = await resolve_channel_entries(client, file.readlines())
+        return await select_listed_channels(client, file.readlines(), output_func, rate_limiter)
+
+
+async def followed_channel_selection(client, dialogs):
+    return ChannelSelection(
+        targets=[await target_from_dialog(client, dialog) for dialog in dialogs if dialog.is_channel],
+        unresolved=[],
+    )
+
+
+async def select_listed_channels(client, lines, output_func: Callable[[str], None] = print, rate_limiter=None):
+    """Resolve a custom channel list, reporting entries that fail and requiring at least one match."""
+    selection = await resolve_channel_entries(client, lines, rate_limiter)
 
     for unresolved in selection.unresolved:
         output_func(f"Could not resolve channel '{unresolved.entry}': {unresolved.reason}")
@@ -104,4 +152,4 @@ async def select_channels(
     if not selection.targets:
         raise ValueError("No channels from the custom channel list could be resolved.")
 
-    return selection
+    return replace(selection, custom_list=True)
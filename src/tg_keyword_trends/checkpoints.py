@@ -0,0 +1,209 @@
+"""Persistent per-(channel, term) high-water marks for incremental re-runs."""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .constants import ENV_FILE_PATH
+from .env import env_flag, read_env_file
+
+
+SEARCH_CHECKPOINTS_KEY = "SEARCH_CHECKPOINTS"
+CHECKPOINT_DIR_KEY = "CHECKPOINT_DIR"
+DEFAULT_CHECKPOINT_DIR = "TG-Checkpoints"
+CHECKPOINTS_FILENAME = "search_checkpoints.json"
+CHECKPOINT_RESULTS_FILENAME = "checkpoint_results.jsonl"
+CHECKPOINTS_VERSION = 1
+
+
+@dataclass(frozen=True)
+class SearchCheckpoint:
+    channel_id: str
+    search_term: str
+    search_filter: str
+    max_message_id: int | None
+    covered_from: str | None
+    updated_at: str
+
+    @property
+    def key(self):
+        return checkpoint_key(self.channel_id, self.search_term, self.search_filter)
+
+    def covers(self, start_date):
+        """Return True when this checkpoint's stored results reach back to ``start_date``."""
+        if self.covered_from is None:
+            return True
+        if start_date is None:
+            return False
+        return datetime.fromisoformat(self.covered_from) <= start_date
+
+
+def checkpoint_key(channel_id, search_term, search_filter):
+    return (str(channel_id), str(search_term), str(search_filter))
+
+
+def checkpoints_enabled(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+    return env_flag(env_values, SEARCH_CHECKPOINTS_KEY)
+
+
+def resolve_checkpoint_dir(env_values=None, env_file_path=ENV_FILE_PATH, base_dir=None):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    configured_dir = str((env_values or {}).get(CHECKPOINT_DIR_KEY) or "").strip()
+    checkpoint_dir = Path(configured_dir or DEFAULT_CHECKPOINT_DIR).expanduser()
+    if checkpoint_dir.is_absolute():
+        return checkpoint_dir
+
+    root = Path(base_dir) if base_dir is not None else Path.cwd()
+    return root / checkpoint_dir
+
+
+class SearchCheckpointStore:
+    """
+    High-water marks and previously matched rows for each (channel, search term, filter).
+
+    ``search_checkpoints.json`` holds the highest matched message ID per key and the earliest
+    date its results cover. Matched rows are appended to ``checkpoint_results.jsonl`` as each
+    unit finishes, so a later run can fetch only messages newer than the mark and merge them
+    with the stored rows.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.checkpoints = {}
+        self._rows = {}
+        self._row_ids = {}
+
+    @property
+    def checkpoints_path(self):
+        return self.directory / CHECKPOINTS_FILENAME
+
+    @property
+    def results_path(self):
+        return self.directory / CHECKPOINT_RESULTS_FILENAME
+
+    @classmethod
+    def load(cls, directory):
+        store = cls(directory)
+
+        if store.checkpoints_path.exists():
+            with store.checkpoints_path.open("r", encoding="utf-8") as checkpoints_file:
+                payload = json.load(checkpoints_file)
+            for record in payload.get("checkpoints", []):
+                checkpoint = SearchCheckpoint(**record)
+                store.checkpoints[checkpoint.key] = checkpoint
+
+        if store.results_path.exists():
+            with store.results_path.open("r", encoding="utf-8") as results_file:
+                for line_number, raw_line in enumerate(results_file, start=1):
+                    line = raw_line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        raise ValueError(f"Invalid checkpoint results JSON on line {line_number}: {exc.msg}") from exc
+                    key = checkpoint_key(record["channel_id"], record["search_term"], record.pop("search_filter"))
+                    store._remember_row(key, record)
+
+        return store
+
+    def _remember_row(self, key, row):
+        row_ids = self._row_ids.setdefault(key, set())
+        message_id = row.get("message_id")
+        if message_id in row_ids:
+            return False
+        row_ids.add(message_id)
+        self._rows.setdefault(key, []).append(row)
+        return True
+
+    def usable_checkpoint(self, channel_id, search_term, search_filter, start_date=None):
+        checkpoint = self.checkpoints.get(checkpoint_key(channel_id, search_term, search_filter))
+        if checkpoint is None or not checkpoint.covers(start_date):
+            return None
+        return checkpoint
+
+    def min_id_for(self, channel_id, search_term, search_filter, start_date=None):
+        """Return the ``min_id`` to search from, or None when the whole range must be searched."""
+        checkpoint = self.usable_checkpoint(channel_id, search_term, search_filter, start_date)
+        if checkpoint is None:
+            return None
+        return checkpoint.max_message_id
+
+    def stored_rows(self, channel_id, search_term, search_filter, start_date=None, end_date=None):
+        if self.usable_checkpoint(channel_id, search_term, search_filter, start_date) is None:
+            return []
+
+        rows = []
+        for row in self._rows.get(checkpoint_key(channel_id, search_term, search_filter), []):
+            row_time = datetime.fromisoformat(row["time"])
+            if (start_date is None or row_time >= start_date) and (end_date is None or row_time <= end_date):
+                rows.append({**row, "time": row_time})
+        return rows
+
+    def record_results(self, channel_id, search_term, search_filter, rows, start_date=None):
+        """
+        Append newly matched rows and advance the high-water mark for one unit.
+
+        Rows must carry ``channel_id``, ``search_term``, ``message_id`` and ``time``. The mark
+        is the highest matched ID, so any later match, including one after a past end date,
+        is still newer than it.
+        """
+        key = checkpoint_key(channel_id, search_term, search_filter)
+        existing = self.usable_checkpoint(channel_id, search_term, search_filter, start_date)
+
+        new_records = []
+        for row in rows:
+            stored_row = {**row, "time": _format_time(row["time"])}
+            if self._remember_row(key, stored_row):
+                new_records.append(stored_row)
+
+        if new_records:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self.results_path.open("a", encoding="utf-8") as results_file:
+                for record in new_records:
+                    json.dump({**record, "search_filter": key[2]}, results_file, ensure_ascii=False, default=str)
+                    results_file.write("\n")
+
+        message_ids = [row["message_id"] for row in rows]
+        updated_at = datetime.now(timezone.utc).isoformat()
+        if existing is not None:
+            checkpoint = replace(
+                existing,
+                max_message_id=max([existing.max_message_id or 0, *message_ids]) or None,
+                updated_at=updated_at,
+            )
+        else:
+            checkpoint = SearchCheckpoint(
+                channel_id=key[0],
+                search_term=key[1],
+                search_filter=key[2],
+                max_message_id=max(message_ids) if message_ids else None,
+                covered_from=_format_time(start_date) if start_date is not None else None,
+                updated_at=updated_at,
+            )
+        self.checkpoints[key] = checkpoint
+
+    def save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": CHECKPOINTS_VERSION,
+            "checkpoints": [asdict(checkpoint) for checkpoint in self.checkpoints.values()],
+        }
+        temporary_path = self.checkpoints_path.with_suffix(".json.tmp")
+        with temporary_path.open("w", encoding="utf-8") as checkpoints_file:
+            json.dump(payload, checkpoints_file, ensure_ascii=False, indent=2)
+        os.replace(temporary_path, self.checkpoints_path)
+
+
+def _format_time(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,161 @@
+"""Count-only runs: daily match histograms from server-reported search totals instead of messages."""
+
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+
+from .activity import activity_days
+from .results import RESULT_COLUMNS, RESULT_COUNT_COLUMN
+from .search import count_search_matches
+
+
+COUNT_COLUMNS = ["date", "channel_id", "channel_title", "search_groups", "search_term", "count"]
+# Result rows of count-only runs: one per channel, term and day, with the day's matches in ``count``.
+COUNT_RESULT_COLUMNS = [*RESULT_COLUMNS, RESULT_COUNT_COLUMN]
+
+
+@dataclass
+class CountStats:
+    requests: int = 0
+    days: int = 0
+
+
+@dataclass(frozen=True)
+class UnitCounts:
+    unit: object
+    counts: dict
+
+
+async def first_message_date(client, entity, rate_limiter=None):
+    """Return the date of the channel's oldest message, or None for an empty channel."""
+    kwargs = {"limit": 1, "reverse": True}
+    if rate_limiter is None:
+        messages = await client.get_messages(entity, **kwargs)
+    else:
+        messages = await rate_limiter.call(client.get_messages, entity, **kwargs)
+    return messages[0].date if messages else None
+
+
+async def daily_match_counts(client, entity, search_term, days, *, rate_limiter=None, stats=None):
+    """
+    Return ``{day: matches}`` for the days in a consecutive run of ``days`` that have any matches.
+
+    A window's count is the difference between the totals before its first and after its last
+    midnight. Windows are halved only while they contain matches, so a term costs a couple of
+    requests per day with matches (plus a few per empty stretch) instead of one per match.
+    """
+    totals_before = {}
+
+    async def matches_before(day):
+        if day not in totals_before:
+            totals_before[day] = await count_search_matches(
+                client,
+                entity,
+                search_term,
+                offset_date=datetime.combine(day, time.min, tzinfo=timezone.utc),
+                rate_limiter=rate_limiter,
+            )
+            if stats is not None:
+                stats.requests += 1
+        return totals_before[day]
+
+    counts = {}
+
+    async def count_window(first, last):
+        matches = await matches_before(days[last] + timedelta(days=1)) - await matches_before(days[first])
+        if matches <= 0:
+            return
+        if first == last:
+            counts[days[first]] = matches
+            return
+        middle = (first + last) // 2
+        await count_window(first, middle)
+        await count_window(middle + 1, last)
+
+    if days:
+        await count_window(0, len(days) - 1)
+    if stats is not None:
+        stats.days += len(days)
+    return counts
+
+
+async def count_unit(client, unit, *, start_date=None, end_date=None, rate_limiter=None, stats=None, today=None):
+    """
+    Count one (channel, term) unit per day over the date range.
+
+    An open start begins at the channel's first message and an open end finishes today (UTC).
+    """
+    entity = unit.channel.entity
+    if start_date is None:
+        start_date = await first_message_date(client, entity, rate_limiter)
+        if stats is not None:
+            stats.requests += 1
+        if start_date is None:
+            return UnitCounts(unit=unit, counts={})
+    days = activity_days(start_date, end_date or datetime.combine(today or datetime.now(timezone.utc).date(), time.min))
+    counts = await daily_match_counts(client, entity, unit.search_term, days, rate_limiter=rate_limiter, stats=stats)
+    return UnitCounts(unit=unit, counts=counts)
+
+
+def count_rows(unit_counts):
+    """
+    Return one result row per day with matches, dated at UTC midnight, with the matches in ``count``.
+
+    The rows have no message text or ID, but they have the shape the grouped views, graphs and
+    report expect; those weigh each row by its ``count`` (see ``results.result_counts``).
+    """
+    unit = unit_counts.unit
+    return [
+        {
+            "time": datetime.combine(day, time.min, tzinfo=timezone.utc),
+            "message": None,
+            "message_id": None,
+            "channel_id": unit.channel.channel_id,
+            "channel_title": unit.channel.title,
+            "search_group": unit.search_group.label,
+            "search_term": unit.search_term,
+            "link": None,
+            "term_mask": unit.term_mask,
+            RESULT_COUNT_COLUMN: matches,
+        }
+        for day, matches in sorted(unit_counts.counts.items())
+    ]
+
+
+class DailyCountWriter:
+    """Write ``daily_counts__<timestamp>.csv``: one line per channel, term and day with matches."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rows_written = 0
+        self._file = self.path.open("w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COUNT_COLUMNS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def write_counts(self, unit_counts):
+        unit = unit_counts.unit
+        labels = ", ".join(unit.term.group_labels) if unit.term is not None else unit.search_group.label
+        for day, matches in sorted(unit_counts.counts.items()):
+            self._writer.writerow(
+                [day.isoformat(), unit.channel.channel_id, unit.channel.title, labels, unit.search_term, matches]
+            )
+            self.rows_written += 1
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def daily_counts_path(output_folder, now):
+    return Path(output_folder) / f"daily_counts__{now}.csv"
@@ -0,0 +1,250 @@
+"""Coordinator, worker and merge steps for runs split across machines through a work queue."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from colorama import Fore
+
+from .accounts import AccountShard, load_dialog_targets
+from .channels import ChannelTarget, resolve_saved_channels
+from .console import printC
+from .exports import StreamingResultWriter, resolve_result_writer_buffer_rows, result_export_paths
+from .files import create_output_directory
+from .inputs import SearchTermGroup
+from .journal import RunInputs
+from .results import ResultAccumulator, build_result_row, merge_message_rows, resolve_originals_only
+from .search import SearchStats, SearchUnit, build_rate_limiter, resolve_search_settings, search_unit_messages
+from .terms import compile_search_terms
+from .workqueue import WorkQueue, resolve_work_queue_settings
+
+
+RUN_INPUTS_QUEUE_KEY = "run_inputs"
+WORKER_POLL_SECONDS = 15
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def open_work_queue(queue_path):
+    lease_seconds, max_attempts = resolve_work_queue_settings()
+    return WorkQueue(queue_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+
+
+def build_queue_jobs(channels, search_term_groups, start_date=None, end_date=None):
+    """
+    Return one ``(job_key, payload)`` pair per (channel, unique term) for the run's date range.
+
+    Terms are compiled as for a local run, so a term listed in several groups is searched once;
+    its payload carries the term's ``term_mask`` and the first group that lists it.
+    """
+    date_range = [_format_time(start_date), _format_time(end_date)]
+    terms = compile_search_terms(search_term_groups).terms
+    jobs = []
+    for channel in channels:
+        for term in terms:
+            jobs.append(
+                (
+                    f"{channel.channel_id}|{term.key}|{date_range[0]}|{date_range[1]}",
+                    {
+                        "channel": {"title": channel.title, "channel_id": channel.channel_id},
+                        "search_group": term.group_labels[0],
+                        "search_term": term.search_term,
+                        "term_mask": term.mask,
+                        "start_date": date_range[0],
+                        "end_date": date_range[1],
+                    },
+                )
+            )
+    return jobs
+
+
+def publish_search_queue(queue_path, inputs, channels):
+    """Save the run's inputs in the queue and publish its (channel, term) units."""
+    queue = open_work_queue(queue_path)
+    try:
+        queue.set_run_value(RUN_INPUTS_QUEUE_KEY, inputs.to_record())
+        published = queue.publish(
+            build_queue_jobs(channels, inputs.search_term_groups, inputs.start_date, inputs.end_date)
+        )
+        return published, queue.counts()
+    finally:
+        queue.close()
+
+
+async def run_queue_worker(client, queue_path, worker_id=None, poll_seconds=WORKER_POLL_SECONDS):
+    """
+    Lease units from the queue until none are left, writing one result shard per unit.
+
+    While a unit is being searched its lease is renewed in the background. A worker that dies
+    stops renewing, and its unit goes back to the queue once the lease expires. When every
+    remaining unit is leased by someone else, the worker waits in case one of them is returned.
+    Queue calls can wait up to a minute for the shared file's lock, so they run on threads and
+    never stall the searches.
+    """
+    worker_id = worker_id or default_worker_id()
+    search_settings = resolve_search_settings()
+    shard = AccountShard(name=worker_id, client=client, rate_limiter=build_rate_limiter(search_settings))
+    await load_dialog_targets(shard)
+    search_stats = SearchStats()
+    completed = 0
+
+    queue = open_work_queue(queue_path)
+    try:
+        while True:
+            item = await asyncio.to_thread(queue.lease, worker_id)
+            if item is None:
+                if not await asyncio.to_thread(queue.has_open_jobs):
+                    break
+                await asyncio.sleep(poll_seconds)
+                continue
+
+            payload = item.payload
+            printC(f"Worker {worker_id} | {payload['channel']['title']} / {payload['search_term']}", Fore.CYAN)
+            heartbeat = asyncio.create_task(_renew_lease(queue, item))
+            try:
+                rows = await search_queue_job(shard, payload, stats=search_stats)
+            except Exception as exc:
+                await asyncio.to_thread(queue.fail, item, exc)
+                printC(f"Search failed and was returned to the queue: {exc}", Fore.RED)
+                continue
+            finally:
+                heartbeat.cancel()
+
+            if await asyncio.to_thread(queue.complete, item, rows):
+                completed += 1
+                printC(f"OK {len(rows)} results", Fore.GREEN)
+            else:
+                printC("Lease expired before the search finished; another worker will redo it.", Fore.YELLOW)
+    finally:
+        queue.close()
+
+    printC(
+        f"Worker {worker_id} finished {completed} units, fetching {search_stats.messages_fetched} messages.",
+        Fore.CYAN,
+    )
+    return completed
+
+
+async def _renew_lease(queue, item):
+    while True:
+        await asyncio.sleep(max(1, queue.lease_seconds / 3))
+        try:
+            renewed = await asyncio.to_thread(queue.heartbeat, item)
+        except (sqlite3.Error, OSError) as exc:
+            # A busy or briefly unreachable queue file must not end the renewals; the lease has
+            # two more intervals before it expires.
+            printC(f"Could not renew the lease, retrying: {exc}", Fore.YELLOW)
+            continue
+        if not renewed:
+            return
+
+
+async def search_queue_job(shard, payload, stats=None):
+    """Search the term of one queued (channel, term) unit and return its result rows."""
+    channel = shard.dialog_targets.get(str(payload["channel"]["channel_id"]))
+    if channel is None:
+        selection = await resolve_saved_channels(shard.client, [], [payload["channel"]], shard.rate_limiter)
+        if not selection.targets:
+            raise ValueError(f"Could not resolve channel {payload['channel']['channel_id']}: {selection.unresolved[0].reason}")
+        channel = selection.targets[0]
+        shard.dialog_targets[str(channel.channel_id)] = channel
+
+    search_group = SearchTermGroup(label=payload["search_group"], terms=(payload["search_term"],))
+    unit = SearchUnit(
+        index=0, channel_index=0, channel=channel, search_group=search_group, search_term=payload["search_term"]
+    )
+    result = await search_unit_messages(
+        shard.client,
+        unit,
+        start_date=_parse_time(payload["start_date"]),
+        end_date=_parse_time(payload["end_date"]),
+        rate_limiter=shard.rate_limiter,
+        stats=stats,
+    )
+    return [
+        build_result_row(message, channel, search_group.label, unit.search_term, term_mask=payload["term_mask"])
+        for message in result.messages
+    ]
+
+
+def merge_queue_results(queue_path, export_func, output_folder=None):
+    """
+    Combine the finished shards into the normal result files, graphs and report.
+
+    ``export_func`` is called like ``app.export_results``. Units that are still open or failed
+    are reported and left out. Units are queued per term, so a message found by several terms is
+    merged here into one row with every matched term in its ``term_mask``. Shards are read and
+    merged one channel at a time.
+    """
+    queue = open_work_queue(queue_path)
+    try:
+        record = queue.run_value(RUN_INPUTS_QUEUE_KEY)
+        if record is None:
+            raise ValueError(f"{queue_path} has no published run to merge.")
+        inputs = RunInputs.from_record(record)
+        counts = queue.counts()
+        if counts["pending"] or counts["leased"] or counts["failed"]:
+            printC(
+                f"Merging {counts['done']} finished units; {counts['pending'] + counts['leased']} still open and "
+                f"{counts['failed']} failed are not included.",
+                Fore.YELLOW,
+            )
+
+        output_folder = output_folder or create_output_directory(f'TG-Search_{inputs.now}')
+        export_paths = result_export_paths(output_folder, inputs.now)
+        compiled_terms = compile_search_terms(inputs.search_term_groups)
+        result_accumulator = ResultAccumulator()
+        with StreamingResultWriter(
+            export_paths['csv'],
+            export_paths['jsonl'],
+            buffer_rows=resolve_result_writer_buffer_rows(),
+        ) as result_writer:
+            channel_shards = {}
+            for payload, shard_name in queue.done_shards():
+                channel_shards.setdefault(str(payload["channel"]["channel_id"]), []).append(shard_name)
+            for shard_names in channel_shards.values():
+                rows = [
+                    {**row, "time": _parse_time(row["time"])}
+                    for shard_name in shard_names
+                    for row in queue.read_shard(shard_name)
+                ]
+                rows = merge_message_rows(rows, compiled_terms)
+                result_accumulator.append_rows(rows)
+                result_writer.write_rows(rows)
+    finally:
+        queue.close()
+
+    channels = [
+        ChannelTarget(title=channel["title"], entity=None, channel_id=channel["channel_id"])
+        for channel in inputs.channels
+    ]
+    export_func(
+        result_accumulator.to_frame(),
+        result_accumulator.groups(
+            (search_group.label for search_group in inputs.search_term_groups),
+            masks=compiled_terms.group_masks,
+            originals_only=resolve_originals_only(),
+        ),
+        channels,
+        inputs.search_term_groups,
+        output_folder,
+        inputs.now,
+        export_paths,
+        result_writer.rows_written,
+    )
+    return Path(output_folder)
+
+
+def _format_time(value):
+    return value.isoformat() if value is not None else None
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value is not None else None
@@ -145,3 +145,46 @@ def load_telegram_env_credentials():
     session_name = env_values[TELEGRAM_SESSION_KEY].strip()
 
     return env_values, api_id, api_hash, session_name
+
+
+def env_int(env_values, key, default, minimum=None):
+    raw_value = str((env_values or {}).get(key) or "").strip()
+    if not raw_value:
+        return default
+
+    try:
+        value = int(raw_value)
+    except ValueError as exc:
+        raise ValueError(f"{key} must be an integer.") from exc
+
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}.")
+
+    return value
+
+
+def env_float(env_values, key, default, minimum=None):
+    raw_value = str((env_values or {}).get(key) or "").strip()
+    if not raw_value:
+        return default
+
+    try:
+        value = float(raw_value)
+    except ValueError as exc:
+        raise ValueError(f"{key} must be a number.") from exc
+
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}.")
+
+    return value
+
+
+def env_flag(env_values, key, default=False):
+    raw_value = str((env_values or {}).get(key) or "").strip().lower()
+    if not raw_value:
+        return default
+    if raw_value in {"1", "true", "yes", "y", "on"}:
+        return True
+    if raw_value in {"0", "false", "no", "n", "off"}:
+        return False
+    raise ValueError(f"{key} must be yes or no.")
@@ -0,0 +1,244 @@
+"""Result exports written while the search runs, and the files derived from them afterwards."""
+
+from __future__ import annotations
+
+import csv
+import html
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from .constants import ENV_FILE_PATH
+from .env import env_flag, env_int, read_env_file
+from .files import render_url
+from .results import CATEGORICAL_COLUMNS, RESULT_COLUMNS
+
+
+RESULT_WRITER_BUFFER_ROWS_KEY = "RESULT_WRITER_BUFFER_ROWS"
+DEFAULT_RESULT_WRITER_BUFFER_ROWS = 1000
+RESULT_PARQUET_KEY = "RESULT_PARQUET"
+RESULT_PARQUET_PARTITIONED_KEY = "RESULT_PARQUET_PARTITIONED"
+PARQUET_PARTITION_COLUMNS = ["search_group", "month"]
+PLOTTING_COLUMNS = ["time", "message_id", "channel_id", "search_group", "search_term"]
+
+
+@dataclass(frozen=True)
+class ParquetSettings:
+    enabled: bool = False
+    partitioned: bool = False
+
+
+def resolve_result_writer_buffer_rows(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+    return env_int(env_values, RESULT_WRITER_BUFFER_ROWS_KEY, DEFAULT_RESULT_WRITER_BUFFER_ROWS, minimum=1)
+
+
+def resolve_parquet_settings(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+    return ParquetSettings(
+        enabled=env_flag(env_values, RESULT_PARQUET_KEY),
+        partitioned=env_flag(env_values, RESULT_PARQUET_PARTITIONED_KEY),
+    )
+
+
+def result_export_paths(output_folder, now):
+    output_folder = Path(output_folder)
+    return {
+        "csv": output_folder / f"all_results__{now}.csv",
+        "jsonl": output_folder / f"all_results__{now}.jsonl",
+        "html": output_folder / f"all_results__{now}.html",
+        "json": output_folder / f"all_results__{now}.json",
+        "parquet": output_folder / f"all_results__{now}.parquet",
+    }
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    return "" if value is None else value
+
+
+class StreamingResultWriter:
+    """
+    Append result rows to CSV and JSON Lines files as each search unit finishes.
+
+    Rows are buffered up to ``buffer_rows`` and then written and flushed, so an interrupted run
+    keeps every finished batch on disk without holding serialised copies of the full result set.
+    """
+
+    def __init__(self, csv_path, jsonl_path, *, columns=None, buffer_rows=DEFAULT_RESULT_WRITER_BUFFER_ROWS):
+        self.csv_path = Path(csv_path)
+        self.jsonl_path = Path(jsonl_path)
+        self.columns = list(columns or RESULT_COLUMNS)
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self._buffer = []
+
+        self.csv_path.parent.mkdir(parents=True, exist_ok=True)
+        self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        self._csv_file = self.csv_path.open("w", encoding="utf-8", newline="")
+        self._jsonl_file = self.jsonl_path.open("w", encoding="utf-8")
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(self.columns)
+        self._csv_file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def write_rows(self, rows):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            for row in rows:
+                self._csv_writer.writerow([_csv_value(row.get(column)) for column in self.columns])
+                record = {column: row.get(column) for column in self.columns}
+                json.dump(record, self._jsonl_file, ensure_ascii=False, default=_json_default)
+                self._jsonl_file.write("\n")
+            self.rows_written += len(rows)
+
+        self._csv_file.flush()
+        self._jsonl_file.flush()
+
+    def close(self):
+        if self._csv_file.closed:
+            return
+        self.flush()
+        self._csv_file.close()
+        self._jsonl_file.close()
+
+
+def rewrite_result_files(csv_path, jsonl_path, rows, *, columns=None, buffer_rows=DEFAULT_RESULT_WRITER_BUFFER_ROWS):
+    """
+    Replace the streamed CSV and JSON Lines files with ``rows`` and return how many were written.
+
+    Used once searches that streamed overlapping rows are merged. Both files are written next to
+    the originals and moved into place, so an interruption leaves the streamed files intact.
+    """
+    paths = [Path(csv_path), Path(jsonl_path)]
+    temporary_paths = [path.with_name(f"{path.name}.tmp") for path in paths]
+    with StreamingResultWriter(*temporary_paths, columns=columns, buffer_rows=buffer_rows) as writer:
+        for row in rows:
+            writer.write_rows((row,))
+    for temporary_path, path in zip(temporary_paths, paths):
+        os.replace(temporary_path, path)
+    return writer.rows_written
+
+
+def write_html_from_csv(csv_path, html_path, link_column="link"):
+    """Render the result CSV as an HTML table one row at a time, with clickable message links."""
+    with Path(csv_path).open("r", encoding="utf-8", newline="") as csv_file, Path(html_path).open(
+        "w", encoding="utf-8"
+    ) as html_file:
+        reader = csv.reader(csv_file)
+        columns = next(reader, [])
+
+        html_file.write('<table border="1" class="dataframe">\n  <thead>\n    <tr style="text-align: right;">\n')
+        for column in columns:
+            html_file.write(f"      <th>{html.escape(column)}</th>\n")
+        html_file.write("    </tr>\n  </thead>\n  <tbody>\n")
+
+        for values in reader:
+            html_file.write("    <tr>\n")
+            for column, value in zip(columns, values):
+                cell = render_url(value) if column == link_column and value else html.escape(value)
+                html_file.write(f"      <td>{cell}</td>\n")
+            html_file.write("    </tr>\n")
+
+        html_file.write("  </tbody>\n</table>")
+
+
+def write_json_from_jsonl(jsonl_path, json_path):
+    """Convert the JSON Lines results into one indented JSON array without loading them all."""
+    with Path(jsonl_path).open("r", encoding="utf-8") as jsonl_file, Path(json_path).open(
+        "w", encoding="utf-8"
+    ) as json_file:
+        json_file.write("[")
+        first = True
+        for line in jsonl_file:
+            if not line.strip():
+                continue
+            record = json.dumps(json.loads(line), ensure_ascii=False, indent=4)
+            json_file.write("\n" if first else ",\n")
+            json_file.write("\n".join(f"    {record_line}" for record_line in record.splitlines()))
+            first = False
+        json_file.write("\n]" if not first else "]")
+
+
+def results_to_arrow_frame(all_results):
+    """
+    Return a copy of the results with UTC timestamps, int64 IDs and categorical label columns.
+
+    ``term_mask`` is stored as int64 unless a run has more than 63 unique terms, in which case it
+    is stored as the decimal string of the mask.
+    """
+    import pandas as pd
+
+    frame = all_results.reindex(columns=RESULT_COLUMNS).copy()
+    frame["time"] = pd.to_datetime(frame["time"], errors="coerce", utc=True)
+    for column in ("message_id", "channel_id"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("Int64")
+    masks = [None if pd.isna(value) else int(value) for value in frame["term_mask"]]
+    if all(mask is None or mask < 2**63 for mask in masks):
+        frame["term_mask"] = pd.array(masks, dtype="Int64")
+    else:
+        frame["term_mask"] = [None if mask is None else str(mask) for mask in masks]
+    for column in CATEGORICAL_COLUMNS:
+        frame[column] = frame[column].astype("category")
+    return frame
+
+
+def write_results_parquet(all_results, path, partitioned=False):
+    """
+    Write the results as Parquet, or return None when pyarrow is not installed.
+
+    Label columns are stored dictionary-encoded. With ``partitioned`` the output is a directory
+    split into ``search_group=<label>/month=<YYYY-MM>`` folders.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+
+    frame = results_to_arrow_frame(all_results)
+    path = Path(path)
+
+    if partitioned:
+        frame["month"] = frame["time"].dt.strftime("%Y-%m").fillna("unknown")
+        frame["search_group"] = frame["search_group"].astype(str)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        pq.write_to_dataset(table, root_path=str(path), partition_cols=PARQUET_PARTITION_COLUMNS)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        pq.write_table(table, str(path))
+    return path
+
+
+def load_results_parquet(path, columns=None, search_groups=None):
+    """
+    Load Parquet results, reading only ``columns`` and, optionally, only some search groups.
+
+    ``PLOTTING_COLUMNS`` lists the columns the graphs use, which skips the message text.
+    """
+    import pandas as pd
+
+    filters = [("search_group", "in", list(search_groups))] if search_groups is not None else None
+    frame = pd.read_parquet(path, columns=columns, filters=filters)
+    if "month" in frame.columns and (columns is None or "month" not in columns):
+        frame = frame.drop(columns="month")
+    return frame
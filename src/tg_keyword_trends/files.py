@@ -1,7 +1,5 @@
 import os
 import sys
-import tkinter as tk
-from tkinter import filedialog
 
 from colorama import Fore
 
@@ -25,6 +23,9 @@ def open_file_dialog(title="Select the search terms file"):
    Returns:
        str: The path of the selected .txt file.
    """
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     root.wm_attributes('-topmost', True)
@@ -36,6 +37,9 @@ def open_file_dialog(title="Select the search terms file"):
 
 
 def open_folder_dialog():
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     root.wm_attributes('-topmost', True)
@@ -0,0 +1,237 @@
+"""Search jobs for unattended runs, read from a TOML/YAML job file or from command-line flags."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from .inputs import DATE_FORMAT, content_lines, parse_date_value, parse_search_term_groups
+
+
+JOB_FORMATS = ("html", "json", "parquet", "graphs", "report")
+JOB_KEYS = {
+    "name",
+    "search_terms_file",
+    "channels",
+    "channels_file",
+    "start_date",
+    "end_date",
+    "last_days",
+    "download_media",
+    "media_output_dir",
+    "output_dir",
+    "formats",
+    "count_only",
+}
+
+
+@dataclass(frozen=True)
+class SearchJob:
+    """
+    Everything a run would otherwise prompt for.
+
+    ``channels`` of None searches the account's followed channels. ``formats`` of None writes the
+    usual outputs, with Parquet controlled by ``RESULT_PARQUET``; otherwise only the listed
+    formats are written next to the CSV and JSON Lines files. ``count_only`` counts matches per
+    day from search totals instead of downloading them (see ``counts``).
+    """
+
+    name: str
+    search_terms_file: Path
+    channels: tuple[str, ...] | None = None
+    start_date: datetime | None = None
+    end_date: datetime | None = None
+    download_media: bool = False
+    media_output_dir: Path | None = None
+    output_dir: Path | None = None
+    formats: frozenset[str] | None = None
+    count_only: bool = False
+
+    @property
+    def run_suffix(self):
+        return re.sub(r"[^A-Za-z0-9_-]+", "-", self.name).strip("-") or "job"
+
+
+def load_job_file(path, today=None):
+    """
+    Return the jobs in a TOML or YAML job file.
+
+    Top-level keys apply to every job in the ``jobs`` list, and a file without ``jobs`` is one
+    job. Relative paths are resolved from the job file's folder. YAML files need PyYAML.
+    """
+    path = Path(path)
+    if path.suffix.lower() in {".yaml", ".yml"}:
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ValueError("YAML job files need PyYAML; install it or use a .toml job file.") from exc
+        with path.open("r", encoding="utf-8") as job_file:
+            record = yaml.safe_load(job_file) or {}
+    else:
+        import tomllib
+
+        with path.open("rb") as job_file:
+            try:
+                record = tomllib.load(job_file)
+            except tomllib.TOMLDecodeError as exc:
+                raise ValueError(f"Invalid job file {path}: {exc}") from exc
+
+    if not isinstance(record, dict):
+        raise ValueError(f"Job file {path} must contain a table of settings.")
+
+    defaults = dict(record)
+    job_records = defaults.pop("jobs", None)
+    if job_records is None:
+        job_records = [{}]
+    if not isinstance(job_records, list) or not job_records:
+        raise ValueError(f"'jobs' in {path} must be a non-empty list of tables.")
+
+    jobs = [
+        parse_job(_with_defaults(job_record, defaults), base_dir=path.parent, index=index, today=today)
+        for index, job_record in enumerate(job_records, start=1)
+    ]
+    names = [job.name for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Job names must be unique: {', '.join(duplicates)}")
+    return jobs
+
+
+def parse_job(record, base_dir=None, index=1, today=None):
+    """Build a ``SearchJob`` from one job's settings, raising ValueError for anything invalid."""
+    unknown = sorted(set(record) - JOB_KEYS)
+    name = str(record.get("name") or f"job{index}")
+    if unknown:
+        raise ValueError(f"Job {name!r} has unknown settings: {', '.join(unknown)}")
+
+    base_dir = Path(base_dir or Path.cwd())
+    if not record.get("search_terms_file"):
+        raise ValueError(f"Job {name!r} needs a search_terms_file.")
+
+    channels = None
+    if record.get("channels") is not None or record.get("channels_file"):
+        entries = record.get("channels") or []
+        if isinstance(entries, str):
+            entries = [entries]
+        entries = [str(entry) for entry in entries]
+        if record.get("channels_file"):
+            with _job_path(record["channels_file"], base_dir).open("r", encoding="utf-8") as channels_file:
+                entries.extend(channels_file.read().splitlines())
+        channels = tuple(content_lines(entries))
+        if not channels:
+            raise ValueError(f"Job {name!r} lists no channels.")
+
+    start_date = _job_date(record.get("start_date"), name)
+    end_date = _job_date(record.get("end_date"), name, is_end=True)
+    if record.get("last_days") is not None:
+        if start_date is not None:
+            raise ValueError(f"Job {name!r} sets both start_date and last_days.")
+        last_days = int(record["last_days"])
+        if last_days < 1:
+            raise ValueError(f"Job {name!r} last_days must be at least 1.")
+        today = today or datetime.now(timezone.utc).date()
+        start_date = _job_date(today - timedelta(days=last_days), name)
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise ValueError(f"Job {name!r} start date must be on or before its end date.")
+
+    formats = None
+    if record.get("formats") is not None:
+        formats = record["formats"]
+        if isinstance(formats, str):
+            formats = formats.split(",")
+        formats = frozenset(str(value).strip().lower() for value in formats if str(value).strip())
+        unknown_formats = sorted(formats - set(JOB_FORMATS))
+        if unknown_formats:
+            raise ValueError(
+                f"Job {name!r} has unknown formats: {', '.join(unknown_formats)} (choose from {', '.join(JOB_FORMATS)})"
+            )
+
+    download_media = _job_flag(record.get("download_media", False), name, "download_media")
+    count_only = _job_flag(record.get("count_only", False), name, "count_only")
+    if count_only and download_media:
+        raise ValueError(f"Job {name!r} cannot download media in a count_only run.")
+
+    return SearchJob(
+        name=name,
+        search_terms_file=_job_path(record["search_terms_file"], base_dir),
+        channels=channels,
+        start_date=start_date,
+        end_date=end_date,
+        download_media=download_media,
+        media_output_dir=_job_path(record["media_output_dir"], base_dir) if record.get("media_output_dir") else None,
+        output_dir=_job_path(record["output_dir"], base_dir) if record.get("output_dir") else None,
+        formats=formats,
+        count_only=count_only,
+    )
+
+
+def job_from_args(args, today=None):
+    """Build a single job from the ``--terms`` family of command-line flags."""
+    record = {
+        "name": "cli",
+        "search_terms_file": args.terms,
+        "channels": args.channel,
+        "channels_file": args.channels_file,
+        "start_date": args.start_date,
+        "end_date": args.end_date,
+        "last_days": args.last_days,
+        "download_media": args.download_media,
+        "media_output_dir": args.media_dir,
+        "output_dir": args.output_dir,
+        "formats": args.formats,
+        "count_only": args.count_only,
+    }
+    return parse_job({key: value for key, value in record.items() if value is not None}, today=today)
+
+
+def load_job_search_terms(job):
+    """Return the job's search term lines, failing instead of prompting when the file is unusable."""
+    if not job.search_terms_file.exists():
+        raise ValueError(f"Search terms file {job.search_terms_file} does not exist.")
+    with job.search_terms_file.open("r", encoding="utf-8") as terms_file:
+        search_terms = terms_file.read().splitlines()
+    if not parse_search_term_groups(search_terms):
+        raise ValueError(f"Search terms file {job.search_terms_file} does not contain any active search terms.")
+    return search_terms
+
+
+def _with_defaults(job_record, defaults):
+    if not isinstance(job_record, dict):
+        raise ValueError("Each entry in 'jobs' must be a table of settings.")
+    defaults = dict(defaults)
+    # A job's own start bound replaces the default one, whichever way either is written.
+    if "start_date" in job_record:
+        defaults.pop("last_days", None)
+    if "last_days" in job_record:
+        defaults.pop("start_date", None)
+    return {**defaults, **job_record}
+
+
+def _job_path(value, base_dir):
+    path = Path(str(value)).expanduser()
+    return path if path.is_absolute() else Path(base_dir) / path
+
+
+def _job_date(value, name, is_end=False):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        value = value.strftime(DATE_FORMAT)
+    try:
+        return parse_date_value(str(value), is_end=is_end)
+    except ValueError as exc:
+        raise ValueError(f"Job {name!r}: {exc}") from exc
+
+
+def _job_flag(value, name, key):
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in {"1", "true", "yes", "y", "on"}:
+        return True
+    if str(value).strip().lower() in {"0", "false", "no", "n", "off", ""}:
+        return False
+    raise ValueError(f"Job {name!r} {key} must be true or false.")
@@ -0,0 +1,235 @@
+"""Crash-safe journal of finished search units, used to resume an interrupted run."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from .inputs import SearchTermGroup
+
+
+RUN_INPUTS_FILENAME = "run_inputs.json"
+RUN_JOURNAL_FILENAME = "run_journal.jsonl"
+RUN_JOURNAL_VERSION = 1
+# Finished units are flushed to the OS at once but synced to disk at most this often.
+RUN_JOURNAL_SYNC_SECONDS = 1.0
+
+
+def search_terms_sha256(lines):
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def journal_unit_key(channel_id, search_group, search_term):
+    return (str(channel_id), str(search_group), str(search_term))
+
+
+@dataclass(frozen=True)
+class RunInputs:
+    """The choices a run was started with, saved so ``--resume`` can repeat them without prompting."""
+
+    now: str
+    search_terms_file: str
+    search_terms_sha256: str
+    search_term_groups: list[SearchTermGroup]
+    channels: list[dict]
+    start_date: datetime | None
+    end_date: datetime | None
+    download_media: bool = False
+    version: int = RUN_JOURNAL_VERSION
+
+    def to_record(self):
+        return {
+            "version": self.version,
+            "now": self.now,
+            "search_terms_file": self.search_terms_file,
+            "search_terms_sha256": self.search_terms_sha256,
+            "search_term_groups": [
+                {"label": group.label, "terms": list(group.terms)} for group in self.search_term_groups
+            ],
+            "channels": self.channels,
+            "start_date": _format_time(self.start_date),
+            "end_date": _format_time(self.end_date),
+            "download_media": self.download_media,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(
+            now=record["now"],
+            search_terms_file=record["search_terms_file"],
+            search_terms_sha256=record["search_terms_sha256"],
+            search_term_groups=[
+                SearchTermGroup(label=group["label"], terms=tuple(group["terms"]))
+                for group in record["search_term_groups"]
+            ],
+            channels=record["channels"],
+            start_date=_parse_time(record.get("start_date")),
+            end_date=_parse_time(record.get("end_date")),
+            download_media=bool(record.get("download_media", False)),
+            version=record.get("version", RUN_JOURNAL_VERSION),
+        )
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    channel_id: str
+    search_group: str
+    search_term: str
+    search_filter: str
+    new_results: int
+    rows: list = field(default_factory=list)
+
+    @property
+    def key(self):
+        return journal_unit_key(self.channel_id, self.search_group, self.search_term)
+
+
+class RunJournal:
+    """
+    Append-only record of finished (channel, search term) units in a run's output folder.
+
+    ``run_inputs.json`` holds the run's inputs. Each finished unit is appended to
+    ``run_journal.jsonl`` with its result rows and flushed before the next unit is processed, so
+    a crashed process loses at most the unit that was being written. Syncs to disk are batched
+    to one per ``sync_seconds``, bounding what a power loss can take. A truncated last line is
+    ignored when the journal is loaded.
+
+    Only the keys of finished units are kept in memory; ``iter_entries`` reads their rows back
+    from the file when a run is resumed.
+    """
+
+    def __init__(self, directory, *, sync_seconds=RUN_JOURNAL_SYNC_SECONDS, clock=time.monotonic):
+        self.directory = Path(directory)
+        self.completed_units = set()
+        self.sync_seconds = sync_seconds
+        self._clock = clock
+        self._synced_at = None
+        self._journal_file = None
+
+    @property
+    def inputs_path(self):
+        return self.directory / RUN_INPUTS_FILENAME
+
+    @property
+    def journal_path(self):
+        return self.directory / RUN_JOURNAL_FILENAME
+
+    @classmethod
+    def load(cls, directory):
+        journal = cls(directory)
+        if not journal.journal_path.exists():
+            return journal
+
+        with journal.journal_path.open("r", encoding="utf-8") as journal_file:
+            lines = journal_file.readlines()
+
+        for line_number, raw_line in enumerate(lines, start=1):
+            line = raw_line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                if line_number == len(lines):
+                    # The run stopped while writing this line; drop it so new entries start cleanly.
+                    os.truncate(journal.journal_path, len("".join(lines[:-1]).encode("utf-8")))
+                    break
+                raise ValueError(f"Invalid run journal JSON on line {line_number}: {exc.msg}") from exc
+
+            if line_number == len(lines) and not raw_line.endswith("\n"):
+                with journal.journal_path.open("a", encoding="utf-8") as journal_file:
+                    journal_file.write("\n")
+
+            journal.completed_units.add(
+                journal_unit_key(record["channel_id"], record["search_group"], record["search_term"])
+            )
+
+        return journal
+
+    def iter_entries(self):
+        """Yield each finished unit with its rows, reading the journal one line at a time."""
+        if not self.journal_path.exists():
+            return
+
+        seen = set()
+        with self.journal_path.open("r", encoding="utf-8") as journal_file:
+            for line in journal_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Only an unfinished last line can be invalid once ``load`` has checked the file.
+                    break
+                rows = [{**row, "time": _parse_time(row["time"])} for row in record.pop("rows", [])]
+                entry = JournalEntry(rows=rows, **record)
+                if entry.key not in seen:
+                    seen.add(entry.key)
+                    yield entry
+
+    def save_inputs(self, inputs):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.inputs_path.with_suffix(".json.tmp")
+        with temporary_path.open("w", encoding="utf-8") as inputs_file:
+            json.dump(inputs.to_record(), inputs_file, ensure_ascii=False, indent=2)
+        os.replace(temporary_path, self.inputs_path)
+
+    def load_inputs(self):
+        if not self.inputs_path.exists():
+            raise ValueError(f"No {RUN_INPUTS_FILENAME} found in {self.directory}; it cannot be resumed.")
+        with self.inputs_path.open("r", encoding="utf-8") as inputs_file:
+            return RunInputs.from_record(json.load(inputs_file))
+
+    def completed(self, channel_id, search_group, search_term):
+        return journal_unit_key(channel_id, search_group, search_term) in self.completed_units
+
+    def record_unit(self, channel_id, search_group, search_term, search_filter, rows, new_results=None):
+        if self._journal_file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._journal_file = self.journal_path.open("a", encoding="utf-8")
+            self._synced_at = self._clock()
+
+        record = {
+            "channel_id": str(channel_id),
+            "search_group": str(search_group),
+            "search_term": str(search_term),
+            "search_filter": str(search_filter),
+            "new_results": len(rows) if new_results is None else new_results,
+            "rows": [{**row, "time": _format_time(row["time"])} for row in rows],
+        }
+        self._journal_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._journal_file.flush()
+        if self._clock() - self._synced_at >= self.sync_seconds:
+            self.sync()
+        self.completed_units.add(journal_unit_key(channel_id, search_group, search_term))
+
+    def sync(self):
+        if self._journal_file is not None:
+            os.fsync(self._journal_file.fileno())
+            self._synced_at = self._clock()
+
+    def close(self):
+        if self._journal_file is not None:
+            self.sync()
+            self._journal_file.close()
+            self._journal_file = None
+
+
+def _format_time(value):
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    return datetime.fromisoformat(value)
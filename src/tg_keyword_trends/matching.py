@@ -0,0 +1,94 @@
+"""Local multi-term matching for single-pass channel scans."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable
+
+
+def normalize_match_text(text: str) -> str:
+    """Casefold text and collapse runs of whitespace so terms and messages compare alike."""
+    return " ".join(str(text).casefold().split())
+
+
+def is_word_character(character: str) -> bool:
+    return character.isalnum() or character == "_"
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton over a fixed list of search terms.
+
+    ``match`` walks a message once and reports every term it contains, including terms that
+    overlap or nest inside each other, so the cost per message does not grow with the term count.
+    Like Telegram's word-based server search, a term only matches where a word starts, and its last
+    word may be the start of a longer word, so "бахмут" matches "Бахмутом" but "he" does not match
+    "the". Telegram's own word-form handling (e.g. other stems) is not reproduced.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = tuple(terms)
+        self._lengths = [len(normalize_match_text(term)) for term in self.terms]
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[frozenset[int]] = [frozenset()]
+
+        for index, term in enumerate(self.terms):
+            self._add_term(index, normalize_match_text(term))
+        self._build_failure_links()
+
+    def _add_term(self, index: int, term: str) -> None:
+        if not term:
+            return
+
+        state = 0
+        for character in term:
+            next_state = self._goto[state].get(character)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(frozenset())
+                self._goto[state][character] = next_state
+            state = next_state
+
+        self._output[state] = self._output[state] | {index}
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and character not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+
+                self._fail[next_state] = self._goto[fallback].get(character, 0)
+                self._output[next_state] = self._output[next_state] | self._output[self._fail[next_state]]
+
+    def match(self, text: str | None) -> set[int]:
+        """Return the indexes of every term found in ``text``."""
+        if not text:
+            return set()
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        lengths = self._lengths
+        found: set[int] = set()
+        state = 0
+        text = normalize_match_text(text)
+
+        for position, character in enumerate(text):
+            while state and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            for index in output[state]:
+                start = position - lengths[index] + 1
+                if start == 0 or not is_word_character(text[start - 1]):
+                    found.add(index)
+
+        return found
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Mapping
@@ -16,6 +16,8 @@ MEDIA_DOWNLOAD_CONCURRENCY_KEY = "MEDIA_DOWNLOAD_CONCURRENCY"
 DEFAULT_MEDIA_OUTPUT_DIR = "TG-Media"
 DEFAULT_MEDIA_MANIFEST_FILENAME = "media_manifest.jsonl"
 DEFAULT_MEDIA_DOWNLOAD_CONCURRENCY = 3
+# Telegram returns at most 100 messages for one request by ID.
+REFETCH_BATCH_SIZE = 100
 
 MEDIA_STATUS_DOWNLOADED = "downloaded"
 MEDIA_STATUS_REDOWNLOADED = "redownloaded"
@@ -36,6 +38,14 @@ class MediaDownloadJob:
     download_kwargs: Mapping[str, Any] | None = None
 
 
+@dataclass
+class MediaQueueStats:
+    """Downloads finished (in any status) and bytes received so far by a run's media queue."""
+
+    finished: int = 0
+    bytes_downloaded: int = 0
+
+
 @dataclass(frozen=True)
 class MediaDownloadResult:
     job: MediaDownloadJob
@@ -167,6 +177,46 @@ def should_redownload_missing_file(records, channel_id, message_id, base_dir=Non
     return not file_path.exists()
 
 
+async def refetch_media_messages(client, jobs, entities, rate_limiter=None):
+    """
+    Swap archived hits in ``jobs`` for the live messages their media is downloaded from.
+
+    The archive stores a message's text and media descriptor but not the media itself, so a job
+    whose message has a ``media_descriptor`` and no ``media`` is fetched again by ID from the
+    channel it was found in (``entities`` maps channel IDs, as strings, to entities). Jobs whose
+    message is gone or no longer has media are dropped. Returns the jobs ready for download and
+    the number of messages refetched.
+    """
+    ready = []
+    stale = {}
+    for job in jobs:
+        message = job.message
+        if getattr(message, "media", None) is None and getattr(message, "media_descriptor", None):
+            channel_id = (job.metadata or {}).get("found_in_channel_id", job.channel_id)
+            stale.setdefault(str(channel_id), []).append(job)
+        else:
+            ready.append(job)
+
+    refetched = 0
+    for channel_id, channel_jobs in stale.items():
+        entity = entities.get(channel_id)
+        if entity is None:
+            continue
+        for start in range(0, len(channel_jobs), REFETCH_BATCH_SIZE):
+            batch = channel_jobs[start:start + REFETCH_BATCH_SIZE]
+            ids = [job.message.id for job in batch]
+            if rate_limiter is None:
+                messages = await client.get_messages(entity, ids=ids)
+            else:
+                messages = await rate_limiter.call(client.get_messages, entity, ids=ids)
+            for job, message in zip(batch, messages):
+                if message is not None and getattr(message, "media", None):
+                    ready.append(replace(job, message=message))
+                    refetched += 1
+
+    return ready, refetched
+
+
 async def download_media_queue(
     client,
     jobs,
@@ -176,6 +226,8 @@ async def download_media_queue(
     manifest_base_dir=None,
     skip_duplicates=True,
     redownload_missing=True,
+    rate_limiter=None,
+    result_callback=None,
 ):
     if max_concurrency < 1:
         raise ValueError("max_concurrency must be at least 1.")
@@ -229,7 +281,15 @@ async def download_media_queue(
                 if job.progress_callback is not None and "progress_callback" not in kwargs:
                     kwargs["progress_callback"] = job.progress_callback
 
-                downloaded_path = await client.download_media(job.message, requested_path, **kwargs)
+                if rate_limiter is None:
+                    downloaded_path = await client.download_media(job.message, requested_path, **kwargs)
+                else:
+                    downloaded_path = await rate_limiter.call(
+                        client.download_media,
+                        job.message,
+                        requested_path,
+                        **kwargs,
+                    )
                 final_path = Path(downloaded_path) if downloaded_path else requested_path
                 record = build_media_manifest_record(job.channel_id, job.message_id, final_path, job.metadata)
 
@@ -250,7 +310,13 @@ async def download_media_queue(
             async with manifest_lock:
                 in_progress_keys.discard(job_key)
 
-    return await asyncio.gather(*(run_job(job) for job in normalized_jobs))
+    async def run_reported_job(job):
+        result = await run_job(job)
+        if result_callback is not None:
+            result_callback(result)
+        return result
+
+    return await asyncio.gather(*(run_reported_job(job) for job in normalized_jobs))
 
 
 def _clean_env_value(value):
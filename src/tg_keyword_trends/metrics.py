@@ -0,0 +1,263 @@
+"""Per-stage timings, counters and memory peaks for a run, written to ``run_metrics.json``."""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .constants import ENV_FILE_PATH
+from .env import env_flag, read_env_file
+
+
+RUN_METRICS_KEY = "RUN_METRICS"
+RUN_METRICS_MEMORY_KEY = "RUN_METRICS_MEMORY"
+RUN_PROFILER_KEY = "RUN_PROFILER"
+RUN_METRICS_FILENAME = "run_metrics.json"
+PROFILER_CPROFILE = "cprofile"
+PROFILER_PYINSTRUMENT = "pyinstrument"
+PROFILERS = (PROFILER_CPROFILE, PROFILER_PYINSTRUMENT)
+
+
+@dataclass(frozen=True)
+class MetricsSettings:
+    enabled: bool = True
+    trace_memory: bool = False
+    profiler: str | None = None
+
+
+def resolve_metrics_settings(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    profiler = str((env_values or {}).get(RUN_PROFILER_KEY) or "").strip().lower() or None
+    if profiler is not None and profiler not in PROFILERS:
+        raise ValueError(f"{RUN_PROFILER_KEY} must be one of: {', '.join(PROFILERS)}.")
+
+    return MetricsSettings(
+        enabled=env_flag(env_values, RUN_METRICS_KEY, default=True),
+        trace_memory=env_flag(env_values, RUN_METRICS_MEMORY_KEY),
+        profiler=profiler,
+    )
+
+
+@dataclass
+class Span:
+    name: str
+    start_seconds: float
+    seconds: float = 0.0
+    counters: dict = field(default_factory=dict)
+    memory_peak_bytes: int | None = None
+    children: list = field(default_factory=list)
+
+    def add(self, **counters):
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        record = {"name": self.name, "start_seconds": round(self.start_seconds, 6), "seconds": round(self.seconds, 6)}
+        record.update(self.counters)
+        if self.memory_peak_bytes is not None:
+            record["memory_peak_bytes"] = self.memory_peak_bytes
+        if self.children:
+            record["children"] = [child.to_dict() for child in self.children]
+        return record
+
+
+class RunMetrics:
+    """
+    Stage spans and per-batch timings for one run.
+
+    ``span`` blocks nest, and each records how much every registered source (a callable returning
+    a running total, e.g. the rate limiters' API calls) grew while it was open. With
+    ``trace_memory`` tracemalloc runs for the whole run and each span records the peak traced
+    memory while it was open; tracing slows allocation-heavy code, so it is off by default.
+    Searches run concurrently, so per-(channel, term) timings are kept as flat ``units`` records
+    rather than nested spans. ``stage`` opens top-level spans one after another, for long
+    workflows whose steps are not blocks of their own.
+    """
+
+    def __init__(self, *, trace_memory=False, clock=time.perf_counter):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.units = []
+        self.totals = {}
+        self.started_at = datetime.now(timezone.utc)
+        self._clock = clock
+        self._started = clock()
+        self._sources = {}
+        self._open = []
+        self._stage = None
+        if trace_memory:
+            import tracemalloc
+
+            tracemalloc.start()
+
+    def add_source(self, name, read):
+        self._sources[name] = read
+
+    def read_sources(self):
+        return {name: read() for name, read in self._sources.items()}
+
+    @contextmanager
+    def span(self, name, **counters):
+        span = Span(name=name, start_seconds=self._clock() - self._started, counters=dict(counters))
+        (self._open[-1].children if self._open else self.stages).append(span)
+        self._update_memory_peaks()
+        self._open.append(span)
+        started = self._clock()
+        before = self.read_sources()
+        try:
+            yield span
+        finally:
+            after = self.read_sources()
+            span.seconds = self._clock() - started
+            span.add(**{name: after[name] - before[name] for name in before if name in after and after[name] != before[name]})
+            self._update_memory_peaks()
+            self._open.pop()
+
+    def stage(self, name):
+        """End the current stage, if any, and start ``name``; returns its span."""
+        self.end_stage()
+        self._stage = self.span(name)
+        return self._stage.__enter__()
+
+    def end_stage(self):
+        if self._stage is not None:
+            stage, self._stage = self._stage, None
+            stage.__exit__(None, None, None)
+
+    def stage_seconds(self):
+        """Seconds spent in each stage so far, including the one still running."""
+        elapsed = self._clock() - self._started
+        seconds = {}
+        for stage in self.stages:
+            running = any(stage is span for span in self._open)
+            seconds[stage.name] = seconds.get(stage.name, 0.0) + (
+                elapsed - stage.start_seconds if running else stage.seconds
+            )
+        return seconds
+
+    def record_unit(self, channel_id, channel_title, search_terms, mode, seconds, matches):
+        self.units.append(
+            {
+                "channel_id": channel_id,
+                "channel_title": channel_title,
+                "search_terms": list(search_terms),
+                "mode": mode,
+                "seconds": round(seconds, 6),
+                "matches": matches,
+            }
+        )
+
+    def _update_memory_peaks(self):
+        # The peak is reset at every span boundary, so each open span keeps the largest peak it saw.
+        if not self.trace_memory:
+            return
+        import tracemalloc
+
+        _, peak = tracemalloc.get_traced_memory()
+        for span in self._open:
+            span.memory_peak_bytes = max(span.memory_peak_bytes or 0, peak)
+        tracemalloc.reset_peak()
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "seconds": round(self._clock() - self._started, 6),
+            "trace_memory": self.trace_memory,
+            "totals": {**self.read_sources(), **self.totals},
+            "stages": [stage.to_dict() for stage in self.stages],
+            "units": self.units,
+        }
+
+    def write(self, output_folder):
+        """Write ``run_metrics.json`` with the sizes of the files in ``output_folder`` and stop tracing."""
+        self.end_stage()
+        record = self.to_dict()
+        output_folder = Path(output_folder)
+        record["output_files"] = {
+            path.name: path.stat().st_size for path in sorted(output_folder.iterdir()) if path.is_file()
+        }
+        path = output_folder / RUN_METRICS_FILENAME
+        path.write_text(json.dumps(record, indent=2, default=str), encoding="utf-8")
+        self.close()
+        return path
+
+    def close(self):
+        if self.trace_memory:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self.trace_memory = False
+
+
+def metrics_span(metrics, name, **counters):
+    """Return ``metrics.span(name)``, or a no-op context when there is no ``RunMetrics``."""
+    if metrics is None:
+        return nullcontext()
+    return metrics.span(name, **counters)
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class RunProfiler:
+    """
+    Optional whole-run profile for deep dives: cProfile (``.prof``) or pyinstrument (``.html``).
+
+    pyinstrument is only imported when chosen; without it the run goes ahead unprofiled.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._profiler = None
+
+    def start(self):
+        if self.kind == PROFILER_CPROFILE:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.kind == PROFILER_PYINSTRUMENT:
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print(f"{RUN_PROFILER_KEY}=pyinstrument needs pyinstrument; the run will not be profiled.")
+                return self
+            self._profiler = Profiler(async_mode="enabled")
+            self._profiler.start()
+        return self
+
+    def stop(self, output_folder, now):
+        """
+        Stop profiling and save the profile in ``output_folder``; returns its path, or None.
+
+        With no ``output_folder``, as when a run fails before creating one, the profile is discarded.
+        """
+        if self._profiler is None:
+            return None
+        profiler, self._profiler = self._profiler, None
+        if output_folder is None:
+            if self.kind == PROFILER_CPROFILE:
+                profiler.disable()
+            else:
+                profiler.stop()
+            return None
+        if self.kind == PROFILER_CPROFILE:
+            profiler.disable()
+            path = Path(output_folder) / f"profile__{now}.prof"
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = Path(output_folder) / f"profile__{now}.html"
+            path.write_text(profiler.output_html(), encoding="utf-8")
+        return path
@@ -0,0 +1,221 @@
+"""Prometheus textfile and local OpenMetrics HTTP endpoint for watching long runs."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from .constants import ENV_FILE_PATH
+from .env import env_float, env_int, read_env_file
+
+
+OPENMETRICS_TEXTFILE_DIR_KEY = "OPENMETRICS_TEXTFILE_DIR"
+OPENMETRICS_PORT_KEY = "OPENMETRICS_PORT"
+OPENMETRICS_INTERVAL_SECONDS_KEY = "OPENMETRICS_INTERVAL_SECONDS"
+DEFAULT_OPENMETRICS_INTERVAL_SECONDS = 15.0
+OPENMETRICS_NAMESPACE = "tg_keyword_trends"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+OPENMETRICS_HOST = "127.0.0.1"
+OPENMETRICS_PATH = "/metrics"
+
+METRIC_COUNTER = "counter"
+METRIC_GAUGE = "gauge"
+
+
+@dataclass(frozen=True)
+class OpenMetricsSettings:
+    textfile_dir: Path | None = None
+    port: int | None = None
+    interval_seconds: float = DEFAULT_OPENMETRICS_INTERVAL_SECONDS
+
+    @property
+    def enabled(self):
+        return self.textfile_dir is not None or self.port is not None
+
+
+def resolve_openmetrics_settings(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    textfile_dir = str((env_values or {}).get(OPENMETRICS_TEXTFILE_DIR_KEY) or "").strip()
+    port = env_int(env_values, OPENMETRICS_PORT_KEY, 0, minimum=0)
+    if port > 65535:
+        raise ValueError(f"{OPENMETRICS_PORT_KEY} must be at most 65535.")
+
+    return OpenMetricsSettings(
+        textfile_dir=Path(textfile_dir).expanduser() if textfile_dir else None,
+        port=port or None,
+        interval_seconds=env_float(
+            env_values, OPENMETRICS_INTERVAL_SECONDS_KEY, DEFAULT_OPENMETRICS_INTERVAL_SECONDS, minimum=1
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class MetricFamily:
+    """
+    One metric. ``read`` returns its value, or with ``label`` a ``{label value: value}`` mapping.
+
+    Counter samples get a ``_total`` suffix; a ``unit`` must end the name.
+    """
+
+    name: str
+    kind: str
+    help: str
+    read: Any
+    label: str | None = None
+    unit: str | None = None
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class OpenMetricsExporter:
+    """
+    Renders a run's metrics every ``interval_seconds`` to a ``.prom`` textfile and/or a local endpoint.
+
+    node-exporter's textfile collector only reads the Prometheus text format, so the textfile is
+    written in it, with counters typed under their ``_total`` sample name; the HTTP endpoint
+    serves OpenMetrics. The textfile is replaced atomically, so the collector never reads half a
+    file; each run writes its own file and labels its samples with ``labels`` (e.g. the run),
+    so runs sharing a host do not collide. The HTTP endpoint listens on 127.0.0.1 only and serves
+    the latest rendering, so readers in its thread never see the counters mid-update.
+    """
+
+    def __init__(self, settings, *, labels=None, textfile_name=f"{OPENMETRICS_NAMESPACE}.prom"):
+        self.settings = settings
+        self.labels = dict(labels or {})
+        self.families = []
+        self.active = True
+        self.textfile_path = settings.textfile_dir / textfile_name if settings.textfile_dir is not None else None
+        self.server = None
+        self.text = ""
+        self._task = None
+        self.gauge("run_active", "1 while the run is in progress and 0 once it has finished.", lambda: self.active)
+
+    def counter(self, name, help, read, *, label=None, unit=None):
+        self.families.append(MetricFamily(name, METRIC_COUNTER, help, read, label=label, unit=unit))
+
+    def gauge(self, name, help, read, *, label=None, unit=None):
+        self.families.append(MetricFamily(name, METRIC_GAUGE, help, read, label=label, unit=unit))
+
+    def read_samples(self):
+        """Return ``(family, [(labels, value)])`` for every metric, read once for both formats."""
+        families = []
+        for family in self.families:
+            value = family.read()
+            if family.label is None:
+                samples = [(self.labels, value)]
+            else:
+                samples = [({**self.labels, family.label: key}, item) for key, item in sorted(dict(value).items())]
+            families.append((family, samples))
+        return families
+
+    def render(self, samples=None, *, openmetrics=True):
+        """Render OpenMetrics text, or with ``openmetrics=False`` the Prometheus text format."""
+        lines = []
+        for family, family_samples in samples if samples is not None else self.read_samples():
+            name = f"{OPENMETRICS_NAMESPACE}_{family.name}"
+            sample_name = f"{name}_total" if family.kind == METRIC_COUNTER else name
+            if openmetrics:
+                lines.append(f"# TYPE {name} {family.kind}")
+                if family.unit:
+                    lines.append(f"# UNIT {name} {family.unit}")
+                lines.append(f"# HELP {name} {family.help}")
+            else:
+                lines.append(f"# HELP {sample_name} {family.help}")
+                lines.append(f"# TYPE {sample_name} {family.kind}")
+            lines.extend(f"{sample_name}{format_labels(labels)} {format_value(item)}" for labels, item in family_samples)
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def refresh(self):
+        samples = self.read_samples()
+        self.text = self.render(samples)
+        if self.textfile_path is not None:
+            self.textfile_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.textfile_path.with_name(f"{self.textfile_path.name}.tmp")
+            temp_path.write_text(self.render(samples, openmetrics=False), encoding="utf-8")
+            os.replace(temp_path, self.textfile_path)
+
+    def start(self):
+        """Write the first snapshot, start the HTTP endpoint if configured and schedule the refreshes."""
+        self.refresh()
+        if self.settings.port is not None:
+            try:
+                self.server = ThreadingHTTPServer((OPENMETRICS_HOST, self.settings.port), self._handler())
+            except OSError as exc:
+                print(f"OpenMetrics endpoint not started on port {self.settings.port}: {exc}")
+            else:
+                self.server.daemon_threads = True
+                threading.Thread(target=self.server.serve_forever, name="openmetrics", daemon=True).start()
+        self._task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+        return self
+
+    async def _refresh_periodically(self):
+        try:
+            while True:
+                await asyncio.sleep(self.settings.interval_seconds)
+                self.refresh()
+        except asyncio.CancelledError:
+            # Reached through stop(), or when asyncio.run() cancels leftover tasks at shutdown.
+            self._finish()
+            raise
+
+    def stop(self):
+        """Write the final values with ``run_active`` 0 and stop the endpoint."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._finish()
+
+    def _finish(self):
+        if not self.active:
+            return
+        self.active = False
+        self.refresh()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _handler(self):
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in {OPENMETRICS_PATH, "/"}:
+                    self.send_error(404)
+                    return
+                body = exporter.text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MetricsHandler
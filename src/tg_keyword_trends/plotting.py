@@ -17,6 +17,8 @@ from reportlab.lib.units import mm
 from reportlab.platypus import BaseDocTemplate, Frame, Image, PageBreak, PageTemplate, Paragraph, Preformatted, Spacer
 
 from .console import printC
+from .metrics import metrics_span
+from .results import result_counts
 
 
 SAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
@@ -248,7 +250,7 @@ def calculate_total_daily_messages(grouped_results):
 
     with_message_ids = results.dropna(subset=["_message_id"])
     if with_message_ids.empty:
-        total_messages = results.groupby("_date").size().astype(float)
+        total_messages = result_counts(results).groupby(results["_date"]).sum().astype(float)
     else:
         by_channel = with_message_ids.groupby(["_date", "_channel_id"])["_message_id"].agg(["min", "max"])
         by_channel["message_count"] = by_channel["max"] - by_channel["min"] + 1
@@ -265,7 +267,7 @@ def calculate_percentage_over_time(grouped_results, total_daily_messages=None):
     if results.empty:
         return pd.DataFrame(columns=columns)
 
-    daily_mentions = results.groupby(["_date", "_search_term"]).size().rename("mentions")
+    daily_mentions = result_counts(results).groupby([results["_date"], results["_search_term"]]).sum().rename("mentions")
     terms = sorted(results["_search_term"].unique())
 
     if total_daily_messages is None:
@@ -486,63 +488,101 @@ def plot_rolling_percentage_over_time(grouped_results, output_folder, window_day
     )
 
 
-def plot_keyword_frequency(all_results, dataframes_dict, output_folder, now):
+def plot_keyword_frequency(all_results, dataframes_dict, output_folder, now, total_daily_messages=None, metrics=None):
+    """
+    Save every graph and the PDF.
+
+    ``total_daily_messages`` is the channels' sampled daily activity. Without it the ratio graphs
+    estimate activity from the message IDs of the matched messages. Each graph is timed as a span
+    of ``metrics``, if given.
+    """
     manifest = []
 
-    try:
-        _append_manifest_entry(manifest, plot_keyword_frequency_per_channel(dataframes_dict, output_folder))
-    except Exception as e:
-        print(f"Error making per-channel chart: {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "per_channel_graph"):
+        try:
+            _append_manifest_entry(manifest, plot_keyword_frequency_per_channel(dataframes_dict, output_folder))
+        except Exception as e:
+            print(f"Error making per-channel chart: {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
-    try:
-        _append_manifest_entry(manifest, plot_keyword_frequency_aggregate(dataframes_dict, output_folder))
-    except Exception as e:
-        print(f"Error making aggregate chart: {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "aggregate_graph"):
+        try:
+            _append_manifest_entry(manifest, plot_keyword_frequency_aggregate(dataframes_dict, output_folder))
+        except Exception as e:
+            print(f"Error making aggregate chart: {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
-    try:
-        _append_manifest_entry(manifest, plot_adjusted_keyword_frequency(dataframes_dict, output_folder, now))
-    except Exception as e:
-        print(f"Error making adjusted chart (normal scale): {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "adjusted_graph"):
+        try:
+            _append_manifest_entry(
+                manifest,
+                plot_adjusted_keyword_frequency(
+                    dataframes_dict, output_folder, now, total_daily_messages=total_daily_messages
+                ),
+            )
+        except Exception as e:
+            print(f"Error making adjusted chart (normal scale): {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
-    try:
-        _append_manifest_entry(manifest, plot_adjusted_keyword_frequency(dataframes_dict, output_folder, now, scale="log"))
-    except Exception as e:
-        print(f"Error making adjusted chart (log scale): {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "adjusted_log_graph"):
+        try:
+            _append_manifest_entry(
+                manifest,
+                plot_adjusted_keyword_frequency(
+                    dataframes_dict, output_folder, now, scale="log", total_daily_messages=total_daily_messages
+                ),
+            )
+        except Exception as e:
+            print(f"Error making adjusted chart (log scale): {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
-    try:
-        _append_manifest_entry(manifest, plot_percentage_over_time(dataframes_dict, output_folder))
-    except Exception as e:
-        print(f"Error making daily percentage chart: {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "percentage_graph"):
+        try:
+            _append_manifest_entry(
+                manifest,
+                plot_percentage_over_time(dataframes_dict, output_folder, total_daily_messages=total_daily_messages),
+            )
+        except Exception as e:
+            print(f"Error making daily percentage chart: {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
-    try:
-        _append_manifest_entry(manifest, plot_rolling_percentage_over_time(dataframes_dict, output_folder))
-    except Exception as e:
-        print(f"Error making rolling percentage chart: {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "rolling_percentage_graph"):
+        try:
+            _append_manifest_entry(
+                manifest,
+                plot_rolling_percentage_over_time(
+                    dataframes_dict, output_folder, total_daily_messages=total_daily_messages
+                ),
+            )
+        except Exception as e:
+            print(f"Error making rolling percentage chart: {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
-    try:
-        _append_manifest_entry(
-            manifest,
-            generate_wordcloud_image(dataframes_dict, output_folder, title="Wordcloud of Matching Messages"),
-        )
-    except Exception as e:
-        print(f"Error making wordcloud: {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "wordcloud"):
+        try:
+            _append_manifest_entry(
+                manifest,
+                generate_wordcloud_image(dataframes_dict, output_folder, title="Wordcloud of Matching Messages"),
+            )
+        except Exception as e:
+            print(f"Error making wordcloud: {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
-    try:
-        generate_pdf(all_results, output_folder, dataframes_dict, now, graph_manifest=manifest)
-    except Exception as e:
-        print(f"Error making PDF: {type(e).__name__}: {str(e)}\n Traceback:")
-        traceback.print_exc()
+    with metrics_span(metrics, "pdf"):
+        try:
+            generate_pdf(all_results, output_folder, dataframes_dict, now, graph_manifest=manifest)
+        except Exception as e:
+            print(f"Error making PDF: {type(e).__name__}: {str(e)}\n Traceback:")
+            traceback.print_exc()
 
     return manifest
 
 
+def daily_result_counts(results):
+    """Return the matches per day of a frame with a naive ``date`` column, weighing count-only rows."""
+    return result_counts(results).groupby(results['date'].dt.floor('D')).sum().asfreq('D', fill_value=0)
+
+
 def plot_keyword_frequency_per_channel(dataframes_dict, output_folder):
     min_date = None
     max_date = None
@@ -580,7 +620,7 @@ def plot_keyword_frequency_per_channel(dataframes_dict, output_folder):
         all_results['date'] = pd.to_datetime(all_results['time'].astype(str).str[:11].str.strip()).dt.tz_localize(
             None)
 
-        daily_message_count = all_results.resample('D', on='date').size()
+        daily_message_count = daily_result_counts(all_results)
         plt.plot(daily_message_count.index, daily_message_count.values, label=search_term)
 
         if min_date is not None and max_date is not None:
@@ -639,7 +679,7 @@ def plot_keyword_frequency_aggregate(dataframes_dict, output_folder):
         if max_date is None or current_results['date'].max() > max_date:
             max_date = current_results['date'].max()
 
-        daily_message_count = current_results.resample('D', on='date').size()
+        daily_message_count = daily_result_counts(current_results)
         plt.plot(daily_message_count.index, daily_message_count.values, label=search_term)
 
     current_date = min_date.to_period('M').to_timestamp()
@@ -668,10 +708,13 @@ def plot_keyword_frequency_aggregate(dataframes_dict, output_folder):
     return entry
 
 
-def plot_adjusted_keyword_frequency(dataframes_dict, output_folder, now, scale="normal"):
+def plot_adjusted_keyword_frequency(dataframes_dict, output_folder, now, scale="normal", total_daily_messages=None):
     fig, ax = plt.subplots(figsize=(14, 6))
 
-    daily_message_count = get_total_daily_messages(dataframes_dict)
+    if total_daily_messages is None:
+        daily_message_count = get_total_daily_messages(dataframes_dict)
+    else:
+        daily_message_count = _normalise_total_daily_messages(total_daily_messages)
 
     for search_term, dataframes in dataframes_dict.items():
         if dataframes:
@@ -679,7 +722,7 @@ def plot_adjusted_keyword_frequency(dataframes_dict, output_folder, now, scale="
             current_results['date'] = pd.to_datetime(
                 current_results['time'].astype(str).str[:11].str.strip()).dt.tz_localize(None)
 
-            daily_mentions = current_results.resample('D', on='date').size().to_frame(name='mentions')
+            daily_mentions = daily_result_counts(current_results).to_frame(name='mentions')
 
             adjusted_daily_mentions = daily_mentions.join(daily_message_count, how='outer')
             adjusted_daily_mentions['total_messages'] = adjusted_daily_mentions['total_messages'].ffill()
@@ -750,7 +793,7 @@ def generate_pdf(all_results, output_folder, dataframes_dict, now, graph_manifes
     pdf_filename = os.path.join(output_folder, f'Telegram_Keyword_Trends_Report_{now}.pdf')
     doc = NumberedDocTemplate(pdf_filename, pagesize=letter)
 
-    num_results = len(all_results)
+    num_results = int(result_counts(all_results).sum())
     number_of_results = f"Number of results: {num_results}"
     date_range = _result_date_range(all_results)
     date_range_of_results = f"Date range of results: {date_range[0]} - {date_range[1]}\n\n"
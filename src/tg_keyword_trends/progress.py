@@ -1,35 +1,231 @@
-import time as t
+"""Live progress line for the search, count and media stages."""
 
-from colorama import Fore
+from __future__ import annotations
 
-from .console import printC
+import statistics
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
 
+from .constants import ENV_FILE_PATH
+from .env import env_float, read_env_file
 
-def progress_display(start_time, total_channels, count):
+
+PROGRESS_REFRESH_SECONDS_KEY = "PROGRESS_REFRESH_SECONDS"
+DEFAULT_PROGRESS_REFRESH_SECONDS = 0.5
+# Without a terminal the line is printed this often instead of redrawn, so logs stay short.
+PROGRESS_LOG_SECONDS = 30.0
+# Weight of the newest interval in the displayed rates, as in tqdm's own smoothing.
+RATE_SMOOTHING = 0.3
+
+FIELD_RATE = "rate"
+FIELD_SECONDS = "seconds"
+
+
+def resolve_progress_refresh_seconds(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    return env_float(env_values, PROGRESS_REFRESH_SECONDS_KEY, DEFAULT_PROGRESS_REFRESH_SECONDS, minimum=0.05)
+
+
+@dataclass(frozen=True)
+class ProgressField:
+    """A running total shown on the progress line: as a smoothed rate, or as seconds so far."""
+
+    label: str
+    read: Any
+    kind: str = FIELD_RATE
+
+
+def format_hms(seconds):
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def format_rate(value, suffix="", divisor=1000):
+    from tqdm import tqdm
+
+    return tqdm.format_sizeof(value, suffix, divisor)
+
+
+class UnitCostEta:
+    """
+    Remaining search time from the observed cost of each channel's finished (channel, term) units.
+
+    A channel's remaining units are expected to cost what its finished ones did; channels with
+    none finished yet cost the median channel seen so far, so one huge channel only stretches
+    its own share of the estimate. Units overlap, so the remaining cost is divided by the
+    observed parallelism (unit seconds per wall-clock second).
+    """
+
+    def __init__(self, units_per_channel):
+        self.remaining = Counter(units_per_channel)
+        self.channels = len(self.remaining)
+        self.done = Counter()
+        self.costs = Counter()
+        self.busy_seconds = 0.0
+
+    def record(self, channel_id, seconds, units=1):
+        self.remaining[channel_id] -= units
+        self.done[channel_id] += units
+        self.costs[channel_id] += seconds
+        self.busy_seconds += seconds
+
+    def record_units(self, units, seconds):
+        """Share ``seconds`` evenly between ``units``, e.g. the units of one local scan or global search."""
+        for unit in units:
+            self.record(unit.channel.channel_id, seconds / len(units))
+
+    @property
+    def channels_done(self):
+        return sum(1 for channel_id in self.done if self.remaining[channel_id] <= 0)
+
+    def remaining_seconds(self, elapsed):
+        if self.busy_seconds <= 0 or elapsed <= 0:
+            return None
+
+        unit_costs = {channel_id: self.costs[channel_id] / self.done[channel_id] for channel_id in self.done}
+        default_cost = statistics.median(unit_costs.values())
+        remaining_cost = sum(
+            units * unit_costs.get(channel_id, default_cost) for channel_id, units in self.remaining.items() if units > 0
+        )
+        return remaining_cost / (self.busy_seconds / elapsed)
+
+
+class ProgressDashboard:
     """
-    Displays progress, elapsed time, and estimated time remaining.
+    Progress line for one stage, redrawn at most every ``refresh_seconds``.
+
+    On a terminal it is a tqdm bar on stderr. Otherwise the line is printed every
+    ``PROGRESS_LOG_SECONDS``. ``fields`` follow the count; ``eta`` (a ``UnitCostEta``) replaces
+    the estimate from the share of the total done so far.
     """
 
-    def seconds_to_hms(seconds):
-        m, s = divmod(int(seconds), 60)
-        h, m = divmod(m, 60)
-        return h, m, s
-
-    elapsed_time = t.time() - start_time
-    average_time_per_channel = elapsed_time / count
-    remaining_channels = total_channels - count
-    estimated_remaining_time = remaining_channels * average_time_per_channel
-    h, m, s = seconds_to_hms(estimated_remaining_time)
-    elapsed_h, elapsed_m, elapsed_s = seconds_to_hms(elapsed_time)
-    total_time = elapsed_time + estimated_remaining_time
-    progress_percentage = elapsed_time / total_time
-
-    progress_bar_length = 74
-    filled_length = int(progress_percentage * progress_bar_length)
-    progress_bar = '#' * filled_length + '-' * (progress_bar_length - filled_length)
-
-    time_message = f"Processed {count}/{total_channels} channels. Time elapsed: {elapsed_h:02d}:{elapsed_m:02d}:{elapsed_s:02d}. ETA: {h:02d}:{m:02d}:{s:02d}."
-    progress_message = f"Progress: |{progress_bar}| {progress_percentage * 100:.1f}%"
-    printC(time_message, Fore.CYAN)
-    printC(progress_message, Fore.CYAN)
-    print(f'\x1b[38;2;255;20;147m{"-" * 91}\x1b[0m')
+    def __init__(
+        self,
+        total,
+        description,
+        *,
+        unit="units",
+        fields=(),
+        eta=None,
+        unit_scale=False,
+        refresh_seconds=DEFAULT_PROGRESS_REFRESH_SECONDS,
+        file=None,
+        clock=time.monotonic,
+    ):
+        from tqdm import tqdm
+
+        self.total = total
+        self.description = description
+        self.unit = unit
+        self.fields = tuple(fields)
+        self.eta = eta
+        self.unit_scale = unit_scale
+        self.n = 0
+        self.file = file if file is not None else sys.stderr
+        isatty = getattr(self.file, "isatty", None)
+        self.interactive = bool(isatty and isatty())
+        self.refresh_seconds = refresh_seconds if self.interactive else PROGRESS_LOG_SECONDS
+        self._clock = clock
+        self._started = clock()
+        self._drawn = None
+        self._samples = {field.label: (self._started, field.read()) for field in self.fields}
+        self._rates = {}
+        self._bar = None
+        if self.interactive:
+            count_format = "{n_fmt}{unit}/{total_fmt}{unit}" if unit_scale else "{n_fmt}/{total_fmt} {unit}"
+            self._bar = tqdm(
+                total=total,
+                desc=description,
+                unit=unit,
+                unit_scale=unit_scale,
+                unit_divisor=1024 if unit_scale else 1000,
+                file=self.file,
+                mininterval=0,
+                dynamic_ncols=True,
+                bar_format="{desc}: {percentage:3.0f}%|{bar}| " + count_format + " [{elapsed}{postfix}]",
+            )
+        self.draw()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def update(self, n=1):
+        self.n += n
+        if self._clock() - self._drawn >= self.refresh_seconds:
+            self.draw()
+
+    def draw(self):
+        now = self._clock()
+        self._drawn = now
+        status = self.status(now)
+        if self._bar is not None:
+            self._bar.set_postfix_str(status, refresh=False)
+            if self.n > self._bar.n:
+                self._bar.update(self.n - self._bar.n)
+            else:
+                self._bar.refresh()
+        else:
+            count = f"{self.n}/{self.total} {self.unit}"
+            if self.unit_scale:
+                count = f"{format_rate(self.n, self.unit, 1024)}/{format_rate(self.total, self.unit, 1024)}"
+            percentage = self.n / self.total * 100 if self.total else 100.0
+            print(
+                f"{self.description}: {percentage:3.0f}% {count} [{format_hms(now - self._started)}, {status}]",
+                file=self.file,
+                flush=True,
+            )
+
+    def status(self, now):
+        parts = [f"ETA {self._format_eta(now)}"]
+        if self.eta is not None:
+            parts.append(f"channels {self.eta.channels_done}/{self.eta.channels}")
+
+        rate = self._rate(None, self.n, now)
+        if self.unit_scale:
+            parts.append(format_rate(rate, f"{self.unit}/s", 1024))
+        else:
+            parts.append(f"{rate:.1f} {self.unit}/s")
+
+        for field in self.fields:
+            value = field.read()
+            if field.kind == FIELD_SECONDS:
+                parts.append(f"{field.label} {format_hms(value)}")
+            else:
+                parts.append(f"{format_rate(self._rate(field.label, value, now))} {field.label}")
+        return ", ".join(parts)
+
+    def _rate(self, label, value, now):
+        sampled_at, previous = self._samples.get(label, (self._started, 0))
+        if now > sampled_at:
+            rate = (value - previous) / (now - sampled_at)
+            smoothed = self._rates.get(label)
+            self._rates[label] = rate if smoothed is None else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * smoothed
+            self._samples[label] = (now, value)
+        return self._rates.get(label, 0.0)
+
+    def _format_eta(self, now):
+        elapsed = now - self._started
+        if self.eta is not None:
+            remaining = self.eta.remaining_seconds(elapsed)
+        elif self.n and self.total:
+            remaining = elapsed / self.n * (self.total - self.n)
+        else:
+            remaining = None
+        return "--:--:--" if remaining is None else format_hms(remaining)
+
+    def close(self):
+        if self._drawn is None:
+            return
+        self.draw()
+        self._drawn = None
+        if self._bar is not None:
+            self._bar.close()
@@ -0,0 +1,199 @@
+"""Non-blocking request pacing for Telegram calls."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import timedelta
+
+
+class RateBudget:
+    """Token bucket that paces callers with ``asyncio.sleep`` instead of blocking the event loop."""
+
+    def __init__(self, rate, capacity=1, *, clock=time.monotonic, sleep=asyncio.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0.")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.waited_seconds = 0.0
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self._lock:
+            await self._take_token()
+
+    async def _take_token(self):
+        """Take one token, sleeping until it is available. Callers hold ``_lock``."""
+        self._refill()
+        if self._tokens < 1:
+            delay = (1 - self._tokens) / self.rate
+            self.waited_seconds += delay
+            await self._sleep(delay)
+            self._refill()
+        self._tokens -= 1
+
+
+class AdaptiveRateLimiter(RateBudget):
+    """
+    Shared token bucket for every Telegram request.
+
+    A FloodWait pauses all callers until the server-requested wait has passed and cuts the rate
+    multiplicatively. Each successful request then raises the rate additively towards
+    ``max_rate``, so the limiter settles just below the account's real request ceiling.
+    """
+
+    def __init__(
+        self,
+        rate,
+        capacity=1,
+        *,
+        max_rate=None,
+        min_rate=0.05,
+        increase_step=0.02,
+        decrease_factor=0.5,
+        max_retries=5,
+        clock=time.monotonic,
+        sleep=asyncio.sleep,
+    ):
+        super().__init__(rate, capacity, clock=clock, sleep=sleep)
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1.")
+
+        self.max_rate = float(max_rate) if max_rate is not None else self.rate
+        self.min_rate = min(float(min_rate), self.rate)
+        self.increase_step = float(increase_step)
+        self.decrease_factor = float(decrease_factor)
+        self.max_retries = max_retries
+        self.api_calls = 0
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0.0
+        self._blocked_until = None
+
+    async def _take_token(self):
+        await self._wait_for_flood_pause()
+        await super()._take_token()
+        self.api_calls += 1
+
+    async def _wait_for_flood_pause(self):
+        if self._blocked_until is None:
+            return
+
+        remaining = self._blocked_until - self._clock()
+        if remaining > 0:
+            await self._sleep(remaining)
+        self._blocked_until = None
+
+    def record_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def record_flood_wait(self, seconds):
+        """Pause every caller for ``seconds`` and lower the sustained request rate."""
+        seconds = max(0.0, float(seconds or 0))
+        now = self._clock()
+        paused_from = max(now, self._blocked_until or now)
+        paused_until = now + seconds
+
+        self.flood_waits += 1
+        if paused_until > paused_from:
+            self.flood_wait_seconds += paused_until - paused_from
+            self._blocked_until = paused_until
+
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = min(self._tokens, 0.0)
+
+    async def call(self, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)`` under the limiter, retrying after FloodWait errors."""
+        from telethon.errors import FloodWaitError
+
+        attempt = 0
+        while True:
+            await self.acquire()
+            try:
+                result = await func(*args, **kwargs)
+            except FloodWaitError as exc:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.record_flood_wait(exc.seconds)
+                continue
+
+            self.record_success()
+            return result
+
+    async def iter_messages(self, client, entity, *, page_size=100, on_iterator=None, **kwargs):
+        """
+        Yield ``client.iter_messages`` results, taking one token per page of ``page_size`` messages.
+
+        Telethon's own inter-request sleep is disabled so pacing is left to the limiter. A FloodWait
+        raised part-way through resumes from the last yielded message instead of starting over. A
+        global search (``entity`` of None) pages by date across chats, so it resumes from the
+        second of the last yielded message and skips the hits from that second it already yielded.
+        ``max_retries`` limits consecutive FloodWaits; each full page fetched resets the count.
+        ``on_iterator`` is called with each underlying Telethon iterator, e.g. to read its ``total``.
+        """
+        from telethon.errors import FloodWaitError
+
+        kwargs.setdefault("wait_time", 0)
+        attempt = 0
+        last_message_id = None
+        last_second = None
+        last_second_keys = set()
+
+        while True:
+            if entity is None and last_second is not None:
+                kwargs["offset_date"] = last_second + timedelta(seconds=1)
+            elif last_message_id is not None:
+                kwargs["offset_id"] = last_message_id
+
+            iterator = client.iter_messages(entity, **kwargs).__aiter__()
+            if on_iterator is not None:
+                on_iterator(iterator)
+            fetched = 0
+            try:
+                while True:
+                    if fetched % page_size == 0:
+                        await self.acquire()
+                    try:
+                        message = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        self.record_success()
+                        return
+
+                    fetched += 1
+                    if fetched % page_size == 0:
+                        self.record_success()
+                        # Only FloodWaits without a page fetched in between count towards max_retries.
+                        attempt = 0
+                    if entity is None:
+                        message_key = (getattr(message, "chat_id", None), message.id)
+                        message_second = message.date.replace(microsecond=0)
+                        if message_second == last_second and message_key in last_second_keys:
+                            continue
+                        if message_second != last_second:
+                            last_second, last_second_keys = message_second, set()
+                        last_second_keys.add(message_key)
+                    last_message_id = message.id
+                    yield message
+            except FloodWaitError as exc:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.record_flood_wait(exc.seconds)
+            finally:
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
@@ -1,6 +1,8 @@
 import os
 from collections import Counter
 
+from .results import result_counts
+
 
 def generate_txt_report(all_results, channels, search_terms, output_folder, now):
     """
@@ -18,7 +20,7 @@ def generate_txt_report(all_results, channels, search_terms, output_folder, now)
         f.write(f"{now}\n\n")
 
         f.write("Summary Stats\n")
-        num_results = len(all_results)
+        num_results = int(result_counts(all_results).sum())
         date_range = _result_date_range(all_results)
         f.write(f"Number of results: {num_results}\n")
         f.write(f"Date range of results: {date_range[0]} - {date_range[1]}\n\n")
@@ -67,10 +69,14 @@ def _channel_counts(all_results):
         return []
 
     if 'channel_title' not in all_results:
-        return [(f"Channel ID: {channel_id}", count) for channel_id, count in Counter(all_results['channel_id']).most_common()]
-
-    labels = all_results.apply(
-        lambda row: f"Channel: {row['channel_title']} ({row['channel_id']})",
-        axis=1,
-    )
-    return Counter(labels).most_common()
+        labels = [f"Channel ID: {channel_id}" for channel_id in all_results['channel_id']]
+    else:
+        labels = all_results.apply(
+            lambda row: f"Channel: {row['channel_title']} ({row['channel_id']})",
+            axis=1,
+        )
+
+    counts = Counter()
+    for label, count in zip(labels, result_counts(all_results)):
+        counts[label] += int(count)
+    return counts.most_common()
@@ -0,0 +1,318 @@
+"""Append-only columnar storage for search result rows."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from .channels import render_message_link
+from .constants import ENV_FILE_PATH
+from .env import env_flag, read_env_file
+
+
+TREND_ORIGINALS_ONLY_KEY = 'TREND_ORIGINALS_ONLY'
+
+
+RESULT_COLUMNS = [
+    'time',
+    'message',
+    'message_id',
+    'channel_id',
+    'channel_title',
+    'search_group',
+    'search_term',
+    'link',
+    'term_mask',
+    'fwd_from_channel_id',
+    'fwd_from_message_id',
+]
+CATEGORICAL_COLUMNS = ('channel_title', 'search_group', 'search_term')
+# Count-only rows stand for this many matches each; other rows stand for one.
+RESULT_COUNT_COLUMN = 'count'
+
+
+def resolve_originals_only(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+    return env_flag(env_values, TREND_ORIGINALS_ONLY_KEY)
+
+
+def result_counts(frame):
+    """Return how many matches each row of ``frame`` stands for."""
+    import pandas as pd
+
+    if RESULT_COUNT_COLUMN not in frame.columns:
+        return pd.Series(1, index=frame.index, dtype='int64')
+    return pd.to_numeric(frame[RESULT_COUNT_COLUMN], errors='coerce').fillna(1).astype('int64')
+
+
+def forward_origin(message):
+    """
+    Return the (channel_id, message_id) a message was forwarded from, or ``(None, None)``.
+
+    Only forwards of channel posts have an origin; forwards from users and hidden senders do not.
+    """
+    if hasattr(message, 'fwd_from_channel_id'):
+        return message.fwd_from_channel_id, message.fwd_from_message_id
+
+    forward = getattr(message, 'fwd_from', None)
+    channel_id = getattr(getattr(forward, 'from_id', None), 'channel_id', None)
+    message_id = getattr(forward, 'channel_post', None)
+    if channel_id is None or message_id is None:
+        return None, None
+    return channel_id, message_id
+
+
+def message_origin(channel_id, message):
+    """Return the key of the original post: the forward's origin, or the message itself."""
+    origin_channel_id, origin_message_id = forward_origin(message)
+    if origin_channel_id is None:
+        return channel_id, message.id
+    return origin_channel_id, origin_message_id
+
+
+def build_result_row(message, channel, search_group_label, search_term, link=None, term_mask=0):
+    """Return the result row for one matched message."""
+    fwd_from_channel_id, fwd_from_message_id = forward_origin(message)
+    return {
+        'time': message.date,
+        'message': message.message,
+        'message_id': message.id,
+        'channel_id': channel.channel_id,
+        'channel_title': channel.title,
+        'search_group': search_group_label,
+        'search_term': search_term,
+        'link': link or render_message_link(channel.channel_id, message.id),
+        'term_mask': term_mask,
+        'fwd_from_channel_id': fwd_from_channel_id,
+        'fwd_from_message_id': fwd_from_message_id,
+    }
+
+
+def row_term_mask(row, compiled_terms=None):
+    """
+    Return a row's ``term_mask``, working it out from its group and term when the row predates masks.
+
+    With ``compiled_terms``, bits past the last compiled term are dropped, so a mask saved before
+    terms were removed from the search terms file cannot point at a term that no longer exists.
+    """
+    mask = int(row.get('term_mask') or 0)
+    if compiled_terms is None:
+        return mask
+    mask &= (1 << len(compiled_terms.terms)) - 1
+    if mask:
+        return mask
+    term = compiled_terms.term_for(str(row.get('search_term') or ''))
+    if term is None or row.get('search_group') not in term.group_labels:
+        return 0
+    return term.mask
+
+
+def merge_message_rows(rows, compiled_terms=None):
+    """
+    Collapse rows for the same (channel, message) into one row whose ``term_mask`` has every matched term.
+
+    Rows keep their first-seen order. With ``compiled_terms`` the merged row's ``search_group`` and
+    ``search_term`` name the matched term that comes first in the search terms file, so the labels
+    do not depend on which search happened to finish first.
+    """
+    merged = {}
+    for row in rows:
+        key = (row.get('channel_id'), row.get('message_id'))
+        mask = row_term_mask(row, compiled_terms)
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = {**row, 'term_mask': mask}
+        else:
+            existing['term_mask'] |= mask
+
+    if compiled_terms is not None:
+        for row in merged.values():
+            row.update(mask_labels(row['term_mask'], compiled_terms))
+    return list(merged.values())
+
+
+def mask_labels(mask, compiled_terms):
+    """Return the ``search_term`` and ``search_group`` of the first term in ``mask``, or nothing."""
+    if not mask or compiled_terms is None:
+        return {}
+    term = compiled_terms.terms[(mask & -mask).bit_length() - 1]
+    return {'search_term': term.search_term, 'search_group': term.group_labels[0]}
+
+
+class ResultAccumulator:
+    """
+    Collect result rows into per-column buffers and build the DataFrame once.
+
+    Appending a unit's rows only extends Python lists, so the cost of a run grows with the
+    number of rows rather than with the number of (channel, term) batches. ``to_frame`` builds
+    the combined DataFrame on first use after an append and stores the repeated label columns
+    as categoricals. ``revision`` counts the appends that added rows, so views can tell when
+    what they derived from the frame is stale.
+
+    ``merge_rows`` appends rows as ``merge_message_rows`` would merge them, across calls, so each
+    search's rows can be added as soon as it finishes.
+    """
+
+    def __init__(self, columns=None, categorical_columns=CATEGORICAL_COLUMNS):
+        self.columns = list(columns or RESULT_COLUMNS)
+        self.categorical_columns = tuple(column for column in categorical_columns if column in self.columns)
+        self._buffers = {column: [] for column in self.columns}
+        self._frame = None
+        self.revision = 0
+        self.merged_rows = 0
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._buffers[self.columns[0]])
+
+    def append_rows(self, rows):
+        for row in rows:
+            for column, buffer in self._buffers.items():
+                buffer.append(row.get(column))
+        if rows:
+            self._frame = None
+            self.revision += 1
+
+    def merge_rows(self, rows, compiled_terms=None):
+        """
+        Append rows, merging each row for a message ``merge_rows`` already added into that row's mask.
+
+        Returns how many rows were merged into earlier ones; ``merged_rows`` keeps the total.
+        """
+        masks = self._buffers['term_mask']
+        merged = 0
+        for row in rows:
+            key = (row.get('channel_id'), row.get('message_id'))
+            mask = row_term_mask(row, compiled_terms)
+            position = self._positions.get(key)
+            if position is None:
+                self._positions[key] = len(self)
+                row = {**row, 'term_mask': mask, **mask_labels(mask, compiled_terms)}
+                for column, buffer in self._buffers.items():
+                    buffer.append(row.get(column))
+                continue
+
+            merged += 1
+            combined = masks[position] | mask
+            if combined != masks[position]:
+                masks[position] = combined
+                for column, value in mask_labels(combined, compiled_terms).items():
+                    self._buffers[column][position] = value
+        if rows:
+            self._frame = None
+            self.revision += 1
+        self.merged_rows += merged
+        return merged
+
+    def iter_rows(self):
+        """Yield the stored rows as dicts, in the order they were added."""
+        for values in zip(*self._buffers.values()):
+            yield dict(zip(self.columns, values))
+
+    def to_frame(self):
+        if self._frame is None:
+            import pandas as pd
+
+            frame = pd.DataFrame(self._buffers, columns=self.columns)
+            for column in self.categorical_columns:
+                frame[column] = frame[column].astype('category')
+            self._frame = frame
+        return self._frame
+
+    def groups(self, labels, column='search_group', masks=None, originals_only=False):
+        return ResultGroups(self, labels, column, masks, originals_only)
+
+
+class ResultGroups(Mapping):
+    """
+    Read-only ``{label: [DataFrame]}`` view over an accumulator, grouped by ``column``.
+
+    This keeps the shape the plotting code expects from ``dataframes_dict``. Labels without
+    results map to an empty list. Each label's frame is a filtered copy of the accumulator's rows,
+    built on first lookup and kept until the accumulator appends more rows, so the plots reading
+    a group several times share one copy.
+
+    ``masks`` maps labels to ``term_mask`` bits. A message that matched terms from several groups
+    is stored once and appears, once, under each of those groups. With ``originals_only`` each
+    group counts a post once however many channels forwarded it (see ``original_posts``).
+    """
+
+    def __init__(self, accumulator, labels, column='search_group', masks=None, originals_only=False):
+        self._accumulator = accumulator
+        self._labels = list(dict.fromkeys(labels))
+        self._column = column
+        self._masks = dict(masks or {})
+        self._originals_only = originals_only
+        self._cache = {}
+        self._cache_revision = None
+
+    def __getitem__(self, label):
+        if label not in self._labels:
+            raise KeyError(label)
+
+        if self._cache_revision != self._accumulator.revision:
+            self._cache = {}
+            self._cache_revision = self._accumulator.revision
+        if label not in self._cache:
+            self._cache[label] = self._select(label)
+        return self._cache[label]
+
+    def _select(self, label):
+        frame = self._accumulator.to_frame()
+        selected = frame[self._column] == label
+        if self._masks.get(label) and 'term_mask' in frame.columns:
+            selected = selected | _mask_hits(frame['term_mask'], self._masks[label])
+        group = frame[selected]
+        if self._originals_only:
+            group = original_posts(group)
+        if group.empty:
+            return []
+        return [group.reset_index(drop=True)]
+
+    def __iter__(self):
+        return iter(self._labels)
+
+    def __len__(self):
+        return len(self._labels)
+
+
+def original_posts(frame):
+    """
+    Keep one row per original post, dropping forwarded copies of a post already in ``frame``.
+
+    The original and its forwards share a key: the forward's origin, or the post's own channel
+    and message ID. The earliest of them is kept, so trends date a post from its first appearance.
+    Rows without a message ID, such as count-only rows, are always kept.
+    """
+    import pandas as pd
+
+    if frame.empty or 'fwd_from_channel_id' not in frame.columns:
+        return frame
+
+    origin_channel = pd.to_numeric(frame['fwd_from_channel_id'], errors='coerce')
+    origin_message = pd.to_numeric(frame['fwd_from_message_id'], errors='coerce')
+    forwarded = origin_channel.notna() & origin_message.notna()
+    keys = pd.DataFrame(
+        {
+            '_origin_channel': origin_channel.where(forwarded, pd.to_numeric(frame['channel_id'], errors='coerce')),
+            '_origin_message': origin_message.where(forwarded, pd.to_numeric(frame['message_id'], errors='coerce')),
+            '_time': frame['time'],
+        },
+        index=frame.index,
+    )
+    identified = keys['_origin_message'].notna()
+    kept = keys[identified].sort_values('_time', kind='stable').drop_duplicates(['_origin_channel', '_origin_message']).index
+    return frame.loc[frame.index.isin(kept) | ~identified.to_numpy()]
+
+
+def _mask_hits(series, mask):
+    if series.dtype.kind == 'i' and mask < 2**63:
+        return (series & mask) != 0
+    return series.map(lambda value: _has_bits(value, mask)).astype(bool)
+
+
+def _has_bits(value, mask):
+    try:
+        return bool(int(value) & mask)
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,799 @@
+"""Concurrent scheduling of channel x search-term Telegram searches."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field, replace
+from datetime import timedelta
+from typing import Any
+
+from .constants import ENV_FILE_PATH
+from .env import env_float, env_int, read_env_file
+from .matching import TermMatcher
+from .ratelimit import AdaptiveRateLimiter
+from .terms import compile_search_terms
+
+
+SEARCH_CONCURRENCY_KEY = "SEARCH_CONCURRENCY"
+SEARCH_REQUESTS_PER_SECOND_KEY = "SEARCH_REQUESTS_PER_SECOND"
+SEARCH_MAX_REQUESTS_PER_SECOND_KEY = "SEARCH_MAX_REQUESTS_PER_SECOND"
+SEARCH_MODE_KEY = "SEARCH_MODE"
+SEARCH_LOCAL_SCAN_RATIO_KEY = "SEARCH_LOCAL_SCAN_RATIO"
+SEARCH_GLOBAL_RATIO_KEY = "SEARCH_GLOBAL_RATIO"
+DEFAULT_SEARCH_CONCURRENCY = 4
+DEFAULT_SEARCH_REQUESTS_PER_SECOND = 1.0
+DEFAULT_SEARCH_MAX_REQUESTS_PER_SECOND = 5.0
+DEFAULT_SEARCH_LOCAL_SCAN_RATIO = 1.0
+DEFAULT_SEARCH_GLOBAL_RATIO = 1.0
+MESSAGES_PER_PAGE = 100
+# Batches the workers may run ahead of the next result to yield, per unit of concurrency.
+RESULT_LOOKAHEAD_FACTOR = 4
+
+SEARCH_MODE_SERVER = "server"
+SEARCH_MODE_LOCAL = "local"
+SEARCH_MODE_AUTO = "auto"
+SEARCH_MODE_GLOBAL = "global"
+SEARCH_MODES = (SEARCH_MODE_SERVER, SEARCH_MODE_LOCAL, SEARCH_MODE_AUTO, SEARCH_MODE_GLOBAL)
+
+
+@dataclass(frozen=True)
+class SearchSettings:
+    concurrency: int = DEFAULT_SEARCH_CONCURRENCY
+    requests_per_second: float = DEFAULT_SEARCH_REQUESTS_PER_SECOND
+    max_requests_per_second: float = DEFAULT_SEARCH_MAX_REQUESTS_PER_SECOND
+    mode: str = SEARCH_MODE_SERVER
+    local_scan_ratio: float = DEFAULT_SEARCH_LOCAL_SCAN_RATIO
+    global_ratio: float = DEFAULT_SEARCH_GLOBAL_RATIO
+
+
+@dataclass(frozen=True)
+class SearchUnit:
+    index: int
+    channel_index: int
+    channel: Any
+    search_group: Any
+    search_term: str
+    is_first_in_channel: bool = False
+    is_last_in_channel: bool = False
+    term: Any = None
+
+    @property
+    def term_mask(self):
+        return self.term.mask if self.term is not None else 0
+
+    @property
+    def display_search(self):
+        labels = ", ".join(self.term.group_labels) if self.term is not None else self.search_group.label
+        if labels != self.search_term:
+            return f"{labels} / {self.search_term}"
+        return self.search_term
+
+
+@dataclass(frozen=True)
+class SearchUnitResult:
+    unit: SearchUnit
+    messages: list
+    search_filter: str = SEARCH_MODE_SERVER
+    previous_rows: list = field(default_factory=list)
+
+
+@dataclass
+class SearchStats:
+    """Per-run paging counters, including what date and checkpoint bounds avoided fetching."""
+
+    searches: int = 0
+    messages_fetched: int = 0
+    pages_fetched: int = 0
+    stopped_early: int = 0
+    messages_saved: int = 0
+    pages_saved: int = 0
+
+    def record(self, fetched, *, saved=0, stopped_early=False):
+        self.searches += 1
+        self.messages_fetched += fetched
+        self.pages_fetched += max(1, math.ceil(fetched / MESSAGES_PER_PAGE))
+        self.stopped_early += int(stopped_early)
+        self.messages_saved += saved
+        self.pages_saved += math.ceil(saved / MESSAGES_PER_PAGE)
+
+
+@dataclass(frozen=True)
+class SearchBatch:
+    """
+    Units fetched together with the same search mode.
+
+    Server and local batches hold units of one channel. A global batch holds one search term's
+    units across every channel it covers.
+    """
+
+    units: tuple[SearchUnit, ...]
+    mode: str = SEARCH_MODE_SERVER
+
+
+def resolve_search_settings(env_values=None, env_file_path=ENV_FILE_PATH):
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+
+    requests_per_second = env_float(
+        env_values,
+        SEARCH_REQUESTS_PER_SECOND_KEY,
+        DEFAULT_SEARCH_REQUESTS_PER_SECOND,
+        minimum=0.01,
+    )
+    max_requests_per_second = env_float(
+        env_values,
+        SEARCH_MAX_REQUESTS_PER_SECOND_KEY,
+        max(DEFAULT_SEARCH_MAX_REQUESTS_PER_SECOND, requests_per_second),
+        minimum=requests_per_second,
+    )
+
+    mode = str(env_values.get(SEARCH_MODE_KEY) or SEARCH_MODE_SERVER).strip().lower()
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"{SEARCH_MODE_KEY} must be one of: {', '.join(SEARCH_MODES)}.")
+
+    return SearchSettings(
+        concurrency=env_int(env_values, SEARCH_CONCURRENCY_KEY, DEFAULT_SEARCH_CONCURRENCY, minimum=1),
+        requests_per_second=requests_per_second,
+        max_requests_per_second=max_requests_per_second,
+        mode=mode,
+        local_scan_ratio=env_float(
+            env_values,
+            SEARCH_LOCAL_SCAN_RATIO_KEY,
+            DEFAULT_SEARCH_LOCAL_SCAN_RATIO,
+            minimum=0,
+        ),
+        global_ratio=env_float(env_values, SEARCH_GLOBAL_RATIO_KEY, DEFAULT_SEARCH_GLOBAL_RATIO, minimum=0),
+    )
+
+
+def build_rate_limiter(settings):
+    return AdaptiveRateLimiter(settings.requests_per_second, max_rate=settings.max_requests_per_second)
+
+
+def build_search_units(channels, search_term_groups):
+    """
+    Return one unit per (channel, unique term), ordered by channel and then by term file order.
+
+    A term listed in several groups, or repeated with different case or spacing, is searched
+    once; the unit's ``term`` records every group it belongs to. The unit's ``search_group`` is
+    the first of those groups.
+    """
+    compiled_terms = compile_search_terms(search_term_groups)
+    groups_by_label = {}
+    for search_group in search_term_groups:
+        groups_by_label.setdefault(search_group.label, search_group)
+    terms = compiled_terms.terms
+    units = []
+
+    for channel_index, channel in enumerate(channels):
+        for term_index, term in enumerate(terms):
+            units.append(
+                SearchUnit(
+                    index=len(units),
+                    channel_index=channel_index,
+                    channel=channel,
+                    search_group=groups_by_label[term.group_labels[0]],
+                    search_term=term.search_term,
+                    is_first_in_channel=term_index == 0,
+                    is_last_in_channel=term_index == len(terms) - 1,
+                    term=term,
+                )
+            )
+
+    return units
+
+
+def message_in_date_range(message, start_date=None, end_date=None):
+    return (start_date is None or message.date >= start_date) and (end_date is None or message.date <= end_date)
+
+
+def iter_channel_messages(client, entity, rate_limiter=None, *, on_iterator=None, **kwargs):
+    if rate_limiter is not None:
+        return rate_limiter.iter_messages(client, entity, on_iterator=on_iterator, **kwargs)
+
+    iterator = client.iter_messages(entity, **kwargs)
+    if on_iterator is not None:
+        on_iterator(iterator)
+    return iterator
+
+
+def date_bound_kwargs(end_date=None):
+    """
+    Return ``iter_messages`` arguments that start paging at ``end_date`` instead of the newest message.
+
+    Telegram returns messages strictly older than ``offset_date`` at whole-second precision, so the
+    bound is moved one second past the inclusive end date and over-fetched messages are filtered locally.
+    """
+    if end_date is None:
+        return {}
+    return {"offset_date": end_date + timedelta(seconds=1)}
+
+
+async def search_unit_messages(
+    client,
+    unit,
+    *,
+    start_date=None,
+    end_date=None,
+    rate_limiter=None,
+    min_id=None,
+    archive=None,
+    stats=None,
+):
+    kwargs = {"search": unit.search_term, **date_bound_kwargs(end_date)}
+    if min_id is not None:
+        kwargs["min_id"] = min_id
+
+    messages = []
+    iterators = []
+    fetched = 0
+    stopped_early = False
+    async for message in iter_channel_messages(
+        client,
+        unit.channel.entity,
+        rate_limiter,
+        on_iterator=iterators.append,
+        **kwargs,
+    ):
+        fetched += 1
+        # Results arrive newest first, so nothing after this point can be inside the range.
+        if start_date is not None and message.date < start_date:
+            stopped_early = True
+            break
+        if message_in_date_range(message, start_date, end_date):
+            messages.append(message)
+
+    if stats is not None:
+        total = getattr(iterators[-1], "total", None) if iterators else None
+        saved = max(0, total - fetched) if isinstance(total, int) else 0
+        stats.record(fetched, saved=saved, stopped_early=stopped_early)
+
+    if archive is not None:
+        await archive.add_messages(unit.channel.channel_id, messages)
+
+    return SearchUnitResult(unit=unit, messages=messages)
+
+
+async def scan_channel_units(
+    client,
+    units,
+    *,
+    start_date=None,
+    end_date=None,
+    rate_limiter=None,
+    min_ids=None,
+    archive=None,
+    stats=None,
+):
+    """
+    Page through a channel's history once and match every unit's term locally.
+
+    All units must belong to the same channel. ``min_ids`` optionally maps unit indexes to the
+    message ID each unit has already been searched up to. With an ``archive``, history it already
+    covers is read from disk and only newer messages are fetched from Telegram. Returns one result
+    per unit, in unit order.
+    """
+    units = tuple(units)
+    channel_id = units[0].channel.channel_id
+    matcher = TermMatcher(unit.search_term for unit in units)
+    matches = [[] for _ in units]
+    unit_min_ids = [(min_ids or {}).get(unit.index) for unit in units]
+    coverage = await archive.load_scan_coverage(channel_id, start_date) if archive is not None else None
+
+    kwargs = date_bound_kwargs(end_date)
+    if coverage is not None:
+        kwargs["min_id"] = coverage.max_message_id
+    elif unit_min_ids and None not in unit_min_ids:
+        kwargs["min_id"] = min(unit_min_ids)
+
+    def match_message(message):
+        if not message_in_date_range(message, start_date, end_date):
+            return
+        for term_index in matcher.match(message.message):
+            if unit_min_ids[term_index] is None or message.id > unit_min_ids[term_index]:
+                matches[term_index].append(message)
+
+    newest_id = None
+    fetched = 0
+    older_messages = 0
+    async for message in iter_channel_messages(client, units[0].channel.entity, rate_limiter, **kwargs):
+        fetched += 1
+        if start_date is not None and message.date < start_date:
+            # Message IDs count up from 1, so the first too-old ID approximates the history left unread.
+            older_messages = max(0, message.id - 1 - kwargs.get("min_id", 0))
+            break
+        newest_id = newest_id or message.id
+        if archive is not None:
+            await archive.add_messages(channel_id, [message])
+        match_message(message)
+
+    if coverage is not None:
+        for message in await archive.load_channel_messages(
+            channel_id,
+            start_date=start_date,
+            end_date=end_date,
+            max_message_id=coverage.max_message_id,
+        ):
+            match_message(message)
+
+    if stats is not None:
+        stats.record(fetched, saved=older_messages, stopped_early=bool(older_messages))
+
+    # Coverage is only extended when the fetched history joins up with what is already archived.
+    if archive is not None and (coverage is not None or "min_id" not in kwargs):
+        await archive.record_scan(channel_id, start_date, newest_id)
+
+    return [
+        SearchUnitResult(unit=unit, messages=unit_messages, search_filter=SEARCH_MODE_LOCAL)
+        for unit, unit_messages in zip(units, matches)
+    ]
+
+
+def message_channel_id(message):
+    return getattr(getattr(message, "peer_id", None), "channel_id", None)
+
+
+async def search_global_units(
+    client,
+    units,
+    *,
+    start_date=None,
+    end_date=None,
+    rate_limiter=None,
+    min_ids=None,
+    archive=None,
+    stats=None,
+):
+    """
+    Search one term across all joined chats with a single global search and split hits by channel.
+
+    All units must share the same search term. Hits from chats without a unit are dropped, and
+    ``min_ids`` (unit index to message ID) drops hits a checkpoint has already stored. Returns one
+    result per unit, in unit order.
+    """
+    units = tuple(units)
+    unit_by_channel = {str(unit.channel.channel_id): unit for unit in units}
+    matches = {unit.index: [] for unit in units}
+    min_ids = min_ids or {}
+
+    fetched = 0
+    stopped_early = False
+    async for message in iter_channel_messages(
+        client,
+        None,
+        rate_limiter,
+        search=units[0].search_term,
+        **date_bound_kwargs(end_date),
+    ):
+        fetched += 1
+        # Global results are also ordered newest first, across every chat.
+        if start_date is not None and message.date < start_date:
+            stopped_early = True
+            break
+
+        unit = unit_by_channel.get(str(message_channel_id(message)))
+        if unit is None or not message_in_date_range(message, start_date, end_date):
+            continue
+        min_id = min_ids.get(unit.index)
+        if min_id is not None and message.id <= min_id:
+            continue
+        matches[unit.index].append(message)
+
+    if stats is not None:
+        stats.record(fetched, stopped_early=stopped_early)
+
+    if archive is not None:
+        for unit in units:
+            if matches[unit.index]:
+                await archive.add_messages(unit.channel.channel_id, matches[unit.index])
+
+    return [
+        SearchUnitResult(unit=unit, messages=matches[unit.index], search_filter=SEARCH_MODE_GLOBAL)
+        for unit in units
+    ]
+
+
+async def message_id_before(client, entity, offset_date=None, rate_limiter=None):
+    """Return the ID of the newest message sent before ``offset_date`` (or the newest overall)."""
+    kwargs = {"limit": 1}
+    if offset_date is not None:
+        kwargs["offset_date"] = offset_date
+
+    if rate_limiter is None:
+        messages = await client.get_messages(entity, **kwargs)
+    else:
+        messages = await rate_limiter.call(client.get_messages, entity, **kwargs)
+
+    return messages[0].id if messages else None
+
+
+async def estimate_channel_messages(
+    client,
+    entity,
+    *,
+    start_date=None,
+    end_date=None,
+    rate_limiter=None,
+    archived_max_id=None,
+):
+    """
+    Estimate how many messages must be fetched to cover the date range, from message-ID boundaries.
+
+    ``archived_max_id`` is the newest message already archived for the range, if any.
+    """
+    newest_offset = end_date + timedelta(seconds=1) if end_date is not None else None
+    newest_id = await message_id_before(client, entity, newest_offset, rate_limiter)
+    if newest_id is None:
+        return 0
+
+    oldest_id = 0
+    if start_date is not None:
+        oldest_id = await message_id_before(client, entity, start_date, rate_limiter) or 0
+    if archived_max_id is not None:
+        oldest_id = max(oldest_id, archived_max_id)
+
+    return max(0, newest_id - oldest_id)
+
+
+def choose_search_mode(term_count, channel_messages, local_scan_ratio=DEFAULT_SEARCH_LOCAL_SCAN_RATIO):
+    """
+    Pick local scanning when paging the channel once costs no more than the per-term searches.
+
+    Server search needs at least one request per term, while a local scan needs one request per
+    page of channel history. ``local_scan_ratio`` scales how many history pages one term search
+    is worth.
+    """
+    scan_pages = math.ceil(channel_messages / MESSAGES_PER_PAGE)
+    if scan_pages <= term_count * local_scan_ratio:
+        return SEARCH_MODE_LOCAL
+    return SEARCH_MODE_SERVER
+
+
+async def count_search_matches(client, entity, search_term, *, offset_date=None, rate_limiter=None):
+    """
+    Return how many messages sent before ``offset_date`` a search finds, without fetching any.
+
+    A ``limit=0`` search only returns the server-reported total. ``entity`` of None counts a
+    global search.
+    """
+    kwargs = {"search": search_term, "limit": 0}
+    if offset_date is not None:
+        kwargs["offset_date"] = offset_date
+    if rate_limiter is None:
+        messages = await client.get_messages(entity, **kwargs)
+    else:
+        messages = await rate_limiter.call(client.get_messages, entity, **kwargs)
+    total = getattr(messages, "total", None)
+    return total if isinstance(total, int) else len(messages)
+
+
+async def count_global_matches(client, search_term, *, end_date=None, rate_limiter=None):
+    """Return how many messages a global search for ``search_term`` finds up to ``end_date``."""
+    return await count_search_matches(
+        client,
+        None,
+        search_term,
+        offset_date=date_bound_kwargs(end_date).get("offset_date"),
+        rate_limiter=rate_limiter,
+    )
+
+
+def choose_global_search(channel_count, global_matches, global_ratio=DEFAULT_SEARCH_GLOBAL_RATIO):
+    """
+    Pick a global search when paging through every hit costs no more than the per-channel searches.
+
+    Per-channel search needs at least one request per channel, while a global search needs one
+    request per page of hits from all joined chats. ``global_ratio`` scales how many global pages
+    one per-channel search is worth.
+    """
+    global_pages = max(1, math.ceil(global_matches / MESSAGES_PER_PAGE))
+    return channel_count > 1 and global_pages <= channel_count * global_ratio
+
+
+async def plan_global_batches(client, units, settings, *, end_date=None, rate_limiter=None, joined_channel_ids=None):
+    """
+    Return global batches for sparse terms and the units left for per-channel search.
+
+    Global search only covers joined chats, so units for channels outside ``joined_channel_ids``
+    always stay per-channel. Each term costs one count request to plan.
+    """
+    term_units = {}
+    remaining = []
+    for unit in units:
+        if joined_channel_ids is not None and str(unit.channel.channel_id) not in joined_channel_ids:
+            remaining.append(unit)
+        else:
+            term_units.setdefault(unit.search_term, []).append(unit)
+
+    semaphore = asyncio.Semaphore(settings.concurrency)
+    batches = []
+
+    async def plan_term(search_term, grouped_units):
+        if len(grouped_units) < 2:
+            remaining.extend(grouped_units)
+            return
+        async with semaphore:
+            global_matches = await count_global_matches(
+                client,
+                search_term,
+                end_date=end_date,
+                rate_limiter=rate_limiter,
+            )
+        if choose_global_search(len(grouped_units), global_matches, settings.global_ratio):
+            batches.append(SearchBatch(units=tuple(grouped_units), mode=SEARCH_MODE_GLOBAL))
+        else:
+            remaining.extend(grouped_units)
+
+    await asyncio.gather(*(plan_term(search_term, grouped_units) for search_term, grouped_units in term_units.items()))
+
+    batches.sort(key=lambda batch: batch.units[0].index)
+    remaining.sort(key=lambda unit: unit.index)
+    return batches, remaining
+
+
+async def plan_search_batches(
+    client,
+    units,
+    settings,
+    *,
+    start_date=None,
+    end_date=None,
+    rate_limiter=None,
+    archive=None,
+    joined_channel_ids=None,
+):
+    """
+    Group units into batches, choosing server search or a local scan for each channel.
+
+    In global mode, sparse terms are searched once across all joined channels and the remaining
+    units fall back to per-channel server search. In server mode, channels whose history an
+    ``archive`` already covers from ``start_date`` are planned as in auto mode, so the archived
+    history is matched locally instead of being searched again.
+    """
+    global_batches = []
+    if settings.mode == SEARCH_MODE_GLOBAL:
+        global_batches, units = await plan_global_batches(
+            client,
+            units,
+            settings,
+            end_date=end_date,
+            rate_limiter=rate_limiter,
+            joined_channel_ids=joined_channel_ids,
+        )
+        settings = replace(settings, mode=SEARCH_MODE_SERVER)
+
+    channel_units = {}
+    for unit in units:
+        channel_units.setdefault(unit.channel_index, []).append(unit)
+
+    modes = {channel_index: settings.mode for channel_index in channel_units}
+    planned_units = channel_units if settings.mode == SEARCH_MODE_AUTO else {}
+    if settings.mode == SEARCH_MODE_SERVER and archive is not None:
+        planned_units = {
+            channel_index: grouped_units
+            for channel_index, grouped_units in channel_units.items()
+            if await archive.load_scan_coverage(grouped_units[0].channel.channel_id, start_date) is not None
+        }
+    if planned_units:
+        semaphore = asyncio.Semaphore(settings.concurrency)
+
+        async def plan_channel(channel_index, grouped_units):
+            channel = grouped_units[0].channel
+            coverage = await archive.load_scan_coverage(channel.channel_id, start_date) if archive is not None else None
+            async with semaphore:
+                channel_messages = await estimate_channel_messages(
+                    client,
+                    channel.entity,
+                    start_date=start_date,
+                    end_date=end_date,
+                    rate_limiter=rate_limiter,
+                    archived_max_id=coverage.max_message_id if coverage is not None else None,
+                )
+            modes[channel_index] = choose_search_mode(len(grouped_units), channel_messages, settings.local_scan_ratio)
+
+        await asyncio.gather(
+            *(plan_channel(channel_index, grouped_units) for channel_index, grouped_units in planned_units.items())
+        )
+
+    batches = []
+    for channel_index, grouped_units in channel_units.items():
+        if modes[channel_index] == SEARCH_MODE_LOCAL:
+            batches.append(SearchBatch(units=tuple(grouped_units), mode=SEARCH_MODE_LOCAL))
+        else:
+            batches.extend(SearchBatch(units=(unit,), mode=SEARCH_MODE_SERVER) for unit in grouped_units)
+
+    return global_batches + batches
+
+
+async def run_search_batch(
+    client,
+    batch,
+    *,
+    start_date=None,
+    end_date=None,
+    rate_limiter=None,
+    checkpoints=None,
+    archive=None,
+    stats=None,
+    metrics=None,
+):
+    """
+    Search one batch, resuming each unit from its checkpoint when a checkpoint store is given.
+
+    Checkpointed units only fetch messages newer than their high-water mark and carry their
+    previously stored rows, relabelled with the unit's group, term and mask, in ``previous_rows``. With a ``RunMetrics`` each server search is
+    timed on its own, and a local scan or global search once for all of its units.
+    """
+    started = time.perf_counter()
+    min_ids = {}
+    if checkpoints is not None:
+        for unit in batch.units:
+            min_ids[unit.index] = checkpoints.min_id_for(
+                unit.channel.channel_id,
+                unit.search_term,
+                batch.mode,
+                start_date,
+            )
+
+    if batch.mode == SEARCH_MODE_LOCAL:
+        results = await scan_channel_units(
+            client,
+            batch.units,
+            start_date=start_date,
+            end_date=end_date,
+            rate_limiter=rate_limiter,
+            min_ids=min_ids,
+            archive=archive,
+            stats=stats,
+        )
+    elif batch.mode == SEARCH_MODE_GLOBAL:
+        results = await search_global_units(
+            client,
+            batch.units,
+            start_date=start_date,
+            end_date=end_date,
+            rate_limiter=rate_limiter,
+            min_ids=min_ids,
+            archive=archive,
+            stats=stats,
+        )
+    else:
+        results = []
+        for unit in batch.units:
+            result = await search_unit_messages(
+                client,
+                unit,
+                start_date=start_date,
+                end_date=end_date,
+                rate_limiter=rate_limiter,
+                min_id=min_ids.get(unit.index),
+                archive=archive,
+                stats=stats,
+            )
+            results.append(result)
+            if metrics is not None:
+                metrics.record_unit(
+                    unit.channel.channel_id,
+                    unit.channel.title,
+                    [unit.search_term],
+                    batch.mode,
+                    time.perf_counter() - started,
+                    len(result.messages),
+                )
+                started = time.perf_counter()
+
+    if metrics is not None and batch.mode in {SEARCH_MODE_LOCAL, SEARCH_MODE_GLOBAL}:
+        channels = {unit.channel.channel_id: unit.channel.title for unit in batch.units}
+        metrics.record_unit(
+            next(iter(channels)) if len(channels) == 1 else None,
+            next(iter(channels.values())) if len(channels) == 1 else f"{len(channels)} channels",
+            list(dict.fromkeys(unit.search_term for unit in batch.units)),
+            batch.mode,
+            time.perf_counter() - started,
+            sum(len(result.messages) for result in results),
+        )
+
+    if checkpoints is None:
+        return results
+
+    return [
+        replace(
+            result,
+            previous_rows=[
+                # Stored rows keep the labels and mask of the run that saved them, which differ
+                # once the search terms file changes, so they take the unit's current ones.
+                {
+                    **row,
+                    "search_group": result.unit.search_group.label,
+                    "search_term": result.unit.search_term,
+                    "term_mask": result.unit.term_mask,
+                }
+                for row in checkpoints.stored_rows(
+                    result.unit.channel.channel_id,
+                    result.unit.search_term,
+                    batch.mode,
+                    start_date,
+                    end_date,
+                )
+            ],
+        )
+        for result in results
+    ]
+
+
+async def iter_search_results(units, search_func, *, max_concurrency=DEFAULT_SEARCH_CONCURRENCY, max_ahead=None):
+    """Run ``search_func`` for every unit, yielding results in unit order (see ``iter_batch_results``)."""
+
+    async def search_single(batch):
+        return [await search_func(batch[0])]
+
+    async for result in iter_batch_results(
+        [(unit,) for unit in units], search_single, max_concurrency=max_concurrency, max_ahead=max_ahead
+    ):
+        yield result
+
+
+async def iter_batch_results(batches, search_func, *, max_concurrency=DEFAULT_SEARCH_CONCURRENCY, max_ahead=None):
+    """
+    Run ``search_func`` for every batch with at most ``max_concurrency`` batches in flight.
+
+    ``search_func`` returns one result per unit in the batch. Results are yielded in the order the
+    batches were given as soon as every earlier batch has finished, so callers can process them
+    incrementally while still building deterministic outputs. Workers start at most ``max_ahead``
+    batches (default ``RESULT_LOOKAHEAD_FACTOR * max_concurrency``) beyond the next one to yield,
+    so a stalled early batch does not let later results pile up without bound. The first failing
+    batch cancels the remaining searches and its exception is re-raised to the caller.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+    if max_ahead is None:
+        max_ahead = RESULT_LOOKAHEAD_FACTOR * max_concurrency
+    if max_ahead < max_concurrency:
+        raise ValueError("max_ahead must be at least max_concurrency.")
+
+    batches = list(batches)
+    if not batches:
+        return
+
+    pending_batches = iter(enumerate(batches))
+    completed = asyncio.Queue()
+    # One slot per batch started but not yet yielded.
+    window = asyncio.Semaphore(max_ahead)
+
+    async def worker():
+        while True:
+            await window.acquire()
+            try:
+                position, batch = next(pending_batches)
+            except StopIteration:
+                window.release()
+                return
+            try:
+                results = await search_func(batch)
+            except Exception as exc:
+                await completed.put((position, None, exc))
+                return
+            await completed.put((position, results, None))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(max_concurrency, len(batches)))]
+    finished = {}
+    next_position = 0
+
+    try:
+        while next_position < len(batches):
+            position, results, error = await completed.get()
+            if error is not None:
+                raise error
+
+            finished[position] = results
+            while next_position in finished:
+                for result in finished.pop(next_position):
+                    yield result
+                next_position += 1
+                window.release()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,90 @@
+"""Unique search terms and the group-membership bitmasks used to fan results out to groups."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+
+from .matching import normalize_match_text
+
+
+@dataclass(frozen=True)
+class CompiledTerm:
+    """
+    One distinct search term and every group that lists it.
+
+    ``bit`` is the term's position in a result row's ``term_mask``. ``search_term`` is the first
+    spelling in the search terms file and is what gets sent to Telegram.
+    """
+
+    bit: int
+    search_term: str
+    key: str
+    group_labels: tuple[str, ...]
+
+    @property
+    def mask(self):
+        return 1 << self.bit
+
+
+@dataclass(frozen=True)
+class CompiledTerms:
+    terms: tuple[CompiledTerm, ...]
+    group_labels: tuple[str, ...]
+    group_masks: dict
+
+    def term_for(self, search_term):
+        return self._by_key.get(normalize_match_text(search_term))
+
+    def mask_for(self, search_term):
+        term = self.term_for(search_term)
+        return term.mask if term is not None else 0
+
+    def groups_for_mask(self, mask):
+        return [label for label in self.group_labels if self.group_masks[label] & mask]
+
+    def terms_for_mask(self, mask):
+        return [term.search_term for term in self.terms if term.mask & mask]
+
+    @cached_property
+    def _by_key(self):
+        return {term.key: term for term in self.terms}
+
+
+def compile_search_terms(search_term_groups):
+    """
+    Collapse terms that repeat within or across groups, comparing them case- and space-insensitively.
+
+    Telegram's search is case-insensitive, so each distinct term only needs searching once per
+    channel. ``group_masks`` maps every group label to the bits of its terms.
+    """
+    order = []
+    spellings = {}
+    labels_by_key = {}
+    group_labels = []
+    group_masks = {}
+
+    for search_group in search_term_groups:
+        if search_group.label not in group_masks:
+            group_labels.append(search_group.label)
+            group_masks[search_group.label] = 0
+        for search_term in search_group.terms:
+            key = normalize_match_text(search_term)
+            if not key:
+                continue
+            if key not in spellings:
+                order.append(key)
+                spellings[key] = search_term
+                labels_by_key[key] = []
+            if search_group.label not in labels_by_key[key]:
+                labels_by_key[key].append(search_group.label)
+
+    terms = tuple(
+        CompiledTerm(bit=bit, search_term=spellings[key], key=key, group_labels=tuple(labels_by_key[key]))
+        for bit, key in enumerate(order)
+    )
+    for term in terms:
+        for label in term.group_labels:
+            group_masks[label] |= term.mask
+
+    return CompiledTerms(terms=terms, group_labels=tuple(group_labels), group_masks=group_masks)
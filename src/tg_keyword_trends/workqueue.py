@@ -0,0 +1,253 @@
+"""SQLite work queue on shared storage for spreading search units across machines."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .constants import ENV_FILE_PATH
+from .env import env_int, read_env_file
+
+
+WORK_QUEUE_LEASE_SECONDS_KEY = "WORK_QUEUE_LEASE_SECONDS"
+WORK_QUEUE_MAX_ATTEMPTS_KEY = "WORK_QUEUE_MAX_ATTEMPTS"
+DEFAULT_WORK_QUEUE_LEASE_SECONDS = 600
+DEFAULT_WORK_QUEUE_MAX_ATTEMPTS = 3
+SHARDS_DIRNAME = "shards"
+
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    shard_path TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    id: int
+    job_key: str
+    payload: dict
+    lease_owner: str
+    attempts: int
+
+
+def resolve_work_queue_settings(env_values=None, env_file_path=ENV_FILE_PATH):
+    """Return ``(lease_seconds, max_attempts)`` from '.env'."""
+    if env_values is None:
+        env_values = read_env_file(env_file_path)
+    return (
+        env_int(env_values, WORK_QUEUE_LEASE_SECONDS_KEY, DEFAULT_WORK_QUEUE_LEASE_SECONDS, minimum=1),
+        env_int(env_values, WORK_QUEUE_MAX_ATTEMPTS_KEY, DEFAULT_WORK_QUEUE_MAX_ATTEMPTS, minimum=1),
+    )
+
+
+class WorkQueue:
+    """
+    Work units with leases, stored in one SQLite file next to a ``shards/`` folder.
+
+    Every state change runs in a ``BEGIN IMMEDIATE`` transaction, so SQLite's file lock keeps
+    workers on different machines from leasing the same unit without an external broker. A lease
+    that is not renewed within ``lease_seconds`` is handed to the next worker that asks for work.
+    The rollback journal is used rather than WAL because WAL needs shared memory on one host.
+    Calls are serialised by a lock, so a worker can run them on threads off its event loop.
+    """
+
+    def __init__(
+        self,
+        path,
+        *,
+        lease_seconds=DEFAULT_WORK_QUEUE_LEASE_SECONDS,
+        max_attempts=DEFAULT_WORK_QUEUE_MAX_ATTEMPTS,
+        clock=time.time,
+    ):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.clock = clock
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+
+    @property
+    def shards_dir(self):
+        return self.path.parent / SHARDS_DIRNAME
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection, self._lock)
+
+    def _fetch(self, query, parameters=()):
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def set_run_value(self, key, value):
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO run (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, ensure_ascii=False)),
+            )
+
+    def run_value(self, key, default=None):
+        rows = self._fetch("SELECT value FROM run WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def publish(self, jobs):
+        """Add ``(job_key, payload)`` pairs; keys that are already queued are left unchanged."""
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO jobs (job_key, payload, status) VALUES (?, ?, ?)",
+                [(job_key, json.dumps(payload, ensure_ascii=False), STATUS_PENDING) for job_key, payload in jobs],
+            )
+            return connection.total_changes - before
+
+    def lease(self, owner):
+        """Lease the oldest pending unit to ``owner``, first re-queueing expired leases."""
+        now = self.clock()
+        with self._transaction() as connection:
+            self._requeue_expired(connection, now)
+            row = connection.execute(
+                "SELECT id, job_key, payload, attempts FROM jobs WHERE status = ? ORDER BY id LIMIT 1",
+                (STATUS_PENDING,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, job_key, payload, attempts = row
+            connection.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = ? WHERE id = ?",
+                (STATUS_LEASED, owner, now + self.lease_seconds, attempts + 1, job_id),
+            )
+        return WorkItem(id=job_id, job_key=job_key, payload=json.loads(payload), lease_owner=owner, attempts=attempts + 1)
+
+    def _requeue_expired(self, connection, now):
+        connection.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_owner = NULL, "
+            "lease_expires = NULL, error = COALESCE(error, 'lease expired') "
+            "WHERE status = ? AND lease_expires < ?",
+            (self.max_attempts, STATUS_FAILED, STATUS_PENDING, STATUS_LEASED, now),
+        )
+
+    def heartbeat(self, item):
+        """Extend ``item``'s lease. Returns False when the lease was lost to another worker."""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (self.clock() + self.lease_seconds, item.id, STATUS_LEASED, item.lease_owner),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, item, rows):
+        """Write ``item``'s result shard and mark it done, unless its lease was lost."""
+        self.shards_dir.mkdir(parents=True, exist_ok=True)
+        shard_path = self.shards_dir / f"{item.id:08d}.jsonl"
+        temporary_path = shard_path.with_name(f"{shard_path.name}.{os.getpid()}.tmp")
+        with temporary_path.open("w", encoding="utf-8") as shard_file:
+            for row in rows:
+                json.dump(row, shard_file, ensure_ascii=False, default=_json_default)
+                shard_file.write("\n")
+
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, shard_path = ?, lease_expires = NULL, error = NULL "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (STATUS_DONE, shard_path.name, item.id, STATUS_LEASED, item.lease_owner),
+            )
+            if cursor.rowcount != 1:
+                temporary_path.unlink(missing_ok=True)
+                return False
+            os.replace(temporary_path, shard_path)
+        return True
+
+    def fail(self, item, error):
+        """Release ``item`` after an error, giving up on it after ``max_attempts`` leases."""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_owner = NULL, "
+                "lease_expires = NULL, error = ? WHERE id = ? AND lease_owner = ?",
+                (self.max_attempts, STATUS_FAILED, STATUS_PENDING, str(error), item.id, item.lease_owner),
+            )
+
+    def counts(self):
+        counts = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for status, count in self._fetch("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def has_open_jobs(self):
+        counts = self.counts()
+        return bool(counts[STATUS_PENDING] or counts[STATUS_LEASED])
+
+    def done_shards(self):
+        """Return ``(payload, shard_name)`` for every finished unit in publishing order."""
+        return [
+            (json.loads(payload), shard_name)
+            for payload, shard_name in self._fetch(
+                "SELECT payload, shard_path FROM jobs WHERE status = ? ORDER BY id",
+                (STATUS_DONE,),
+            )
+        ]
+
+    def read_shard(self, shard_name):
+        with (self.shards_dir / shard_name).open("r", encoding="utf-8") as shard_file:
+            return [json.loads(line) for line in shard_file if line.strip()]
+
+    def iter_done_shards(self):
+        """Yield ``(payload, rows)`` for every finished unit in publishing order."""
+        for payload, shard_name in self.done_shards():
+            yield payload, self.read_shard(shard_name)
+
+
+class _ImmediateTransaction:
+    def __init__(self, connection, lock):
+        self.connection = connection
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            self.connection.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.lock.release()
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,87 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.accounts import (
+    AccountShard,
+    add_extra_account_channels,
+    assign_channels_to_accounts,
+    load_extra_accounts,
+    shard_channels,
+    shard_for_channel,
+)
+from tg_keyword_trends.channels import ChannelTarget
+
+
+def target(channel_id, owner):
+    return ChannelTarget(title=f"Channel {channel_id}", entity=f"{owner}-{channel_id}", channel_id=channel_id)
+
+
+class AccountConfigTests(unittest.TestCase):
+    def test_load_extra_accounts_reads_numbered_keys(self):
+        accounts = load_extra_accounts(
+            {
+                "TELEGRAM_SESSION_2": "second",
+                "TELEGRAM_API_ID_2": "22",
+                "TELEGRAM_API_HASH_2": "hash2",
+                "TELEGRAM_SESSION_3": "third",
+                "TELEGRAM_SESSION_5": "skipped after a gap",
+            },
+            default_api_id="11",
+            default_api_hash="hash1",
+        )
+
+        self.assertEqual([account.session_name for account in accounts], ["second", "third"])
+        self.assertEqual((accounts[0].api_id, accounts[0].api_hash), (22, "hash2"))
+        self.assertEqual((accounts[1].api_id, accounts[1].api_hash), (11, "hash1"))
+        self.assertEqual(accounts[1].phone_key, "TELEGRAM_PHONE_3")
+        self.assertEqual(accounts[1].password_key, "TELEGRAM_2FA_PASSWORD_3")
+
+    def test_load_extra_accounts_validates_api_id(self):
+        self.assertEqual(load_extra_accounts({}), [])
+
+        with self.assertRaises(ValueError):
+            load_extra_accounts({"TELEGRAM_SESSION_2": "second", "TELEGRAM_API_ID_2": "abc", "TELEGRAM_API_HASH_2": "h"})
+        with self.assertRaises(ValueError):
+            load_extra_accounts({"TELEGRAM_SESSION_2": "second"})
+
+
+class ChannelShardingTests(unittest.TestCase):
+    def test_assign_routes_exclusive_channels_and_balances_shared_ones(self):
+        assignments = assign_channels_to_accounts(
+            [1, 2, 3, 4, 5, 6],
+            [{1, 2, 3, 4}, {3, 4, 5}],
+        )
+
+        # 1 and 2 belong to account 0 and 5 to account 1; shared 3 and 4 go to the least loaded account.
+        self.assertEqual(assignments, [0, 0, 1, 1, 1, 0])
+
+    def test_shard_channels_uses_each_accounts_own_entity(self):
+        primary = AccountShard(name="1", client=None, rate_limiter=None, dialog_targets={"1": target(1, "p")})
+        extra = AccountShard(name="2", client=None, rate_limiter=None, dialog_targets={"2": target(2, "e")})
+        shards = [primary, extra]
+
+        channels = add_extra_account_channels(shards, [target(1, "p"), target(9, "p")])
+        routed = shard_channels(shards, channels)
+
+        self.assertEqual([channel.entity for channel in routed], ["p-1", "p-9", "e-2"])
+        self.assertIs(shard_for_channel(shards, 2), extra)
+        self.assertIs(shard_for_channel(shards, 9), primary)
+
+    def test_add_extra_account_channels_can_limit_to_given_ids(self):
+        extra = AccountShard(name="2", client=None, rate_limiter=None, dialog_targets={"2": target(2, "e"), "3": target(3, "e")})
+        primary = AccountShard(name="1", client=None, rate_limiter=None)
+
+        channels = add_extra_account_channels([primary, extra], [], channel_ids={"3"})
+
+        self.assertEqual([channel.channel_id for channel in channels], [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
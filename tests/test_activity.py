@@ -0,0 +1,145 @@
+import asyncio
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.activity import (
+    ActivityIndex,
+    ActivitySettings,
+    activity_days,
+    boundary_days,
+    choose_sample_days,
+    resolve_activity_settings,
+    sample_daily_activity,
+)
+from tg_keyword_trends.plotting import calculate_percentage_over_time
+
+
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class BoundaryClient:
+    """Fake channel that posts ``per_day`` messages every day from ``EPOCH``."""
+
+    def __init__(self, per_day):
+        self.per_day = per_day
+        self.probes = []
+
+    async def get_messages(self, entity, limit=None, offset_date=None):
+        self.probes.append(offset_date)
+        last_id = (offset_date - EPOCH).days * self.per_day
+        return [SimpleNamespace(id=last_id)] if last_id > 0 else []
+
+
+class ActivitySamplingTests(unittest.TestCase):
+    def test_daily_counts_come_from_midnight_boundaries(self):
+        busy, quiet = BoundaryClient(100), BoundaryClient(3)
+        channels = [
+            (busy, SimpleNamespace(entity="busy"), None),
+            (quiet, SimpleNamespace(entity="quiet"), None),
+            (quiet, SimpleNamespace(entity=None), None),
+        ]
+        days = activity_days(
+            datetime(2026, 1, 3, 10, tzinfo=timezone.utc), datetime(2026, 1, 5, 23, 59, tzinfo=timezone.utc)
+        )
+
+        sample = asyncio.run(sample_daily_activity(channels, days, ActivitySettings(enabled=True)))
+
+        self.assertEqual(days, [date(2026, 1, 3), date(2026, 1, 4), date(2026, 1, 5)])
+        self.assertEqual(sample.channels, 2)
+        self.assertEqual(sample.probes, 8)
+        self.assertEqual(len(busy.probes), 4)
+        self.assertEqual(
+            sample.daily_messages,
+            {datetime(2026, 1, 3): 103.0, datetime(2026, 1, 4): 103.0, datetime(2026, 1, 5): 103.0},
+        )
+
+    def test_probe_budget_widens_the_sampling_step(self):
+        days = activity_days(date(2026, 1, 2), date(2026, 1, 11))
+
+        self.assertEqual(boundary_days(days, 4), [date(2026, 1, 2), date(2026, 1, 6), date(2026, 1, 10), date(2026, 1, 12)])
+        self.assertEqual(choose_sample_days([10, 10], ActivitySettings(max_probes=100)), 1)
+        self.assertEqual(choose_sample_days([10, 10], ActivitySettings(max_probes=8)), 4)
+        self.assertEqual(choose_sample_days([10] * 50, ActivitySettings(max_probes=8)), 10)
+
+        client = BoundaryClient(6)
+        sample = asyncio.run(
+            sample_daily_activity([(client, SimpleNamespace(entity="c"), None)], days, ActivitySettings(sample_days=4))
+        )
+        self.assertEqual(sample.probes, 4)
+        self.assertEqual(set(sample.daily_messages.values()), {6.0})
+        self.assertEqual(len(sample.daily_messages), 10)
+
+    def test_sampled_totals_replace_the_matched_id_estimate(self):
+        results = {
+            "alpha": [
+                pd.DataFrame(
+                    {
+                        "time": [datetime(2026, 1, 3, 9, tzinfo=timezone.utc), datetime(2026, 1, 3, 17, tzinfo=timezone.utc)],
+                        "message_id": [10, 12],
+                        "channel_id": [1, 1],
+                    }
+                )
+            ]
+        }
+
+        estimated = calculate_percentage_over_time(results)
+        sampled = calculate_percentage_over_time(results, total_daily_messages={datetime(2026, 1, 3): 200.0})
+
+        self.assertEqual(estimated["total_messages"].tolist(), [3.0])
+        self.assertEqual(sampled["total_messages"].tolist(), [200.0])
+        self.assertEqual(sampled["percentage"].tolist(), [1.0])
+
+    def test_index_is_filled_incrementally_and_skips_unfinished_days(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            index = ActivityIndex(Path(temp_dir) / "activity.sqlite3")
+            client = BoundaryClient(5)
+            channels = [(client, SimpleNamespace(entity="c", channel_id=1), None)]
+            settings = ActivitySettings(enabled=True)
+
+            first = asyncio.run(
+                sample_daily_activity(
+                    channels, activity_days(date(2026, 1, 2), date(2026, 1, 4)), settings, index, today=date(2026, 1, 4)
+                )
+            )
+            second = asyncio.run(
+                sample_daily_activity(
+                    channels, activity_days(date(2026, 1, 2), date(2026, 1, 6)), settings, index, today=date(2026, 1, 9)
+                )
+            )
+            stored = index.channel_days(1, date(2026, 1, 1), date(2026, 1, 31))
+            index.close()
+
+        self.assertEqual(first.probes, 4)
+        self.assertEqual(second.indexed_days, 2)
+        # Jan 4 to 6 need midnights Jan 4 to 7; Jan 4 is the end of the indexed Jan 3.
+        self.assertEqual(second.probes, 3)
+        self.assertEqual(set(second.daily_messages.values()), {5.0})
+        self.assertEqual(sorted(stored), [date(2026, 1, day) for day in range(2, 7)])
+        self.assertEqual((stored[date(2026, 1, 3)].first_id, stored[date(2026, 1, 3)].last_id), (11, 15))
+
+    def test_resolve_activity_settings(self):
+        settings = resolve_activity_settings(
+            {"ACTIVITY_SAMPLING": "yes", "ACTIVITY_SAMPLE_DAYS": "7"}, base_dir="/data"
+        )
+
+        self.assertTrue(settings.enabled)
+        self.assertEqual(settings.sample_days, 7)
+        self.assertEqual(settings.index_path, Path("/data/TG-Archive/activity.sqlite3"))
+        self.assertFalse(resolve_activity_settings({}).enabled)
+        self.assertIsNone(resolve_activity_settings({"ACTIVITY_INDEX": "no"}).index_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,14 @@
+import contextlib
+import io
+import socket
 import sys
 import tempfile
+import tracemalloc
 import unittest
 from datetime import datetime, timezone
 from pathlib import Path
-from unittest.mock import AsyncMock, Mock
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
 
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -11,11 +16,31 @@ SRC_ROOT = REPO_ROOT / "src"
 if str(SRC_ROOT) not in sys.path:
     sys.path.insert(0, str(SRC_ROOT))
 
-from tg_keyword_trends.app import _format_message_date, download_queued_media, run_async
+from tg_keyword_trends.app import _format_message_date, download_queued_media, parse_args, run_async, run_jobs
 from tg_keyword_trends.media import MEDIA_STATUS_DOWNLOADED, MediaDownloadJob, load_media_manifest
+from tg_keyword_trends.metrics import MetricsSettings
+from tg_keyword_trends.openmetrics import OpenMetricsSettings
 
 
 class AppMediaTests(unittest.TestCase):
+    def test_parse_args_reads_resume_folder(self):
+        self.assertIsNone(parse_args([]).resume)
+        self.assertEqual(parse_args(["--resume", "TG-Search_20260102_030405"]).resume, "TG-Search_20260102_030405")
+
+    def test_parse_args_reads_work_queue_modes(self):
+        self.assertEqual(parse_args(["--worker", "queue.sqlite"]).worker, "queue.sqlite")
+        self.assertEqual(parse_args(["--publish-queue", "queue.sqlite"]).publish_queue, "queue.sqlite")
+        self.assertEqual(parse_args(["--merge", "queue.sqlite"]).merge, "queue.sqlite")
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--resume", "TG-Search_20260102_030405", "--worker", "queue.sqlite"])
+
+    def test_parse_args_requires_terms_for_headless_options(self):
+        self.assertEqual(parse_args(["--job-file", "jobs.toml"]).job_file, "jobs.toml")
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--last-days", "7"])
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--terms", "terms.txt", "--job-file", "jobs.toml"])
+
     def test_format_message_date_uses_isoformat_when_available(self):
         value = datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc)
 
@@ -44,5 +69,68 @@ class AppMediaTests(unittest.TestCase):
             self.assertEqual(load_media_manifest(manifest_path)[0]["search_term"], "alpha")
 
 
+def make_count_job(name, terms_file):
+    return SimpleNamespace(
+        name=name,
+        run_suffix=name,
+        channels=None,
+        search_terms_file=terms_file,
+        start_date=None,
+        end_date=None,
+        download_media=False,
+        count_only=True,
+    )
+
+
+class AppJobTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.terms_file = Path(self.temp_dir.name) / "terms.txt"
+        self.terms_file.write_text("alpha\n", encoding="utf-8")
+        self.client = Mock()
+        self.client.get_dialogs = AsyncMock(return_value=[])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_jobs_quietly(self, jobs):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            return run_async(run_jobs(self.client, jobs))
+
+    def test_failed_job_releases_its_openmetrics_port_before_the_next_job(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        searched = []
+
+        async def count_workflow(*args, job, **kwargs):
+            if job.name == "second":
+                # The first job's endpoint must be gone by the time the next job runs.
+                with socket.socket() as listener:
+                    listener.bind(("127.0.0.1", port))
+            searched.append(job.name)
+            raise RuntimeError("search failed")
+
+        with patch(
+            "tg_keyword_trends.app.resolve_openmetrics_settings",
+            side_effect=[OpenMetricsSettings(port=port), OpenMetricsSettings()],
+        ), patch("tg_keyword_trends.app.run_count_workflow", count_workflow):
+            failed_jobs = self.run_jobs_quietly([make_count_job(name, self.terms_file) for name in ("first", "second")])
+
+        self.assertEqual(failed_jobs, ["first", "second"])
+        self.assertEqual(searched, ["first", "second"])
+
+    def test_failed_job_stops_its_profiler_and_memory_tracing(self):
+        with patch(
+            "tg_keyword_trends.app.resolve_metrics_settings",
+            return_value=MetricsSettings(trace_memory=True, profiler="cprofile"),
+        ), patch("tg_keyword_trends.app.run_count_workflow", AsyncMock(side_effect=RuntimeError("search failed"))):
+            failed_jobs = self.run_jobs_quietly([make_count_job("first", self.terms_file)])
+
+        self.assertEqual(failed_jobs, ["first"])
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIsNone(sys.getprofile())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,191 @@
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.archive import (
+    MESSAGE_ARCHIVE_KEY,
+    MESSAGE_ARCHIVE_MAX_AGE_DAYS_KEY,
+    MessageArchive,
+    media_descriptor,
+    resolve_archive_settings,
+)
+from tg_keyword_trends.channels import ChannelTarget
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.search import (
+    SEARCH_MODE_LOCAL,
+    SEARCH_MODE_SERVER,
+    SearchSettings,
+    build_search_units,
+    plan_search_batches,
+    scan_channel_units,
+)
+
+
+def make_message(message_id, day, text="text", media=None):
+    return SimpleNamespace(
+        id=message_id,
+        date=datetime(2026, 1, day, tzinfo=timezone.utc),
+        message=text,
+        views=10 * message_id,
+        forwards=message_id,
+        media=media,
+        file=SimpleNamespace(name="photo.jpg", mime_type="image/jpeg", size=2048) if media else None,
+    )
+
+
+class MessageArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "archive" / "messages.sqlite3"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_resolve_archive_settings_reads_env_values(self):
+        settings = resolve_archive_settings(
+            {MESSAGE_ARCHIVE_KEY: "yes", MESSAGE_ARCHIVE_MAX_AGE_DAYS_KEY: "30"},
+            base_dir=self.temp_dir.name,
+        )
+
+        self.assertTrue(settings.enabled)
+        self.assertEqual(settings.max_age_days, 30)
+        self.assertEqual(settings.path, Path(self.temp_dir.name) / "TG-Archive" / "messages.sqlite3")
+        self.assertFalse(resolve_archive_settings({}).enabled)
+
+    def test_messages_are_buffered_until_batch_size_and_read_back_newest_first(self):
+        async def scenario():
+            archive = MessageArchive(self.path, batch_size=3)
+            await archive.add_messages(1, [make_message(1, 1), make_message(2, 2, media=object())])
+            written_before_flush = archive.messages_written
+            await archive.add_messages(1, [make_message(3, 3)])
+            messages = await archive.load_channel_messages(1, start_date=datetime(2026, 1, 2, tzinfo=timezone.utc))
+            journal_mode = archive._connection.execute("PRAGMA journal_mode").fetchone()[0]
+            await archive.close()
+            return written_before_flush, archive.messages_written, messages, journal_mode
+
+        written_before_flush, written, messages, journal_mode = asyncio.run(scenario())
+
+        self.assertEqual(written_before_flush, 0)
+        self.assertEqual(written, 3)
+        self.assertEqual(journal_mode, "wal")
+        self.assertEqual([message.id for message in messages], [3, 2])
+        self.assertEqual(messages[1].views, 20)
+        self.assertEqual(messages[1].media_descriptor["mime_type"], "image/jpeg")
+        self.assertIsNone(messages[1].media)
+
+    def test_forward_origin_is_archived_and_old_archives_are_migrated(self):
+        self.path.parent.mkdir(parents=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            "CREATE TABLE messages (channel_id INTEGER NOT NULL, message_id INTEGER NOT NULL, date TEXT NOT NULL, "
+            "text TEXT, views INTEGER, forwards INTEGER, media TEXT, archived_at REAL NOT NULL, "
+            "PRIMARY KEY (channel_id, message_id))"
+        )
+        connection.commit()
+        connection.close()
+
+        forward = make_message(2, 2)
+        forward.fwd_from = SimpleNamespace(from_id=SimpleNamespace(channel_id=77), channel_post=5)
+
+        async def scenario():
+            archive = MessageArchive(self.path)
+            await archive.add_messages(1, [make_message(1, 1), forward])
+            await archive.flush()
+            messages = await archive.load_channel_messages(1)
+            await archive.close()
+            return messages
+
+        messages = asyncio.run(scenario())
+
+        self.assertEqual((messages[0].fwd_from_channel_id, messages[0].fwd_from_message_id), (77, 5))
+        self.assertIsNone(messages[1].fwd_from_channel_id)
+
+    def test_evict_applies_size_limit_and_moves_coverage_forward(self):
+        async def scenario():
+            archive = MessageArchive(self.path, max_messages=2)
+            await archive.add_messages(1, [make_message(index, index) for index in range(1, 5)])
+            await archive.record_scan(1, None, 4)
+            evicted = archive.evict()
+            coverage = archive.scan_coverage(1, datetime(2026, 1, 3, tzinfo=timezone.utc))
+            await archive.close()
+            return evicted, coverage
+
+        evicted, coverage = asyncio.run(scenario())
+
+        self.assertEqual(evicted, 2)
+        self.assertEqual(coverage.covered_from, datetime(2026, 1, 3, tzinfo=timezone.utc).isoformat())
+        self.assertEqual(coverage.max_message_id, 4)
+
+    def test_media_descriptor_records_file_details(self):
+        self.assertIsNone(media_descriptor(make_message(1, 1)))
+        self.assertEqual(
+            media_descriptor(make_message(1, 1, media=SimpleNamespace())),
+            {"type": "SimpleNamespace", "name": "photo.jpg", "mime_type": "image/jpeg", "size": 2048},
+        )
+
+    def test_local_scan_reads_archived_history_and_fetches_only_newer_messages(self):
+        calls = []
+        history = [make_message(3, 3, "beta"), make_message(2, 2, "alpha"), make_message(1, 1, "alpha beta")]
+
+        class Client:
+            async def iter_messages(self, entity, **kwargs):
+                calls.append(kwargs)
+                for message in history:
+                    if message.id > kwargs.get("min_id", 0):
+                        yield message
+
+        channel = ChannelTarget(title="News", entity="entity", channel_id=7)
+        units = build_search_units([channel], [SearchTermGroup(label="g", terms=("alpha", "beta"))])
+
+        async def scenario():
+            archive = MessageArchive(self.path)
+            await scan_channel_units(Client(), units, archive=archive)
+            history.insert(0, make_message(4, 4, "alpha"))
+            results = await scan_channel_units(Client(), units, archive=archive)
+            served = archive.messages_served
+            await archive.close()
+            return results, served
+
+        results, served = asyncio.run(scenario())
+
+        self.assertEqual(calls, [{}, {"min_id": 3}])
+        self.assertEqual([[message.id for message in result.messages] for result in results], [[4, 2, 1], [3, 1]])
+        self.assertEqual(served, 3)
+
+    def test_server_mode_scans_channels_the_archive_covers(self):
+        class Client:
+            async def get_messages(self, entity, limit=None, offset_date=None):
+                return [SimpleNamespace(id=52)]
+
+        channels = [
+            ChannelTarget(title="Archived", entity="archived", channel_id=7),
+            ChannelTarget(title="New", entity="new", channel_id=8),
+        ]
+        units = build_search_units(channels, [SearchTermGroup(label="g", terms=("alpha", "beta"))])
+
+        async def scenario():
+            archive = MessageArchive(self.path)
+            await archive.record_scan(7, None, 50)
+            batches = await plan_search_batches(Client(), units, SearchSettings(mode=SEARCH_MODE_SERVER), archive=archive)
+            await archive.close()
+            return batches
+
+        batches = asyncio.run(scenario())
+
+        self.assertEqual([batch.mode for batch in batches], [SEARCH_MODE_LOCAL, SEARCH_MODE_SERVER, SEARCH_MODE_SERVER])
+        self.assertEqual([unit.channel.channel_id for unit in batches[0].units], [7, 7])
+
+
+if __name__ == "__main__":
+    unittest.main()
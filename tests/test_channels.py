@@ -12,7 +12,13 @@ if str(SRC_ROOT) not in sys.path:
     sys.path.insert(0, str(SRC_ROOT))
 
 from tg_keyword_trends.app import run_async
-from tg_keyword_trends.channels import ChannelTarget, render_message_link, resolve_channel_entries, select_channels
+from tg_keyword_trends.channels import (
+    ChannelTarget,
+    render_message_link,
+    resolve_channel_entries,
+    resolve_saved_channels,
+    select_channels,
+)
 
 
 class ChannelSelectionTests(unittest.TestCase):
@@ -35,6 +41,25 @@ class ChannelSelectionTests(unittest.TestCase):
         self.assertEqual(selection.targets, [ChannelTarget(title="Title good", entity=selection.targets[0].entity, channel_id=123)])
         self.assertEqual(selection.unresolved[0].entry, "bad")
 
+    def test_resolve_saved_channels_prefers_dialogs_and_looks_up_the_rest(self):
+        client = SimpleNamespace()
+        client.get_input_entity = AsyncMock(return_value=SimpleNamespace(channel_id=42))
+
+        async def get_entity(peer):
+            if peer.channel_id == 7:
+                raise ValueError("not cached")
+            return SimpleNamespace(id=peer.channel_id, title="Looked up")
+
+        client.get_entity = AsyncMock(side_effect=get_entity)
+        dialogs = [SimpleNamespace(is_channel=True, title="News")]
+        saved = [{"title": "News", "channel_id": 42}, {"title": "Custom", "channel_id": 99}, {"title": "Gone", "channel_id": 7}]
+
+        selection = run_async(resolve_saved_channels(client, dialogs, saved))
+
+        self.assertEqual([target.channel_id for target in selection.targets], [42, 99])
+        self.assertEqual(selection.targets[1].title, "Custom")
+        self.assertEqual(selection.unresolved[0].entry, "7")
+
     def test_select_channels_defaults_to_followed_dialogs(self):
         client = SimpleNamespace()
         client.get_input_entity = AsyncMock(return_value=SimpleNamespace(channel_id=42))
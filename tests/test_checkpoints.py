@@ -0,0 +1,137 @@
+import asyncio
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.channels import ChannelTarget
+from tg_keyword_trends.checkpoints import (
+    CHECKPOINT_DIR_KEY,
+    SEARCH_CHECKPOINTS_KEY,
+    SearchCheckpointStore,
+    checkpoints_enabled,
+    resolve_checkpoint_dir,
+)
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.search import SearchBatch, build_search_units, run_search_batch
+
+
+def make_row(message_id, day, term="alpha"):
+    return {
+        "time": datetime(2026, 1, day, tzinfo=timezone.utc),
+        "message": f"message {message_id}",
+        "message_id": message_id,
+        "channel_id": 123,
+        "channel_title": "News",
+        "search_group": term,
+        "search_term": term,
+        "link": f"https://t.me/c/123/{message_id}",
+    }
+
+
+class SearchCheckpointStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name) / "checkpoints"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_settings_resolve_from_env_values(self):
+        self.assertFalse(checkpoints_enabled({}))
+        self.assertTrue(checkpoints_enabled({SEARCH_CHECKPOINTS_KEY: "yes"}))
+        self.assertEqual(
+            resolve_checkpoint_dir({CHECKPOINT_DIR_KEY: "marks"}, base_dir=self.temp_dir.name),
+            Path(self.temp_dir.name) / "marks",
+        )
+
+    def test_record_results_round_trips_marks_and_rows(self):
+        store = SearchCheckpointStore(self.directory)
+        store.record_results(123, "alpha", "server", [make_row(5, 2), make_row(3, 1)])
+        store.save()
+
+        reloaded = SearchCheckpointStore.load(self.directory)
+
+        self.assertEqual(reloaded.min_id_for(123, "alpha", "server"), 5)
+        self.assertIsNone(reloaded.min_id_for(123, "alpha", "local"))
+        rows = reloaded.stored_rows(123, "alpha", "server")
+        self.assertEqual([row["message_id"] for row in rows], [5, 3])
+        self.assertEqual(rows[0]["time"], datetime(2026, 1, 2, tzinfo=timezone.utc))
+
+    def test_record_results_advances_mark_and_skips_duplicate_rows(self):
+        store = SearchCheckpointStore(self.directory)
+        store.record_results(123, "alpha", "server", [make_row(5, 2)])
+        store.record_results(123, "alpha", "server", [make_row(9, 3), make_row(5, 2)])
+
+        self.assertEqual(store.min_id_for(123, "alpha", "server"), 9)
+        self.assertEqual(len(store.results_path.read_text(encoding="utf-8").splitlines()), 2)
+
+    def test_checkpoint_is_ignored_when_it_does_not_cover_start_date(self):
+        store = SearchCheckpointStore(self.directory)
+        store.record_results(123, "alpha", "server", [make_row(5, 10)], start_date=datetime(2026, 1, 5, tzinfo=timezone.utc))
+
+        self.assertEqual(store.min_id_for(123, "alpha", "server", datetime(2026, 1, 6, tzinfo=timezone.utc)), 5)
+        self.assertIsNone(store.min_id_for(123, "alpha", "server", datetime(2026, 1, 1, tzinfo=timezone.utc)))
+        self.assertIsNone(store.min_id_for(123, "alpha", "server"))
+
+    def test_stored_rows_are_filtered_to_date_range(self):
+        store = SearchCheckpointStore(self.directory)
+        store.record_results(123, "alpha", "server", [make_row(5, 5), make_row(3, 3), make_row(1, 1)])
+
+        rows = store.stored_rows(
+            123,
+            "alpha",
+            "server",
+            datetime(2026, 1, 2, tzinfo=timezone.utc),
+            datetime(2026, 1, 4, tzinfo=timezone.utc),
+        )
+
+        self.assertEqual([row["message_id"] for row in rows], [3])
+
+    def test_run_search_batch_searches_from_mark_and_returns_stored_rows(self):
+        store = SearchCheckpointStore(self.directory)
+        store.record_results(123, "alpha", "server", [make_row(5, 2)])
+        calls = []
+
+        class Client:
+            async def iter_messages(self, entity, **kwargs):
+                calls.append(kwargs)
+                yield SimpleNamespace(id=8, date=datetime(2026, 1, 4, tzinfo=timezone.utc))
+
+        channel = ChannelTarget(title="News", entity="entity", channel_id=123)
+        unit = build_search_units([channel], [SearchTermGroup(label="alpha", terms=("alpha",))])[0]
+
+        results = asyncio.run(run_search_batch(Client(), SearchBatch(units=(unit,)), checkpoints=store))
+
+        self.assertEqual(calls, [{"search": "alpha", "min_id": 5}])
+        self.assertEqual([message.id for message in results[0].messages], [8])
+        self.assertEqual([row["message_id"] for row in results[0].previous_rows], [5])
+
+
+    def test_stored_rows_take_the_unit_labels_after_the_terms_file_changes(self):
+        store = SearchCheckpointStore(self.directory)
+        store.record_results(123, "alpha", "server", [{**make_row(5, 2), "search_group": "Old", "term_mask": 0b100}])
+
+        class Client:
+            async def iter_messages(self, entity, **kwargs):
+                return
+                yield
+
+        channel = ChannelTarget(title="News", entity="entity", channel_id=123)
+        units = build_search_units([channel], [SearchTermGroup(label="Letters", terms=("beta", "alpha"))])
+
+        results = asyncio.run(run_search_batch(Client(), SearchBatch(units=(units[1],)), checkpoints=store))
+
+        row = results[0].previous_rows[0]
+        self.assertEqual((row["search_group"], row["search_term"], row["term_mask"]), ("Letters", "alpha", 0b10))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.activity import activity_days
+from tg_keyword_trends.counts import (
+    COUNT_RESULT_COLUMNS,
+    CountStats,
+    DailyCountWriter,
+    count_rows,
+    count_unit,
+    daily_match_counts,
+)
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.plotting import calculate_percentage_over_time
+from tg_keyword_trends.results import ResultAccumulator
+from tg_keyword_trends.search import build_search_units
+
+
+class TotalList(list):
+    total = 0
+
+
+class CountingClient:
+    """Fake channel whose search total is the number of ``match_dates`` before ``offset_date``."""
+
+    def __init__(self, match_dates, first_date=None):
+        self.match_dates = match_dates
+        self.first_date = first_date
+        self.calls = []
+
+    async def get_messages(self, entity, limit=None, offset_date=None, search=None, reverse=False):
+        self.calls.append((search, offset_date))
+        if search is None:
+            return [SimpleNamespace(date=self.first_date)] if self.first_date else []
+        messages = TotalList()
+        messages.total = sum(1 for match_date in self.match_dates if offset_date is None or match_date < offset_date)
+        return messages
+
+
+def utc(day, hour=12):
+    return datetime(2026, 1, day, hour, tzinfo=timezone.utc)
+
+
+class DailyMatchCountTests(unittest.TestCase):
+    def test_bisection_finds_daily_counts_without_probing_every_day(self):
+        client = CountingClient([utc(3, 1), utc(3, 23), utc(17), utc(30)])
+        days = activity_days(utc(1), utc(31))
+        stats = CountStats()
+
+        counts = asyncio.run(daily_match_counts(client, "entity", "alpha", days, stats=stats))
+
+        self.assertEqual(counts, {date(2026, 1, 3): 2, date(2026, 1, 17): 1, date(2026, 1, 30): 1})
+        self.assertEqual(stats.days, 31)
+        self.assertEqual(stats.requests, len(client.calls))
+        self.assertLess(stats.requests, 31)
+        self.assertEqual({search for search, _ in client.calls}, {"alpha"})
+
+    def test_empty_range_costs_two_requests(self):
+        client = CountingClient([utc(20)])
+
+        counts = asyncio.run(daily_match_counts(client, "entity", "alpha", activity_days(utc(1), utc(10))))
+
+        self.assertEqual(counts, {})
+        self.assertEqual(len(client.calls), 2)
+
+    def test_open_start_begins_at_first_message_and_counts_become_weighted_rows(self):
+        channel = SimpleNamespace(title="Channel", channel_id=10, entity="entity")
+        groups = [SearchTermGroup(label="Places", terms=("Kyiv",)), SearchTermGroup(label="Capital", terms=("kyiv",))]
+        unit = build_search_units([channel], groups)[0]
+        client = CountingClient([utc(4), utc(4), utc(6)], first_date=utc(2))
+
+        unit_counts = asyncio.run(count_unit(client, unit, end_date=utc(8)))
+        rows = count_rows(unit_counts)
+
+        self.assertEqual(client.calls[0], (None, None))
+        self.assertEqual(unit_counts.counts, {date(2026, 1, 4): 2, date(2026, 1, 6): 1})
+        self.assertEqual([(row["time"], row["count"]) for row in rows], [(utc(4, 0), 2), (utc(6, 0), 1)])
+
+        accumulator = ResultAccumulator(COUNT_RESULT_COLUMNS)
+        accumulator.append_rows(rows)
+        groups_view = accumulator.groups(
+            ["Places", "Capital"], masks={"Places": 1, "Capital": 1}, originals_only=True
+        )
+        self.assertEqual(groups_view["Capital"][0]["count"].tolist(), [2, 1])
+        percentages = calculate_percentage_over_time(groups_view)
+        self.assertEqual(percentages.groupby("search_term")["mentions"].sum().to_dict(), {"Capital": 3, "Places": 3})
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with DailyCountWriter(Path(temp_dir) / "counts.csv") as writer:
+                writer.write_counts(unit_counts)
+            lines = (Path(temp_dir) / "counts.csv").read_text(encoding="utf-8").splitlines()
+
+        self.assertEqual(lines[1], '2026-01-04,10,Channel,"Places, Capital",Kyiv,2')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,7 +18,7 @@ if str(SRC_ROOT) not in sys.path:
 from tg_keyword_trends import constants
 from tg_keyword_trends import env
 from tg_keyword_trends.app import run_async
-from tg_keyword_trends.auth import sign_in_with_2fa_password
+from tg_keyword_trends.auth import connect_to_telegram, sign_in_with_2fa_password
 from tg_keyword_trends.files import check_search_terms_file, render_url
 
 
@@ -131,6 +131,37 @@ class EnvFileTests(WorkingDirectoryTestCase):
         client.sign_in.assert_awaited_once_with(password="secret")
         self.assertEqual(env.read_env_file(Path(".env"))[constants.TELEGRAM_2FA_PASSWORD_KEY], "secret")
 
+    def test_connect_keeps_flood_sleeping_for_login_and_surfaces_flood_waits_after(self):
+        Path(".env").write_text("TELEGRAM_API_ID=123\nTELEGRAM_API_HASH=hash\nTELEGRAM_PHONE=+100\n", encoding="utf-8")
+        thresholds = {}
+
+        class Client:
+            flood_sleep_threshold = 60
+
+            def __init__(self, *args, **kwargs):
+                self.authorized = False
+
+            async def connect(self):
+                pass
+
+            async def is_user_authorized(self):
+                return self.authorized
+
+            async def send_code_request(self, phone):
+                thresholds["send_code_request"] = self.flood_sleep_threshold
+
+            async def sign_in(self, phone=None, code=None):
+                thresholds["sign_in"] = self.flood_sleep_threshold
+                self.authorized = True
+
+        with patch("telethon.TelegramClient", Client), patch("builtins.input", return_value="12345"), redirect_stdout(
+            io.StringIO()
+        ):
+            client = run_async(connect_to_telegram())
+
+        self.assertEqual(thresholds, {"send_code_request": 60, "sign_in": 60})
+        self.assertEqual(client.flood_sleep_threshold, 0)
+
 
 class PureHelperTests(WorkingDirectoryTestCase):
     def test_check_search_terms_file_reads_existing_terms(self):
@@ -0,0 +1,170 @@
+import csv
+import importlib.util
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.exports import (
+    DEFAULT_RESULT_WRITER_BUFFER_ROWS,
+    PLOTTING_COLUMNS,
+    RESULT_PARQUET_KEY,
+    RESULT_PARQUET_PARTITIONED_KEY,
+    RESULT_WRITER_BUFFER_ROWS_KEY,
+    StreamingResultWriter,
+    load_results_parquet,
+    resolve_parquet_settings,
+    resolve_result_writer_buffer_rows,
+    result_export_paths,
+    rewrite_result_files,
+    write_html_from_csv,
+    write_json_from_jsonl,
+    write_results_parquet,
+)
+from tg_keyword_trends.results import RESULT_COLUMNS, ResultAccumulator
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def make_row(message_id, message="hello"):
+    return {
+        "time": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "message": message,
+        "message_id": message_id,
+        "channel_id": 10,
+        "channel_title": "Channel",
+        "search_group": "group",
+        "search_term": "term",
+        "link": f"https://t.me/c/10/{message_id}",
+    }
+
+
+class StreamingResultWriterTests(unittest.TestCase):
+    def test_rows_are_flushed_once_the_buffer_fills(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = result_export_paths(temp_dir, "now")
+            writer = StreamingResultWriter(paths["csv"], paths["jsonl"], buffer_rows=2)
+
+            writer.write_rows([make_row(1)])
+            self.assertEqual(paths["jsonl"].read_text(encoding="utf-8"), "")
+            self.assertEqual(paths["csv"].read_text(encoding="utf-8").splitlines(), [",".join(RESULT_COLUMNS)])
+
+            writer.write_rows([make_row(2, message=None)])
+            jsonl_records = [json.loads(line) for line in paths["jsonl"].read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([record["message_id"] for record in jsonl_records], [1, 2])
+            self.assertEqual(jsonl_records[0]["time"], "2026-01-02T03:04:05+00:00")
+
+            writer.write_rows([make_row(3)])
+            writer.close()
+
+            with paths["csv"].open(encoding="utf-8", newline="") as csv_file:
+                csv_rows = list(csv.DictReader(csv_file))
+            self.assertEqual(writer.rows_written, 3)
+            self.assertEqual([row["message_id"] for row in csv_rows], ["1", "2", "3"])
+            self.assertEqual(csv_rows[0]["time"], "2026-01-02 03:04:05+00:00")
+            self.assertEqual(csv_rows[1]["message"], "")
+
+    def test_final_html_and_json_are_derived_from_streamed_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = result_export_paths(temp_dir, "now")
+            with StreamingResultWriter(paths["csv"], paths["jsonl"]) as writer:
+                writer.write_rows([make_row(1, message="a <b>, c"), make_row(2)])
+
+            write_html_from_csv(paths["csv"], paths["html"])
+            write_json_from_jsonl(paths["jsonl"], paths["json"])
+
+            html = paths["html"].read_text(encoding="utf-8")
+            self.assertIn('<a href="https://t.me/c/10/1">https://t.me/c/10/1</a>', html)
+            self.assertIn("a &lt;b&gt;, c", html)
+            self.assertEqual(html.count("<tr>"), 2)
+
+            records = json.loads(paths["json"].read_text(encoding="utf-8"))
+            self.assertEqual([record["message_id"] for record in records], [1, 2])
+            self.assertEqual(records[0]["message"], "a <b>, c")
+
+    def test_rewrite_replaces_the_streamed_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = result_export_paths(temp_dir, "now")
+            with StreamingResultWriter(paths["csv"], paths["jsonl"]) as writer:
+                writer.write_rows([make_row(1), make_row(2), make_row(1)])
+
+            rows_written = rewrite_result_files(paths["csv"], paths["jsonl"], iter([make_row(1), make_row(2)]))
+
+            records = [json.loads(line) for line in paths["jsonl"].read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(rows_written, 2)
+            self.assertEqual([record["message_id"] for record in records], [1, 2])
+            self.assertEqual(len(paths["csv"].read_text(encoding="utf-8").splitlines()), 3)
+            self.assertEqual(sorted(path.name for path in Path(temp_dir).iterdir()), ["all_results__now.csv", "all_results__now.jsonl"])
+
+    def test_empty_results_produce_valid_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = result_export_paths(temp_dir, "now")
+            StreamingResultWriter(paths["csv"], paths["jsonl"]).close()
+            write_json_from_jsonl(paths["jsonl"], paths["json"])
+
+            self.assertEqual(json.loads(paths["json"].read_text(encoding="utf-8")), [])
+
+    def test_resolve_result_writer_buffer_rows(self):
+        self.assertEqual(resolve_result_writer_buffer_rows({}), DEFAULT_RESULT_WRITER_BUFFER_ROWS)
+        self.assertEqual(resolve_result_writer_buffer_rows({RESULT_WRITER_BUFFER_ROWS_KEY: "25"}), 25)
+
+        with self.assertRaises(ValueError):
+            resolve_result_writer_buffer_rows({RESULT_WRITER_BUFFER_ROWS_KEY: "0"})
+
+
+class ParquetExportTests(unittest.TestCase):
+    def make_results(self):
+        accumulator = ResultAccumulator()
+        rows = [make_row(1), make_row(2), {**make_row(3), "search_group": "other"}]
+        rows[1]["time"] = datetime(2026, 2, 1, tzinfo=timezone.utc)
+        accumulator.append_rows(rows)
+        return accumulator.to_frame()
+
+    def test_resolve_parquet_settings(self):
+        self.assertFalse(resolve_parquet_settings({}).enabled)
+        settings = resolve_parquet_settings({RESULT_PARQUET_KEY: "yes", RESULT_PARQUET_PARTITIONED_KEY: "yes"})
+        self.assertTrue(settings.enabled)
+        self.assertTrue(settings.partitioned)
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_write_results_parquet_uses_typed_dictionary_columns(self):
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = write_results_parquet(self.make_results(), Path(temp_dir) / "results.parquet")
+            schema = pq.read_schema(path)
+
+            self.assertEqual(str(schema.field("time").type.tz), "UTC")
+            self.assertEqual(str(schema.field("message_id").type), "int64")
+            self.assertTrue(str(schema.field("search_term").type).startswith("dictionary"))
+
+            frame = load_results_parquet(path, columns=PLOTTING_COLUMNS)
+            self.assertEqual(list(frame.columns), PLOTTING_COLUMNS)
+            self.assertEqual(frame["message_id"].tolist(), [1, 2, 3])
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_partitioned_parquet_splits_by_group_and_month(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = write_results_parquet(self.make_results(), Path(temp_dir) / "results", partitioned=True)
+
+            partitions = sorted(str(folder.relative_to(path)) for folder in path.glob("*/*") if folder.is_dir())
+            self.assertEqual(
+                partitions,
+                ["search_group=group/month=2026-01", "search_group=group/month=2026-02", "search_group=other/month=2026-01"],
+            )
+
+            frame = load_results_parquet(path, columns=["message_id", "search_group"], search_groups=["group"])
+            self.assertEqual(sorted(frame["message_id"].tolist()), [1, 2])
+            self.assertNotIn("month", load_results_parquet(path).columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
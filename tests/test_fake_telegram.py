@@ -0,0 +1,146 @@
+import asyncio
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+for path in (REPO_ROOT, SRC_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from telethon.errors import FloodWaitError
+
+from benchmarks.fake_telegram import FakeTelegramClient, RecordedCorpus, SyntheticCorpus, write_fixture
+from tg_keyword_trends.ratelimit import AdaptiveRateLimiter
+
+
+def collect(iterator):
+    async def run():
+        return [message async for message in iterator]
+
+    return asyncio.run(run())
+
+
+class SyntheticCorpusTests(unittest.TestCase):
+    def setUp(self):
+        self.corpus = SyntheticCorpus(3, 5000, days=60, end_date=date(2026, 1, 31), seed=7)
+
+    def test_generation_is_deterministic_and_terms_follow_rank(self):
+        again = SyntheticCorpus(3, 5000, days=60, end_date=date(2026, 1, 31), seed=7)
+        history, repeat = self.corpus.history(1001), again.history(1001)
+
+        self.assertEqual(list(history.dates), list(repeat.dates))
+        self.assertEqual(history.message(42).message, repeat.message(42).message)
+        self.assertGreater(len(history.matches("term0001")), len(history.matches("term0010")))
+        self.assertGreaterEqual(history.message(0).date, datetime(2025, 12, 3, tzinfo=timezone.utc))
+        self.assertLess(history.message(len(history) - 1).date, datetime(2026, 2, 1, tzinfo=timezone.utc))
+
+    def test_search_index_agrees_with_a_text_scan(self):
+        history = self.corpus.history(1002)
+        scanned = [index for index in range(len(history)) if "term0002" in history.message(index).message]
+
+        self.assertEqual(list(history.matches("TERM0002")), scanned)
+
+
+class FakeTelegramClientTests(unittest.TestCase):
+    def setUp(self):
+        self.corpus = SyntheticCorpus(3, 2500, days=30, end_date=date(2026, 1, 31), seed=3)
+        self.channel = self.corpus.channels[0]
+
+    def test_iter_messages_pages_newest_first_within_bounds(self):
+        client = FakeTelegramClient(self.corpus)
+        offset_date = datetime(2026, 1, 20, tzinfo=timezone.utc)
+
+        messages = collect(client.iter_messages(self.channel, offset_date=offset_date, min_id=500))
+
+        self.assertTrue(all(message.date < offset_date and message.id > 500 for message in messages))
+        self.assertEqual([message.id for message in messages], sorted((message.id for message in messages), reverse=True))
+        self.assertEqual(messages[-1].id, 501)
+        self.assertEqual(client.api_calls["iter_messages"], -(-len(messages) // 100))
+
+    def test_get_messages_limit_zero_only_reports_the_total(self):
+        client = FakeTelegramClient(self.corpus)
+
+        messages = asyncio.run(client.get_messages(self.channel, search="term0001", limit=0))
+
+        self.assertEqual(messages, [])
+        self.assertEqual(messages.total, len(self.corpus.history(self.channel.channel_id).matches("term0001")))
+        self.assertEqual(client.api_calls["iter_messages"], 1)
+
+    def test_global_search_merges_joined_channels_by_date(self):
+        client = FakeTelegramClient(self.corpus, joined=[1001, 1003])
+
+        messages = collect(client.iter_messages(None, search="term0001"))
+
+        self.assertEqual({message.peer_id.channel_id for message in messages}, {1001, 1003})
+        self.assertEqual(len({(message.chat_id, message.id) for message in messages}), len(messages))
+        self.assertEqual([message.date for message in messages], sorted((message.date for message in messages), reverse=True))
+
+    def test_injected_flood_waits_are_retried_by_the_rate_limiter(self):
+        client = FakeTelegramClient(self.corpus, flood_wait_rate=0.3, flood_wait_seconds=0, seed=1)
+        limiter = AdaptiveRateLimiter(1000, min_rate=1000, max_retries=50)
+        expected = [message.id for message in collect(FakeTelegramClient(self.corpus).iter_messages(self.channel))]
+
+        async def run():
+            return [message.id async for message in limiter.iter_messages(client, self.channel)]
+
+        self.assertEqual(asyncio.run(run()), expected)
+        self.assertGreater(client.flood_waits, 0)
+        self.assertEqual(limiter.flood_waits, client.flood_waits)
+
+    def test_flood_wait_error_carries_the_configured_seconds(self):
+        client = FakeTelegramClient(self.corpus, flood_wait_rate=1.0, flood_wait_seconds=12)
+
+        with self.assertRaises(FloodWaitError) as raised:
+            asyncio.run(client.get_dialogs())
+
+        self.assertEqual(raised.exception.seconds, 12)
+
+    def test_entities_resolve_from_dialogs_usernames_and_ids(self):
+        client = FakeTelegramClient(self.corpus)
+        dialog = asyncio.run(client.get_dialogs())[1]
+
+        self.assertEqual(asyncio.run(client.get_input_entity(dialog)).channel_id, 1002)
+        self.assertEqual(asyncio.run(client.get_entity("https://t.me/synthetic3")).channel_id, 1003)
+        self.assertEqual(asyncio.run(client.get_entity(-1001001)).channel_id, 1001)
+        with self.assertRaises(ValueError):
+            asyncio.run(client.get_entity("@missing"))
+
+    def test_download_media_writes_the_media_size(self):
+        client = FakeTelegramClient(self.corpus)
+        history = self.corpus.history(self.channel.channel_id)
+        message = next(history.message(index) for index in range(len(history)) if history.message(index).media)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = asyncio.run(client.download_media(message, Path(temp_dir) / "photo"))
+
+            self.assertEqual(Path(path).suffix, ".jpg")
+            self.assertEqual(Path(path).stat().st_size, self.corpus.media_bytes)
+        self.assertEqual(client.bytes_downloaded, self.corpus.media_bytes)
+
+
+class RecordedCorpusTests(unittest.TestCase):
+    def test_fixture_round_trips_a_corpus(self):
+        corpus = SyntheticCorpus(2, 300, days=10, end_date=date(2026, 1, 10), forward_share=0.5)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fixture = Path(temp_dir) / "fixture.jsonl"
+            self.assertEqual(write_fixture(corpus, fixture, channel_ids={1002}), 300)
+            recorded = RecordedCorpus.load(fixture)
+
+        original, replayed = corpus.history(1002), recorded.history(1002)
+        self.assertEqual([channel.title for channel in recorded.channels], ["Synthetic channel 2"])
+        self.assertEqual(list(replayed.matches("term0001")), list(original.matches("term0001")))
+        for index in (0, 150, 299):
+            first, second = original.message(index), replayed.message(index)
+            self.assertEqual((first.id, first.date, first.message), (second.id, second.date, second.message))
+            self.assertEqual(bool(first.media), bool(second.media))
+            self.assertEqual(getattr(first.fwd_from, "channel_post", None), getattr(second.fwd_from, "channel_post", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
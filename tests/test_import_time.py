@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+
+# Modules that belong to later stages (plotting, PDF, exports, Telegram, dialogs), not to startup.
+DEFERRED_MODULES = ("pandas", "numpy", "matplotlib", "reportlab", "PIL", "pyarrow", "tkinter", "telethon")
+
+
+def import_time_breakdown(module):
+    """Return ``[(name, self_us, cumulative_us)]`` from ``python -X importtime -c 'import <module>'``."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_ROOT), os.environ.get("PYTHONPATH")]))}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    breakdown = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        breakdown.append((name.strip(), int(self_us), int(cumulative_us)))
+    return breakdown
+
+
+def format_breakdown(breakdown, limit=15):
+    slowest = sorted(breakdown, key=lambda entry: entry[2], reverse=True)[:limit]
+    return "\n".join(f"{cumulative / 1000:8.1f} ms  {name}" for name, _, cumulative in slowest)
+
+
+class ImportTimeTests(unittest.TestCase):
+    def test_app_import_defers_heavy_modules(self):
+        breakdown = import_time_breakdown("tg_keyword_trends.app")
+        imported = {name.split(".")[0] for name, _, _ in breakdown}
+
+        self.assertIn("tg_keyword_trends", imported)
+        self.assertEqual(
+            sorted(imported.intersection(DEFERRED_MODULES)),
+            [],
+            "Importing tg_keyword_trends.app should not load later-stage modules. Slowest imports:\n"
+            + format_breakdown(breakdown),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
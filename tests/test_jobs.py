@@ -0,0 +1,132 @@
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.app import parse_args
+from tg_keyword_trends.jobs import job_from_args, load_job_file, load_job_search_terms, parse_job
+
+
+class JobFileTests(unittest.TestCase):
+    def write(self, directory, name, text):
+        path = Path(directory) / name
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def test_jobs_inherit_top_level_settings(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.write(temp_dir, "channels.txt", "@one\n# comment\nhttps://t.me/two\n")
+            job_file = self.write(
+                temp_dir,
+                "jobs.toml",
+                """
+output_dir = "out"
+last_days = 7
+formats = ["json", "graphs"]
+
+[[jobs]]
+name = "weekly"
+search_terms_file = "terms.txt"
+channels_file = "channels.txt"
+
+[[jobs]]
+name = "january"
+search_terms_file = "/data/terms.txt"
+channels = ["@three"]
+start_date = 2026-01-01
+end_date = "31/01/2026"
+download_media = true
+formats = ["html"]
+""",
+            )
+
+            weekly, january = load_job_file(job_file, today=date(2026, 3, 10))
+
+        self.assertEqual(weekly.search_terms_file, Path(temp_dir) / "terms.txt")
+        self.assertEqual(weekly.channels, ("@one", "https://t.me/two"))
+        self.assertEqual(weekly.start_date, datetime(2026, 3, 3, tzinfo=timezone.utc))
+        self.assertIsNone(weekly.end_date)
+        self.assertEqual(weekly.output_dir, Path(temp_dir) / "out")
+        self.assertEqual(weekly.formats, {"json", "graphs"})
+        self.assertFalse(weekly.download_media)
+
+        self.assertEqual(january.search_terms_file, Path("/data/terms.txt"))
+        self.assertEqual(january.start_date, datetime(2026, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(january.end_date.date(), date(2026, 1, 31))
+        self.assertEqual(january.end_date.hour, 23)
+        self.assertTrue(january.download_media)
+        self.assertEqual(january.formats, {"html"})
+
+    def test_file_without_jobs_list_is_one_job(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            job_file = self.write(temp_dir, "job.toml", 'search_terms_file = "terms.txt"\n')
+
+            (job,) = load_job_file(job_file)
+
+        self.assertEqual(job.name, "job1")
+        self.assertIsNone(job.channels)
+        self.assertIsNone(job.formats)
+
+    def test_invalid_jobs_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "search_terms_file"):
+            parse_job({"name": "x"})
+        with self.assertRaisesRegex(ValueError, "unknown settings: chanels"):
+            parse_job({"search_terms_file": "t.txt", "chanels": ["@a"]})
+        with self.assertRaisesRegex(ValueError, "unknown formats: pdf"):
+            parse_job({"search_terms_file": "t.txt", "formats": ["pdf"]})
+        with self.assertRaisesRegex(ValueError, "on or before"):
+            parse_job({"search_terms_file": "t.txt", "start_date": "02/01/2026", "end_date": "01/01/2026"})
+        with self.assertRaisesRegex(ValueError, "count_only"):
+            parse_job({"search_terms_file": "t.txt", "count_only": True, "download_media": True})
+        with self.assertRaisesRegex(ValueError, "both start_date and last_days"):
+            parse_job({"search_terms_file": "t.txt", "start_date": "01/01/2026", "last_days": 3})
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            job_file = self.write(
+                temp_dir,
+                "jobs.toml",
+                '[[jobs]]\nname = "a"\nsearch_terms_file = "t.txt"\n[[jobs]]\nname = "a"\nsearch_terms_file = "t.txt"\n',
+            )
+            with self.assertRaisesRegex(ValueError, "unique"):
+                load_job_file(job_file)
+
+    def test_job_search_terms_fail_instead_of_prompting(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            job = parse_job({"search_terms_file": "terms.txt"}, base_dir=temp_dir)
+            with self.assertRaisesRegex(ValueError, "does not exist"):
+                load_job_search_terms(job)
+
+            self.write(temp_dir, "terms.txt", "# only a comment\n")
+            with self.assertRaisesRegex(ValueError, "active search terms"):
+                load_job_search_terms(job)
+
+            self.write(temp_dir, "terms.txt", "Places: Kyiv | Kiev\n")
+            self.assertEqual(load_job_search_terms(job), ["Places: Kyiv | Kiev"])
+
+    def test_job_from_args(self):
+        args = parse_args(
+            ["--terms", "terms.txt", "--channel", "@a", "--channel", "@b", "--last-days", "2", "--formats", "html,json"]
+        )
+        count_args = parse_args(["--terms", "terms.txt", "--count-only"])
+
+        job = job_from_args(args, today=date(2026, 3, 10))
+
+        self.assertEqual(job.name, "cli")
+        self.assertEqual(job.channels, ("@a", "@b"))
+        self.assertEqual(job.start_date, datetime(2026, 3, 8, tzinfo=timezone.utc))
+        self.assertEqual(job.formats, {"html", "json"})
+        self.assertFalse(job.download_media)
+        self.assertEqual(job.run_suffix, "cli")
+        self.assertFalse(job.count_only)
+        self.assertTrue(job_from_args(count_args).count_only)
+
+
+if __name__ == "__main__":
+    unittest.main()
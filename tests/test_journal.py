@@ -0,0 +1,122 @@
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.journal import RunInputs, RunJournal, search_terms_sha256
+
+
+def make_row(message_id):
+    return {
+        "time": datetime(2026, 1, 2, tzinfo=timezone.utc),
+        "message": "hello",
+        "message_id": message_id,
+        "channel_id": 10,
+        "channel_title": "Channel",
+        "search_group": "Places",
+        "search_term": "Kyiv",
+        "link": f"https://t.me/c/10/{message_id}",
+    }
+
+
+class RunJournalTests(unittest.TestCase):
+    def test_inputs_round_trip(self):
+        inputs = RunInputs(
+            now="20260102_030405",
+            search_terms_file="terms.txt",
+            search_terms_sha256=search_terms_sha256(["Places: Kyiv | Kiev"]),
+            search_term_groups=[SearchTermGroup(label="Places", terms=("Kyiv", "Kiev"))],
+            channels=[{"title": "Channel", "channel_id": 10}],
+            start_date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+            end_date=None,
+            download_media=True,
+        )
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            RunJournal(temp_dir).save_inputs(inputs)
+            loaded = RunJournal.load(temp_dir).load_inputs()
+
+        self.assertEqual(loaded, inputs)
+
+    def test_load_inputs_requires_a_journaled_run(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(ValueError):
+                RunJournal.load(temp_dir).load_inputs()
+
+    def test_recorded_units_are_reloaded_with_their_rows(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal = RunJournal(temp_dir)
+            journal.record_unit(10, "Places", "Kyiv", "server", [make_row(1), make_row(2)], new_results=1)
+            journal.record_unit(10, "Places", "Kiev", "server", [])
+            journal.close()
+
+            loaded = RunJournal.load(temp_dir)
+
+            entries = list(loaded.iter_entries())
+
+        self.assertTrue(loaded.completed(10, "Places", "Kyiv"))
+        self.assertTrue(loaded.completed("10", "Places", "Kiev"))
+        self.assertFalse(loaded.completed(11, "Places", "Kyiv"))
+        self.assertEqual([entry.key for entry in entries], [("10", "Places", "Kyiv"), ("10", "Places", "Kiev")])
+        self.assertEqual(entries[0].new_results, 1)
+        self.assertEqual([row["message_id"] for row in entries[0].rows], [1, 2])
+        self.assertEqual(entries[0].rows[0]["time"], datetime(2026, 1, 2, tzinfo=timezone.utc))
+        self.assertEqual(entries[1].rows, [])
+
+    def test_truncated_last_line_is_dropped_and_journal_stays_appendable(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal = RunJournal(temp_dir)
+            journal.record_unit(10, "Places", "Kyiv", "server", [make_row(1)])
+            journal.close()
+            with journal.journal_path.open("a", encoding="utf-8") as journal_file:
+                journal_file.write('{"channel_id": "10", "search_gr')
+
+            resumed = RunJournal.load(temp_dir)
+            self.assertEqual(len(resumed.completed_units), 1)
+            resumed.record_unit(10, "Places", "Kiev", "server", [make_row(2)])
+            resumed.close()
+
+            self.assertEqual(len(RunJournal.load(temp_dir).completed_units), 2)
+
+    def test_syncs_are_batched_and_the_journal_is_synced_on_close(self):
+        class Clock:
+            now = 0.0
+
+            def __call__(self):
+                return self.now
+
+        clock = Clock()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal = RunJournal(temp_dir, sync_seconds=1.0, clock=clock)
+            syncs = []
+            original_sync = journal.sync
+            journal.sync = lambda: (syncs.append(clock.now), original_sync())
+            journal.record_unit(10, "Places", "Kyiv", "server", [make_row(1)])
+            journal.record_unit(10, "Places", "Kiev", "server", [make_row(2)])
+            clock.now = 1.5
+            journal.record_unit(11, "Places", "Kyiv", "server", [])
+            journal.close()
+
+            self.assertEqual(syncs, [1.5, 1.5])
+            self.assertEqual(len(list(RunJournal.load(temp_dir).iter_entries())), 3)
+
+    def test_invalid_line_before_the_end_raises(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal = RunJournal(temp_dir)
+            journal.directory.mkdir(parents=True, exist_ok=True)
+            journal.journal_path.write_text("not json\n{}\n", encoding="utf-8")
+
+            with self.assertRaises(ValueError):
+                RunJournal.load(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
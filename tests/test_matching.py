@@ -0,0 +1,48 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.matching import TermMatcher, normalize_match_text
+
+
+class TermMatcherTests(unittest.TestCase):
+    def test_match_finds_overlapping_and_nested_terms(self):
+        matcher = TermMatcher(["he", "her", "hers", "his"])
+
+        self.assertEqual(matcher.match("hers"), {0, 1, 2})
+        self.assertEqual(matcher.match("nothing here"), {0, 1})
+
+    def test_match_only_starts_at_word_boundaries_like_server_search(self):
+        matcher = TermMatcher(["he", "she", "his", "war"])
+
+        self.assertEqual(matcher.match("ushers this"), set())
+        self.assertEqual(matcher.match("#war, (she) said"), {1, 3})
+        self.assertEqual(matcher.match("warfare_report"), {3})
+        self.assertEqual(matcher.match("postwar"), set())
+
+    def test_match_is_case_insensitive_and_handles_cyrillic(self):
+        matcher = TermMatcher(["Бахмут", "Artemivsk", "Kyiv region"])
+
+        self.assertEqual(matcher.match("Бои под БАХМУТОМ"), {0})
+        self.assertEqual(matcher.match("the   KYIV\nregion today"), {2})
+        self.assertEqual(matcher.match("Kyiv"), set())
+
+    def test_match_ignores_empty_terms_and_text(self):
+        matcher = TermMatcher(["", "alpha"])
+
+        self.assertEqual(matcher.match(None), set())
+        self.assertEqual(matcher.match(""), set())
+        self.assertEqual(matcher.match("ALPHA"), {1})
+
+    def test_normalize_match_text_casefolds_and_collapses_whitespace(self):
+        self.assertEqual(normalize_match_text("  Straße \t Nord "), "strasse nord")
+
+
+if __name__ == "__main__":
+    unittest.main()
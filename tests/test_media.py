@@ -4,6 +4,7 @@ import sys
 import tempfile
 import unittest
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock
 
 
@@ -231,6 +232,68 @@ class MediaDownloadQueueTests(WorkingDirectoryTestCase):
         self.assertEqual(results[0].status, media.MEDIA_STATUS_FAILED)
         self.assertEqual(results[0].error, "network error")
 
+    def test_download_media_queue_routes_downloads_through_rate_limiter(self):
+        client = Mock()
+        client.download_media = AsyncMock(return_value=Path("new.jpg"))
+        rate_limiter = Mock()
+
+        async def call(func, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        rate_limiter.call = AsyncMock(side_effect=call)
+        jobs = [media.MediaDownloadJob(message="message", file_path="new.jpg", channel_id=123, message_id=1)]
+
+        results = asyncio.run(media.download_media_queue(client, jobs, rate_limiter=rate_limiter))
+
+        rate_limiter.call.assert_awaited_once()
+        self.assertEqual(results[0].status, media.MEDIA_STATUS_DOWNLOADED)
+
+    def test_download_media_queue_reports_each_result_as_it_finishes(self):
+        client = Mock()
+        client.download_media = AsyncMock(side_effect=[Path("one.jpg"), RuntimeError("network error")])
+        jobs = [
+            media.MediaDownloadJob(message="message", file_path=f"{message_id}.jpg", channel_id=123, message_id=message_id)
+            for message_id in (1, 2)
+        ]
+        reported = []
+
+        results = asyncio.run(
+            media.download_media_queue(client, jobs, max_concurrency=1, result_callback=reported.append)
+        )
+
+        self.assertEqual(reported, results)
+        self.assertEqual(
+            [result.status for result in reported], [media.MEDIA_STATUS_DOWNLOADED, media.MEDIA_STATUS_FAILED]
+        )
+
+
+class RefetchMediaMessagesTests(unittest.TestCase):
+    def test_refetch_media_messages_replaces_archived_hits_by_id(self):
+        live = SimpleNamespace(id=7, media="photo")
+        fetched = {7: live, 8: SimpleNamespace(id=8, media=None)}
+        client = Mock()
+        client.get_messages = AsyncMock(side_effect=lambda entity, ids: [fetched.get(message_id) for message_id in ids])
+        fresh = media.MediaDownloadJob(
+            message=SimpleNamespace(id=1, media="photo"), file_path="1.jpg", channel_id=123, message_id=1
+        )
+        archived = [
+            media.MediaDownloadJob(
+                message=SimpleNamespace(id=message_id, media=None, media_descriptor='{"type": "photo"}'),
+                file_path=f"{message_id}.jpg",
+                channel_id=999,
+                message_id=message_id,
+                metadata={"found_in_channel_id": 123, "found_in_message_id": message_id},
+            )
+            for message_id in (7, 8, 9)
+        ]
+
+        jobs, refetched = asyncio.run(media.refetch_media_messages(client, [fresh, *archived], {"123": "entity"}))
+
+        client.get_messages.assert_awaited_once_with("entity", ids=[7, 8, 9])
+        self.assertEqual(refetched, 1)
+        self.assertEqual([job.message for job in jobs], [fresh.message, live])
+        self.assertEqual(jobs[1].channel_id, 999)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,155 @@
+import json
+import pstats
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.metrics import (
+    RUN_METRICS_FILENAME,
+    MetricsSettings,
+    RunMetrics,
+    RunProfiler,
+    metrics_span,
+    resolve_metrics_settings,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MetricsSettingsTests(unittest.TestCase):
+    def test_metrics_are_on_and_memory_tracing_off_by_default(self):
+        self.assertEqual(resolve_metrics_settings({}), MetricsSettings(enabled=True, trace_memory=False, profiler=None))
+
+    def test_env_values_override_defaults(self):
+        settings = resolve_metrics_settings({"RUN_METRICS": "no", "RUN_METRICS_MEMORY": "yes", "RUN_PROFILER": "cProfile"})
+
+        self.assertEqual(settings, MetricsSettings(enabled=False, trace_memory=True, profiler="cprofile"))
+
+    def test_unknown_profiler_is_rejected(self):
+        with self.assertRaises(ValueError):
+            resolve_metrics_settings({"RUN_PROFILER": "perf"})
+
+
+class RunMetricsTests(unittest.TestCase):
+    def test_spans_nest_and_record_source_deltas(self):
+        clock = FakeClock()
+        calls = {"api": 0}
+        metrics = RunMetrics(clock=clock)
+        metrics.add_source("api_calls", lambda: calls["api"])
+
+        with metrics.span("exports") as exports:
+            clock.now += 1
+            with metrics.span("graphs", figures=2):
+                calls["api"] += 3
+                clock.now += 2
+            exports.add(files=1)
+
+        [record] = metrics.to_dict()["stages"]
+        self.assertEqual((record["name"], record["seconds"], record["api_calls"], record["files"]), ("exports", 3, 3, 1))
+        self.assertEqual(
+            record["children"], [{"name": "graphs", "start_seconds": 1, "seconds": 2, "figures": 2, "api_calls": 3}]
+        )
+        self.assertNotIn("memory_peak_bytes", record)
+
+    def test_stages_follow_one_another(self):
+        clock = FakeClock()
+        metrics = RunMetrics(clock=clock)
+
+        metrics.stage("search")
+        clock.now += 5
+        metrics.stage("exports")
+        with metrics.span("report"):
+            clock.now += 1
+        metrics.end_stage()
+
+        stages = metrics.to_dict()["stages"]
+        self.assertEqual([(stage["name"], stage["seconds"]) for stage in stages], [("search", 5), ("exports", 1)])
+        self.assertEqual([child["name"] for child in stages[1]["children"]], ["report"])
+
+    def test_stage_seconds_include_the_running_stage(self):
+        clock = FakeClock()
+        metrics = RunMetrics(clock=clock)
+
+        metrics.stage("search")
+        clock.now += 4
+        metrics.stage("media")
+        clock.now += 1.5
+
+        self.assertEqual(metrics.stage_seconds(), {"search": 4, "media": 1.5})
+
+    def test_memory_peaks_cover_nested_spans(self):
+        metrics = RunMetrics(trace_memory=True)
+        try:
+            with metrics.span("outer") as outer:
+                with metrics.span("inner") as inner:
+                    block = bytearray(4 * 2**20)
+                    del block
+                with metrics.span("after") as after:
+                    pass
+        finally:
+            metrics.close()
+
+        self.assertGreaterEqual(inner.memory_peak_bytes, 4 * 2**20)
+        self.assertGreaterEqual(outer.memory_peak_bytes, inner.memory_peak_bytes)
+        self.assertLess(after.memory_peak_bytes, inner.memory_peak_bytes)
+
+    def test_write_saves_totals_units_and_output_sizes(self):
+        metrics = RunMetrics()
+        metrics.add_source("messages_fetched", lambda: 120)
+        metrics.stage("search")
+        metrics.record_unit(7, "Channel", ("alpha",), "server", 0.25, 4)
+        metrics.totals["result_rows"] = 4
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            Path(temp_dir, "results.csv").write_text("a,b\n", encoding="utf-8")
+            path = metrics.write(temp_dir)
+            record = json.loads(path.read_text(encoding="utf-8"))
+
+        self.assertEqual(path.name, RUN_METRICS_FILENAME)
+        self.assertEqual(record["totals"], {"messages_fetched": 120, "result_rows": 4})
+        self.assertEqual([stage["name"] for stage in record["stages"]], ["search"])
+        self.assertEqual(
+            record["units"],
+            [{"channel_id": 7, "channel_title": "Channel", "search_terms": ["alpha"], "mode": "server", "seconds": 0.25, "matches": 4}],
+        )
+        self.assertEqual(record["output_files"], {"results.csv": 4})
+
+    def test_metrics_span_without_metrics_is_a_no_op(self):
+        with metrics_span(None, "graphs") as span:
+            self.assertIsNone(span)
+
+
+class RunProfilerTests(unittest.TestCase):
+    def test_cprofile_profile_is_saved_in_the_output_folder(self):
+        profiler = RunProfiler("cprofile").start()
+        sum(range(1000))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = profiler.stop(temp_dir, "now")
+
+            self.assertEqual(path.name, "profile__now.prof")
+            self.assertGreater(pstats.Stats(str(path)).total_calls, 0)
+        self.assertIsNone(profiler.stop(temp_dir, "now"))
+
+    def test_profile_is_discarded_without_an_output_folder(self):
+        profiler = RunProfiler("cprofile").start()
+
+        self.assertIsNone(profiler.stop(None, "now"))
+        self.assertIsNone(profiler._profiler)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import socket
+import sys
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.openmetrics import (
+    OPENMETRICS_CONTENT_TYPE,
+    OpenMetricsExporter,
+    OpenMetricsSettings,
+    resolve_openmetrics_settings,
+)
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class OpenMetricsSettingsTests(unittest.TestCase):
+    def test_exporter_is_off_by_default(self):
+        settings = resolve_openmetrics_settings({})
+
+        self.assertEqual(settings, OpenMetricsSettings())
+        self.assertFalse(settings.enabled)
+
+    def test_env_values_enable_textfile_and_port(self):
+        settings = resolve_openmetrics_settings(
+            {"OPENMETRICS_TEXTFILE_DIR": "/var/lib/node_exporter", "OPENMETRICS_PORT": "9187", "OPENMETRICS_INTERVAL_SECONDS": "5"}
+        )
+
+        self.assertEqual(settings, OpenMetricsSettings(Path("/var/lib/node_exporter"), 9187, 5.0))
+        self.assertTrue(settings.enabled)
+
+    def test_invalid_port_is_rejected(self):
+        with self.assertRaises(ValueError):
+            resolve_openmetrics_settings({"OPENMETRICS_PORT": "70000"})
+
+
+class OpenMetricsExporterTests(unittest.TestCase):
+    def test_render_writes_counters_gauges_and_labels(self):
+        exporter = OpenMetricsExporter(OpenMetricsSettings(), labels={"run": "2026-01-01"})
+        exporter.counter("messages_fetched", "Messages fetched.", lambda: 12)
+        exporter.counter("matches", "Matches per group.", lambda: {'Say "hi"': 3, "A\\B": 1}, label="group")
+        exporter.gauge("stage_duration_seconds", "Stage seconds.", lambda: {"search": 1.5}, label="stage", unit="seconds")
+
+        self.assertEqual(
+            exporter.render(),
+            "# TYPE tg_keyword_trends_run_active gauge\n"
+            "# HELP tg_keyword_trends_run_active 1 while the run is in progress and 0 once it has finished.\n"
+            'tg_keyword_trends_run_active{run="2026-01-01"} 1\n'
+            "# TYPE tg_keyword_trends_messages_fetched counter\n"
+            "# HELP tg_keyword_trends_messages_fetched Messages fetched.\n"
+            'tg_keyword_trends_messages_fetched_total{run="2026-01-01"} 12\n'
+            "# TYPE tg_keyword_trends_matches counter\n"
+            "# HELP tg_keyword_trends_matches Matches per group.\n"
+            'tg_keyword_trends_matches_total{run="2026-01-01",group="A\\\\B"} 1\n'
+            'tg_keyword_trends_matches_total{run="2026-01-01",group="Say \\"hi\\""} 3\n'
+            "# TYPE tg_keyword_trends_stage_duration_seconds gauge\n"
+            "# UNIT tg_keyword_trends_stage_duration_seconds seconds\n"
+            "# HELP tg_keyword_trends_stage_duration_seconds Stage seconds.\n"
+            'tg_keyword_trends_stage_duration_seconds{run="2026-01-01",stage="search"} 1.5\n'
+            "# EOF\n",
+        )
+
+    def test_prometheus_rendering_types_counters_by_their_sample_name(self):
+        exporter = OpenMetricsExporter(OpenMetricsSettings())
+        exporter.counter("flood_wait_seconds", "FloodWait seconds.", lambda: 2.5, unit="seconds")
+
+        self.assertEqual(
+            exporter.render(openmetrics=False),
+            "# HELP tg_keyword_trends_run_active 1 while the run is in progress and 0 once it has finished.\n"
+            "# TYPE tg_keyword_trends_run_active gauge\n"
+            "tg_keyword_trends_run_active 1\n"
+            "# HELP tg_keyword_trends_flood_wait_seconds_total FloodWait seconds.\n"
+            "# TYPE tg_keyword_trends_flood_wait_seconds_total counter\n"
+            "tg_keyword_trends_flood_wait_seconds_total 2.5\n",
+        )
+
+    def test_textfile_is_refreshed_while_running_and_final_after_stop(self):
+        fetched = [0]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            exporter = OpenMetricsExporter(
+                OpenMetricsSettings(textfile_dir=Path(temp_dir) / "prom", interval_seconds=0.01),
+                textfile_name="run.prom",
+            )
+            exporter.counter("messages_fetched", "Messages fetched.", lambda: fetched[0])
+
+            async def scenario():
+                exporter.start()
+                fetched[0] = 250
+                await asyncio.sleep(0.05)
+                running = exporter.textfile_path.read_text(encoding="utf-8")
+                exporter.stop()
+                return running
+
+            running = asyncio.run(scenario())
+            final = exporter.textfile_path.read_text(encoding="utf-8")
+            self.assertEqual([path.name for path in exporter.textfile_path.parent.iterdir()], ["run.prom"])
+
+        self.assertIn("# TYPE tg_keyword_trends_messages_fetched_total counter\n", running)
+        self.assertIn("tg_keyword_trends_messages_fetched_total 250\n", running)
+        self.assertIn("tg_keyword_trends_run_active 1\n", running)
+        self.assertIn("tg_keyword_trends_run_active 0\n", final)
+        self.assertNotIn("# EOF", final)
+
+    def test_http_endpoint_serves_the_latest_snapshot_until_stopped(self):
+        port = free_port()
+        exporter = OpenMetricsExporter(OpenMetricsSettings(port=port, interval_seconds=60))
+        exporter.gauge("media_queue_depth", "Queued media.", lambda: 4)
+
+        async def scenario():
+            exporter.start()
+            response = await asyncio.to_thread(urllib.request.urlopen, f"http://127.0.0.1:{port}/metrics")
+            body = response.read().decode("utf-8")
+            exporter.stop()
+            return response.headers["Content-Type"], body
+
+        content_type, body = asyncio.run(scenario())
+
+        self.assertEqual(content_type, OPENMETRICS_CONTENT_TYPE)
+        self.assertIn("tg_keyword_trends_media_queue_depth 4\n", body)
+        self.assertTrue(body.endswith("# EOF\n"))
+        self.assertIsNone(exporter.server)
+        with self.assertRaises(OSError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.progress import (
+    DEFAULT_PROGRESS_REFRESH_SECONDS,
+    FIELD_SECONDS,
+    PROGRESS_LOG_SECONDS,
+    ProgressDashboard,
+    ProgressField,
+    UnitCostEta,
+    resolve_progress_refresh_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TerminalOutput(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class ProgressSettingsTests(unittest.TestCase):
+    def test_refresh_seconds_default_and_override(self):
+        self.assertEqual(resolve_progress_refresh_seconds({}), DEFAULT_PROGRESS_REFRESH_SECONDS)
+        self.assertEqual(resolve_progress_refresh_seconds({"PROGRESS_REFRESH_SECONDS": "2"}), 2.0)
+        with self.assertRaises(ValueError):
+            resolve_progress_refresh_seconds({"PROGRESS_REFRESH_SECONDS": "0"})
+
+
+class UnitCostEtaTests(unittest.TestCase):
+    def test_large_channel_only_stretches_its_own_remaining_units(self):
+        eta = UnitCostEta({"huge": 4, "small": 4, "other": 4, "unseen": 4})
+        eta.record("huge", 100.0)
+        eta.record("small", 1.0)
+        eta.record("other", 3.0)
+
+        # 3 huge units at 100s, 3 + 3 units at 1s and 3s, and 4 unseen units at the median 3s, run one at a time.
+        self.assertAlmostEqual(eta.remaining_seconds(elapsed=104.0), 300 + 3 + 9 + 12)
+        self.assertEqual(eta.channels_done, 0)
+
+    def test_estimate_is_divided_by_observed_parallelism(self):
+        eta = UnitCostEta({1: 2, 2: 2})
+        search = SimpleNamespace(channel=SimpleNamespace(channel_id=1))
+        eta.record_units([search, search], 8.0)
+
+        self.assertIsNone(UnitCostEta({1: 1}).remaining_seconds(elapsed=5.0))
+        self.assertAlmostEqual(eta.remaining_seconds(elapsed=2.0), 2 * 4.0 / 4)
+        self.assertEqual(eta.channels_done, 1)
+
+
+class ProgressDashboardTests(unittest.TestCase):
+    def test_log_output_is_printed_at_most_every_log_interval(self):
+        clock = FakeClock()
+        output = io.StringIO()
+        flood_wait = [0.0]
+        dashboard = ProgressDashboard(
+            100,
+            "Searching",
+            fields=[ProgressField("FloodWait", lambda: flood_wait[0], kind=FIELD_SECONDS)],
+            file=output,
+            clock=clock,
+        )
+
+        for _ in range(100):
+            clock.now += 1
+            flood_wait[0] += 0.5
+            dashboard.update()
+        dashboard.close()
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 1 + 100 // int(PROGRESS_LOG_SECONDS) + 1)
+        self.assertEqual(
+            lines[-1],
+            "Searching: 100% 100/100 units [00:01:40, ETA 00:00:00, 1.0 units/s, FloodWait 00:00:50]",
+        )
+
+    def test_terminal_bar_shows_rates_and_count_based_eta(self):
+        clock = FakeClock()
+        output = TerminalOutput()
+        messages = [0]
+        dashboard = ProgressDashboard(
+            10, "Searching", fields=[ProgressField("msg/s", lambda: messages[0])], file=output, clock=clock
+        )
+
+        clock.now, messages[0] = 4.0, 2000
+        dashboard.update(4)
+        dashboard.close()
+
+        final = output.getvalue().rstrip("\n").split("\r")[-1]
+        self.assertIn("4/10 units", final)
+        self.assertIn("ETA 00:00:06, 1.0 units/s, 500 msg/s", final)
+
+
+if __name__ == "__main__":
+    unittest.main()
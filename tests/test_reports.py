@@ -53,6 +53,21 @@ class TxtReportTests(unittest.TestCase):
         self.assertIn("single", report)
         self.assertIn("Channel: News (123), Count: 2", report)
 
+    def test_generate_txt_report_weighs_count_only_rows(self):
+        all_results = pd.DataFrame(
+            [
+                {"time": pd.Timestamp("2026-01-01"), "channel_id": 123, "channel_title": "News", "count": 5},
+                {"time": pd.Timestamp("2026-01-02"), "channel_id": 456, "channel_title": "Wire", "count": 2},
+            ]
+        )
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            generate_txt_report(all_results, [], [], temp_dir, "20260102_030405")
+            report = Path(temp_dir, "report_20260102_030405.txt").read_text(encoding="utf-8")
+
+        self.assertIn("Number of results: 7", report)
+        self.assertIn("Channel: News (123), Count: 5\nChannel: Wire (456), Count: 2", report)
+
     def test_generate_txt_report_handles_empty_results(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             generate_txt_report(
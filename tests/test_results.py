@@ -0,0 +1,209 @@
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.plotting import calculate_percentage_over_time
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.results import (
+    RESULT_COLUMNS,
+    ResultAccumulator,
+    build_result_row,
+    merge_message_rows,
+    message_origin,
+    resolve_originals_only,
+)
+from tg_keyword_trends.terms import compile_search_terms
+
+
+def make_row(message_id, search_group, search_term, day=1, term_mask=None, channel_id=10, fwd_from=(None, None)):
+    return {
+        "term_mask": term_mask,
+        "fwd_from_channel_id": fwd_from[0],
+        "fwd_from_message_id": fwd_from[1],
+        "time": datetime(2026, 1, day, tzinfo=timezone.utc),
+        "message": f"message {message_id}",
+        "message_id": message_id,
+        "channel_id": channel_id,
+        "channel_title": "Channel",
+        "search_group": search_group,
+        "search_term": search_term,
+        "link": f"https://t.me/c/10/{message_id}",
+    }
+
+
+class ResultAccumulatorTests(unittest.TestCase):
+    def test_to_frame_builds_columns_once_with_categorical_labels(self):
+        accumulator = ResultAccumulator()
+        accumulator.append_rows([make_row(1, "Places", "Kyiv"), make_row(2, "Places", "Kiev")])
+        accumulator.append_rows([make_row(3, "beta", "beta", day=2)])
+
+        frame = accumulator.to_frame()
+
+        self.assertEqual(len(accumulator), 3)
+        self.assertEqual(list(frame.columns), RESULT_COLUMNS)
+        self.assertEqual(frame["message_id"].tolist(), [1, 2, 3])
+        for column in ("channel_title", "search_group", "search_term"):
+            self.assertEqual(frame[column].dtype.name, "category")
+        self.assertIs(accumulator.to_frame(), frame)
+
+        accumulator.append_rows([make_row(4, "beta", "beta")])
+        self.assertEqual(len(accumulator.to_frame()), 4)
+
+    def test_empty_accumulator_returns_empty_frame(self):
+        frame = ResultAccumulator().to_frame()
+
+        self.assertTrue(frame.empty)
+        self.assertEqual(list(frame.columns), RESULT_COLUMNS)
+
+    def test_groups_view_matches_dataframes_dict_shape(self):
+        accumulator = ResultAccumulator()
+        groups = accumulator.groups(["Places", "beta", "unused"])
+        accumulator.append_rows([make_row(1, "Places", "Kyiv"), make_row(2, "beta", "beta"), make_row(3, "Places", "Kiev")])
+
+        self.assertEqual(list(groups), ["Places", "beta", "unused"])
+        self.assertEqual([len(frame) for frame in groups["Places"]], [2])
+        self.assertEqual(groups["unused"], [])
+        with self.assertRaises(KeyError):
+            groups["missing"]
+
+        percentages = calculate_percentage_over_time(groups)
+        self.assertEqual(sorted(percentages["search_term"].unique()), ["Places", "beta"])
+
+    def test_groups_view_reuses_frames_until_rows_are_appended(self):
+        accumulator = ResultAccumulator()
+        groups = accumulator.groups(["Places"])
+        accumulator.append_rows([make_row(1, "Places", "Kyiv")])
+
+        [frame] = groups["Places"]
+        self.assertIs(groups["Places"][0], frame)
+
+        accumulator.append_rows([])
+        self.assertIs(groups["Places"][0], frame)
+
+        accumulator.append_rows([make_row(2, "Places", "Kiev")])
+        self.assertEqual(len(groups["Places"][0]), 2)
+
+
+class MessageMergeTests(unittest.TestCase):
+    def setUp(self):
+        self.compiled = compile_search_terms(
+            [
+                SearchTermGroup(label="Places", terms=("Kyiv", "Kiev")),
+                SearchTermGroup(label="Capitals", terms=("Kyiv", "Warsaw")),
+            ]
+        )
+
+    def test_rows_for_one_message_merge_into_one_mask(self):
+        rows = merge_message_rows(
+            [
+                make_row(1, "Capitals", "Warsaw", term_mask=0b100),
+                make_row(2, "Places", "Kiev", term_mask=0b010),
+                make_row(1, "Places", "Kyiv", term_mask=0b001),
+                make_row(2, "Places", "Kiev"),
+            ],
+            self.compiled,
+        )
+
+        self.assertEqual([row["message_id"] for row in rows], [1, 2])
+        self.assertEqual(rows[0]["term_mask"], 0b101)
+        self.assertEqual((rows[0]["search_group"], rows[0]["search_term"]), ("Places", "Kyiv"))
+        self.assertEqual(rows[1]["term_mask"], 0b010)
+
+    def test_mask_bits_past_the_compiled_terms_are_dropped(self):
+        rows = merge_message_rows(
+            [make_row(1, "Gone", "Lviv", term_mask=0b1000), make_row(2, "Places", "Kiev", term_mask=0b1010)],
+            self.compiled,
+        )
+
+        self.assertEqual([row["term_mask"] for row in rows], [0, 0b010])
+        self.assertEqual((rows[1]["search_group"], rows[1]["search_term"]), ("Places", "Kiev"))
+
+    def test_accumulator_merges_rows_added_by_separate_searches(self):
+        accumulator = ResultAccumulator()
+        groups = accumulator.groups(["Places", "Capitals"], masks=self.compiled.group_masks)
+
+        self.assertEqual(accumulator.merge_rows([make_row(1, "Capitals", "Warsaw", term_mask=0b100)], self.compiled), 0)
+        self.assertEqual(len(groups["Places"]), 0)
+        merged = accumulator.merge_rows(
+            [make_row(2, "Places", "Kiev", term_mask=0b010), make_row(1, "Places", "Kyiv", term_mask=0b001)],
+            self.compiled,
+        )
+
+        frame = accumulator.to_frame()
+        self.assertEqual((merged, accumulator.merged_rows), (1, 1))
+        self.assertEqual(frame["message_id"].tolist(), [1, 2])
+        self.assertEqual(frame["term_mask"].tolist(), [0b101, 0b010])
+        self.assertEqual(list(frame.loc[0, ["search_group", "search_term"]]), ["Places", "Kyiv"])
+        self.assertEqual(len(groups["Places"][0]), 2)
+        self.assertEqual([row["term_mask"] for row in accumulator.iter_rows()], [0b101, 0b010])
+
+    def test_groups_fan_out_by_mask_without_double_counting(self):
+        accumulator = ResultAccumulator()
+        accumulator.append_rows(
+            merge_message_rows(
+                [
+                    make_row(1, "Places", "Kyiv", term_mask=0b001),
+                    make_row(1, "Places", "Kiev", term_mask=0b010),
+                    make_row(2, "Capitals", "Warsaw", term_mask=0b100),
+                ],
+                self.compiled,
+            )
+        )
+
+        groups = accumulator.groups(["Places", "Capitals"], masks=self.compiled.group_masks)
+
+        self.assertEqual(len(accumulator), 2)
+        self.assertEqual(groups["Places"][0]["message_id"].tolist(), [1])
+        self.assertEqual(groups["Capitals"][0]["message_id"].tolist(), [1, 2])
+
+
+class ForwardTests(unittest.TestCase):
+    def test_rows_record_the_forwarded_channel_post(self):
+        channel = SimpleNamespace(channel_id=10, title="Channel")
+        forward = SimpleNamespace(
+            id=3,
+            date=datetime(2026, 1, 2, tzinfo=timezone.utc),
+            message="reposted",
+            fwd_from=SimpleNamespace(from_id=SimpleNamespace(channel_id=77), channel_post=5),
+        )
+        from_user = SimpleNamespace(
+            id=4,
+            date=datetime(2026, 1, 2, tzinfo=timezone.utc),
+            message="from a user",
+            fwd_from=SimpleNamespace(from_id=SimpleNamespace(user_id=1), channel_post=None),
+        )
+
+        row = build_result_row(forward, channel, "g", "t")
+
+        self.assertEqual((row["fwd_from_channel_id"], row["fwd_from_message_id"]), (77, 5))
+        self.assertEqual(message_origin(10, forward), (77, 5))
+        self.assertEqual(message_origin(10, from_user), (10, 4))
+
+    def test_originals_only_counts_each_post_once_at_its_first_appearance(self):
+        accumulator = ResultAccumulator()
+        accumulator.append_rows(
+            [
+                make_row(5, "g", "t", day=3, channel_id=77),
+                make_row(1, "g", "t", day=4, channel_id=10, fwd_from=(77, 5)),
+                make_row(8, "g", "t", day=2, channel_id=20, fwd_from=(77, 5)),
+                make_row(2, "g", "t", day=4, channel_id=10),
+            ]
+        )
+
+        self.assertEqual(len(accumulator.groups(["g"])["g"][0]), 4)
+        originals = accumulator.groups(["g"], originals_only=True)["g"][0]
+        self.assertEqual(list(zip(originals["channel_id"], originals["message_id"])), [(20, 8), (10, 2)])
+        self.assertTrue(resolve_originals_only({"TREND_ORIGINALS_ONLY": "yes"}))
+        self.assertFalse(resolve_originals_only({}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,529 @@
+import asyncio
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from telethon.errors import FloodWaitError
+
+from tg_keyword_trends.channels import ChannelTarget
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.metrics import RunMetrics
+from tg_keyword_trends.ratelimit import AdaptiveRateLimiter, RateBudget
+from tg_keyword_trends.search import (
+    DEFAULT_SEARCH_CONCURRENCY,
+    SEARCH_CONCURRENCY_KEY,
+    SEARCH_MODE_AUTO,
+    SEARCH_MODE_GLOBAL,
+    SEARCH_MODE_KEY,
+    SEARCH_MODE_LOCAL,
+    SEARCH_MODE_SERVER,
+    SEARCH_REQUESTS_PER_SECOND_KEY,
+    SearchBatch,
+    SearchSettings,
+    SearchStats,
+    build_search_units,
+    choose_global_search,
+    choose_search_mode,
+    iter_search_results,
+    plan_search_batches,
+    resolve_search_settings,
+    run_search_batch,
+    scan_channel_units,
+    search_unit_messages,
+)
+
+
+def make_channels(count):
+    return [ChannelTarget(title=f"Channel {index}", entity=f"entity-{index}", channel_id=index) for index in range(count)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+async def collect(async_iterable):
+    return [item async for item in async_iterable]
+
+
+class SearchUnitTests(unittest.TestCase):
+    def test_build_search_units_orders_by_channel_then_term(self):
+        groups = [
+            SearchTermGroup(label="Places", terms=("Kyiv", "Kiev")),
+            SearchTermGroup(label="single", terms=("single",)),
+        ]
+
+        units = build_search_units(make_channels(2), groups)
+
+        self.assertEqual([unit.index for unit in units], list(range(6)))
+        self.assertEqual([unit.search_term for unit in units[:3]], ["Kyiv", "Kiev", "single"])
+        self.assertEqual([unit.channel.channel_id for unit in units], [0, 0, 0, 1, 1, 1])
+        self.assertTrue(units[0].is_first_in_channel)
+        self.assertTrue(units[2].is_last_in_channel)
+        self.assertEqual(units[0].display_search, "Places / Kyiv")
+        self.assertEqual(units[2].display_search, "single")
+
+    def test_build_search_units_searches_shared_terms_once(self):
+        groups = [
+            SearchTermGroup(label="Places", terms=("Kyiv", "Kiev")),
+            SearchTermGroup(label="Capitals", terms=("KYIV", "Warsaw")),
+        ]
+
+        units = build_search_units(make_channels(2), groups)
+
+        self.assertEqual([unit.search_term for unit in units[:3]], ["Kyiv", "Kiev", "Warsaw"])
+        self.assertEqual(len(units), 6)
+        self.assertEqual(units[0].search_group.label, "Places")
+        self.assertEqual(units[0].term_mask, 0b001)
+        self.assertEqual(units[2].search_group.label, "Capitals")
+        self.assertEqual(units[0].display_search, "Places, Capitals / Kyiv")
+        self.assertTrue(units[2].is_last_in_channel)
+
+    def test_resolve_search_settings_reads_env_values(self):
+        settings = resolve_search_settings(
+            {SEARCH_CONCURRENCY_KEY: "8", SEARCH_REQUESTS_PER_SECOND_KEY: "2.5"}
+        )
+
+        self.assertEqual(settings.concurrency, 8)
+        self.assertEqual(settings.requests_per_second, 2.5)
+        self.assertEqual(resolve_search_settings({}).concurrency, DEFAULT_SEARCH_CONCURRENCY)
+
+        with self.assertRaises(ValueError):
+            resolve_search_settings({SEARCH_CONCURRENCY_KEY: "0"})
+
+    def test_search_unit_messages_filters_date_range(self):
+        messages = [
+            SimpleNamespace(id=3, date=datetime(2026, 1, 3, tzinfo=timezone.utc)),
+            SimpleNamespace(id=2, date=datetime(2026, 1, 2, tzinfo=timezone.utc)),
+            SimpleNamespace(id=1, date=datetime(2026, 1, 1, tzinfo=timezone.utc)),
+        ]
+
+        class Client:
+            async def iter_messages(self, entity, search=None, offset_date=None):
+                for message in messages:
+                    yield message
+
+        unit = build_search_units(make_channels(1), [SearchTermGroup(label="alpha", terms=("alpha",))])[0]
+        result = asyncio.run(
+            search_unit_messages(
+                Client(),
+                unit,
+                start_date=datetime(2026, 1, 2, tzinfo=timezone.utc),
+                end_date=datetime(2026, 1, 2, 23, tzinfo=timezone.utc),
+            )
+        )
+
+        self.assertEqual([message.id for message in result.messages], [2])
+
+    def test_search_unit_messages_bounds_dates_and_records_saved_pages(self):
+        messages = [
+            SimpleNamespace(id=message_id, date=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=message_id))
+            for message_id in range(400, 0, -1)
+        ]
+        calls = []
+
+        class MessagesIterator:
+            total = len(messages)
+
+            def __init__(self):
+                self.fetched = 0
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                if self.fetched >= len(messages):
+                    raise StopAsyncIteration
+                self.fetched += 1
+                return messages[self.fetched - 1]
+
+        class Client:
+            def iter_messages(self, entity, **kwargs):
+                calls.append(kwargs)
+                return MessagesIterator()
+
+        unit = build_search_units(make_channels(1), [SearchTermGroup(label="alpha", terms=("alpha",))])[0]
+        stats = SearchStats()
+        result = asyncio.run(
+            search_unit_messages(
+                Client(),
+                unit,
+                start_date=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=351),
+                end_date=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=390),
+                stats=stats,
+            )
+        )
+
+        self.assertEqual(len(result.messages), 40)
+        self.assertEqual(calls[0]["offset_date"], datetime(2026, 1, 17, 6, 0, 1, tzinfo=timezone.utc))
+        self.assertEqual(stats.messages_fetched, 51)
+        self.assertEqual(stats.messages_saved, 349)
+        self.assertEqual(stats.pages_fetched, 1)
+        self.assertEqual(stats.pages_saved, 4)
+        self.assertEqual(stats.stopped_early, 1)
+
+
+class LocalScanTests(unittest.TestCase):
+    def test_resolve_search_settings_validates_mode(self):
+        self.assertEqual(resolve_search_settings({}).mode, SEARCH_MODE_SERVER)
+        self.assertEqual(resolve_search_settings({SEARCH_MODE_KEY: "Auto"}).mode, SEARCH_MODE_AUTO)
+
+        with self.assertRaises(ValueError):
+            resolve_search_settings({SEARCH_MODE_KEY: "fast"})
+
+    def test_choose_search_mode_compares_history_pages_with_term_count(self):
+        self.assertEqual(choose_search_mode(60, 5_000), SEARCH_MODE_LOCAL)
+        self.assertEqual(choose_search_mode(2, 5_000), SEARCH_MODE_SERVER)
+        self.assertEqual(choose_search_mode(2, 5_000, local_scan_ratio=25), SEARCH_MODE_LOCAL)
+
+    def test_scan_channel_units_matches_all_terms_in_one_pass(self):
+        messages = [
+            SimpleNamespace(id=4, date=datetime(2026, 1, 4, tzinfo=timezone.utc), message="alpha and beta"),
+            SimpleNamespace(id=3, date=datetime(2026, 1, 3, tzinfo=timezone.utc), message=None),
+            SimpleNamespace(id=2, date=datetime(2026, 1, 2, tzinfo=timezone.utc), message="BETA"),
+            SimpleNamespace(id=1, date=datetime(2025, 12, 1, tzinfo=timezone.utc), message="alpha"),
+        ]
+        calls = []
+
+        class Client:
+            async def iter_messages(self, entity, **kwargs):
+                calls.append(kwargs)
+                for message in messages:
+                    yield message
+
+        units = build_search_units(make_channels(1), [SearchTermGroup(label="g", terms=("alpha", "beta"))])
+        results = asyncio.run(
+            scan_channel_units(
+                Client(),
+                units,
+                start_date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                end_date=datetime(2026, 1, 31, tzinfo=timezone.utc),
+            )
+        )
+
+        self.assertEqual([[message.id for message in result.messages] for result in results], [[4], [4, 2]])
+        self.assertEqual(calls, [{"offset_date": datetime(2026, 1, 31, 0, 0, 1, tzinfo=timezone.utc)}])
+
+    def test_plan_search_batches_scans_small_channels_locally_in_auto_mode(self):
+        class Client:
+            async def get_messages(self, entity, limit=None, offset_date=None):
+                newest_ids = {"entity-0": 150, "entity-1": 50_000}
+                return [SimpleNamespace(id=newest_ids[entity])]
+
+        units = build_search_units(make_channels(2), [SearchTermGroup(label="g", terms=("a", "b", "c"))])
+        settings = SearchSettings(mode=SEARCH_MODE_AUTO)
+
+        batches = asyncio.run(plan_search_batches(Client(), units, settings))
+
+        self.assertEqual([batch.mode for batch in batches], [SEARCH_MODE_LOCAL] + [SEARCH_MODE_SERVER] * 3)
+        self.assertEqual(len(batches[0].units), 3)
+        self.assertEqual([unit.index for batch in batches for unit in batch.units], list(range(6)))
+
+
+class GlobalSearchTests(unittest.TestCase):
+    def test_choose_global_search_compares_hit_pages_with_channel_count(self):
+        self.assertTrue(choose_global_search(50, 120))
+        self.assertFalse(choose_global_search(50, 9_000))
+        self.assertTrue(choose_global_search(50, 9_000, global_ratio=2))
+        self.assertFalse(choose_global_search(1, 0))
+
+    def test_plan_search_batches_uses_global_search_for_sparse_terms(self):
+        counts = {"sparse": 30, "dense": 50_000}
+        calls = []
+
+        class Client:
+            async def get_messages(self, entity, search=None, limit=None, offset_date=None):
+                calls.append((entity, search, limit))
+                return SimpleNamespace(total=counts[search])
+
+        units = build_search_units(make_channels(4), [SearchTermGroup(label="g", terms=("sparse", "dense"))])
+        settings = SearchSettings(mode=SEARCH_MODE_GLOBAL)
+
+        batches = asyncio.run(plan_search_batches(Client(), units, settings, joined_channel_ids={"0", "1", "2"}))
+
+        self.assertEqual(sorted(calls), [(None, "dense", 0), (None, "sparse", 0)])
+        self.assertEqual(batches[0].mode, SEARCH_MODE_GLOBAL)
+        self.assertEqual([unit.channel.channel_id for unit in batches[0].units], [0, 1, 2])
+        self.assertEqual({unit.search_term for unit in batches[0].units}, {"sparse"})
+        self.assertEqual([batch.mode for batch in batches[1:]], [SEARCH_MODE_SERVER] * 5)
+        self.assertEqual(
+            sorted(unit.index for batch in batches for unit in batch.units),
+            list(range(8)),
+        )
+
+    def test_global_batch_keeps_hits_from_selected_channels(self):
+        def message(message_id, channel_id, day):
+            return SimpleNamespace(
+                id=message_id,
+                peer_id=SimpleNamespace(channel_id=channel_id),
+                date=datetime(2026, 1, day, tzinfo=timezone.utc),
+            )
+
+        hits = [message(9, 1, 9), message(8, 99, 8), message(7, 0, 7), message(6, 1, 6), message(5, 0, 1)]
+        calls = []
+
+        class Client:
+            async def iter_messages(self, entity, **kwargs):
+                calls.append((entity, kwargs))
+                for hit in hits:
+                    yield hit
+
+        units = build_search_units(make_channels(2), [SearchTermGroup(label="g", terms=("alpha",))])
+        stats = SearchStats()
+        metrics = RunMetrics()
+        results = asyncio.run(
+            run_search_batch(
+                Client(),
+                SearchBatch(units=tuple(units), mode=SEARCH_MODE_GLOBAL),
+                start_date=datetime(2026, 1, 2, tzinfo=timezone.utc),
+                stats=stats,
+                metrics=metrics,
+            )
+        )
+
+        self.assertEqual(calls, [(None, {"search": "alpha"})])
+        self.assertEqual([[hit.id for hit in result.messages] for result in results], [[7], [9, 6]])
+        self.assertEqual({result.search_filter for result in results}, {SEARCH_MODE_GLOBAL})
+        self.assertEqual((stats.searches, stats.messages_fetched, stats.stopped_early), (1, 5, 1))
+        [unit_metrics] = metrics.units
+        self.assertEqual(
+            {key: unit_metrics[key] for key in ("channel_id", "channel_title", "search_terms", "mode", "matches")},
+            {"channel_id": None, "channel_title": "2 channels", "search_terms": ["alpha"], "mode": "global", "matches": 3},
+        )
+
+    def test_limiter_resumes_global_search_by_date_without_repeating_hits(self):
+        clock = FakeClock()
+        calls = []
+        day = datetime(2026, 1, 5, tzinfo=timezone.utc)
+        hits = [
+            SimpleNamespace(id=20, chat_id=1, date=day + timedelta(seconds=2)),
+            SimpleNamespace(id=30, chat_id=2, date=day + timedelta(seconds=1, microseconds=0)),
+            SimpleNamespace(id=10, chat_id=1, date=day + timedelta(seconds=1)),
+            SimpleNamespace(id=40, chat_id=3, date=day),
+        ]
+
+        class Client:
+            def iter_messages(self, entity, **kwargs):
+                calls.append(dict(kwargs))
+                return self._messages(kwargs.get("offset_date"))
+
+            async def _messages(self, offset_date):
+                for position, hit in enumerate(hits):
+                    if offset_date is not None and hit.date >= offset_date:
+                        continue
+                    if len(calls) == 1 and position == 2:
+                        raise FloodWaitError(request=None, capture=1)
+                    yield hit
+
+        async def scenario():
+            limiter = AdaptiveRateLimiter(100, clock=clock, sleep=clock.sleep)
+            return [hit.id async for hit in limiter.iter_messages(Client(), None, search="x")]
+
+        self.assertEqual(asyncio.run(scenario()), [20, 30, 10, 40])
+        self.assertEqual(calls[1]["offset_date"], day + timedelta(seconds=2))
+        self.assertNotIn("offset_id", calls[1])
+
+
+class SearchSchedulerTests(unittest.TestCase):
+    def test_iter_search_results_limits_concurrency_and_preserves_order(self):
+        units = build_search_units(make_channels(3), [SearchTermGroup(label="t", terms=("a", "b", "c"))])
+        active = 0
+        max_active = 0
+
+        async def search(unit):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.001 * ((len(units) - unit.index) % 4))
+            active -= 1
+            return unit.index
+
+        results = asyncio.run(collect(iter_search_results(units, search, max_concurrency=3)))
+
+        self.assertEqual(results, list(range(len(units))))
+        self.assertLessEqual(max_active, 3)
+        self.assertGreater(max_active, 1)
+
+    def test_iter_search_results_reraises_failures(self):
+        units = build_search_units(make_channels(2), [SearchTermGroup(label="t", terms=("a",))])
+
+        async def search(unit):
+            if unit.index == 1:
+                raise RuntimeError("boom")
+            return unit.index
+
+        with self.assertRaisesRegex(RuntimeError, "boom"):
+            asyncio.run(collect(iter_search_results(units, search, max_concurrency=2)))
+
+    def test_iter_search_results_stops_running_ahead_of_a_stalled_unit(self):
+        units = build_search_units(make_channels(20), [SearchTermGroup(label="t", terms=("a",))])
+        started = []
+
+        async def search(unit):
+            started.append(unit.index)
+            if unit.index == 0:
+                await asyncio.sleep(0.05)
+            return unit.index
+
+        async def scenario():
+            results = iter_search_results(units, search, max_concurrency=2, max_ahead=5)
+            first = await anext(results)
+            started_while_stalled = len(started)
+            rest = [result async for result in results]
+            return first, started_while_stalled, rest
+
+        first, started_while_stalled, rest = asyncio.run(scenario())
+
+        self.assertEqual([first, *rest], list(range(20)))
+        self.assertEqual(started_while_stalled, 5)
+
+    def test_iter_search_results_rejects_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(collect(iter_search_results([], None, max_concurrency=0)))
+
+
+class RateBudgetTests(unittest.TestCase):
+    def test_rate_budget_waits_without_blocking_when_tokens_run_out(self):
+        clock = FakeClock()
+
+        async def scenario():
+            budget = RateBudget(2, capacity=1, clock=clock, sleep=clock.sleep)
+            for _ in range(3):
+                await budget.acquire()
+            return budget
+
+        budget = asyncio.run(scenario())
+
+        self.assertEqual(clock.sleeps, [0.5, 0.5])
+        self.assertAlmostEqual(budget.waited_seconds, 1.0)
+
+    def test_rate_budget_rejects_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            RateBudget(0)
+
+
+class AdaptiveRateLimiterTests(unittest.TestCase):
+    def test_call_retries_after_flood_wait_and_lowers_rate(self):
+        clock = FakeClock()
+        attempts = []
+
+        async def request(value):
+            attempts.append(clock.now)
+            if len(attempts) == 1:
+                raise FloodWaitError(request=None, capture=30)
+            return value
+
+        async def scenario():
+            limiter = AdaptiveRateLimiter(2, max_rate=4, clock=clock, sleep=clock.sleep)
+            result = await limiter.call(request, "ok")
+            return limiter, result
+
+        limiter, result = asyncio.run(scenario())
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(limiter.api_calls, 2)
+        self.assertEqual(limiter.flood_waits, 1)
+        self.assertAlmostEqual(limiter.flood_wait_seconds, 30)
+        self.assertGreaterEqual(attempts[1], 30)
+        self.assertAlmostEqual(limiter.rate, 1 + limiter.increase_step)
+
+    def test_call_raises_after_max_retries(self):
+        clock = FakeClock()
+
+        async def request():
+            raise FloodWaitError(request=None, capture=1)
+
+        async def scenario():
+            limiter = AdaptiveRateLimiter(1, max_retries=2, clock=clock, sleep=clock.sleep)
+            await limiter.call(request)
+
+        with self.assertRaises(FloodWaitError):
+            asyncio.run(scenario())
+
+    def test_success_raises_rate_up_to_max_rate(self):
+        limiter = AdaptiveRateLimiter(1, max_rate=1.05, increase_step=0.02)
+
+        for _ in range(5):
+            limiter.record_success()
+
+        self.assertEqual(limiter.rate, 1.05)
+
+    def test_iter_messages_takes_token_per_page_and_resumes_after_flood_wait(self):
+        clock = FakeClock()
+        calls = []
+
+        class Client:
+            def iter_messages(self, entity, **kwargs):
+                calls.append(dict(kwargs))
+                return self._messages(kwargs.get("offset_id"))
+
+            async def _messages(self, offset_id):
+                for message_id in range(5, 0, -1):
+                    if offset_id is not None and message_id >= offset_id:
+                        continue
+                    if len(calls) == 1 and message_id == 2:
+                        raise FloodWaitError(request=None, capture=3)
+                    yield SimpleNamespace(id=message_id)
+
+        async def scenario():
+            limiter = AdaptiveRateLimiter(100, clock=clock, sleep=clock.sleep)
+            messages = [message.id async for message in limiter.iter_messages(Client(), "entity", page_size=2, search="x")]
+            return limiter, messages
+
+        limiter, messages = asyncio.run(scenario())
+
+        self.assertEqual(messages, [5, 4, 3, 2, 1])
+        self.assertEqual(calls[1]["offset_id"], 3)
+        self.assertEqual(calls[0]["wait_time"], 0)
+        self.assertEqual(limiter.flood_waits, 1)
+        self.assertEqual(limiter.api_calls, 4)
+
+    def test_iter_messages_only_gives_up_after_consecutive_flood_waits(self):
+        clock = FakeClock()
+        calls = []
+
+        class Client:
+            def iter_messages(self, entity, **kwargs):
+                calls.append(dict(kwargs))
+                return self._messages(kwargs.get("offset_id"))
+
+            async def _messages(self, offset_id):
+                # Every request after the first fetches one full page and then hits a FloodWait.
+                fetched = 0
+                for message_id in range(8, 0, -1):
+                    if offset_id is not None and message_id >= offset_id:
+                        continue
+                    if fetched == 2:
+                        raise FloodWaitError(request=None, capture=1)
+                    fetched += 1
+                    yield SimpleNamespace(id=message_id)
+
+        async def scenario():
+            limiter = AdaptiveRateLimiter(100, max_retries=1, clock=clock, sleep=clock.sleep)
+            messages = [message.id async for message in limiter.iter_messages(Client(), "entity", page_size=2)]
+            return limiter, messages
+
+        limiter, messages = asyncio.run(scenario())
+
+        self.assertEqual(messages, [8, 7, 6, 5, 4, 3, 2, 1])
+        self.assertEqual(limiter.flood_waits, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
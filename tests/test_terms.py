@@ -0,0 +1,38 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.terms import compile_search_terms
+
+
+class CompileSearchTermsTests(unittest.TestCase):
+    def test_repeated_terms_are_compiled_once_with_every_group(self):
+        compiled = compile_search_terms(
+            [
+                SearchTermGroup(label="Places", terms=("Kyiv", "Kiev")),
+                SearchTermGroup(label="Capitals", terms=("kyiv ", "Warsaw")),
+                SearchTermGroup(label="Kiev", terms=("KIEV",)),
+            ]
+        )
+
+        self.assertEqual([term.search_term for term in compiled.terms], ["Kyiv", "Kiev", "Warsaw"])
+        self.assertEqual(compiled.terms[0].group_labels, ("Places", "Capitals"))
+        self.assertEqual(compiled.terms[1].group_labels, ("Places", "Kiev"))
+        self.assertEqual(compiled.group_masks, {"Places": 0b011, "Capitals": 0b101, "Kiev": 0b010})
+        self.assertEqual(compiled.mask_for("  KYIV"), 0b001)
+        self.assertEqual(compiled.mask_for("Lviv"), 0)
+        self.assertEqual(compiled.groups_for_mask(0b100), ["Capitals"])
+        self.assertEqual(compiled.terms_for_mask(0b110), ["Kiev", "Warsaw"])
+        self.assertIs(compiled.term_for("kiev"), compiled.term_for("Kiev"))
+        self.assertIs(compiled._by_key, compiled._by_key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from tg_keyword_trends.distributed import (
+    RUN_INPUTS_QUEUE_KEY,
+    _renew_lease,
+    build_queue_jobs,
+    merge_queue_results,
+    search_queue_job,
+)
+from tg_keyword_trends.inputs import SearchTermGroup
+from tg_keyword_trends.journal import RunInputs
+from tg_keyword_trends.workqueue import WorkQueue, resolve_work_queue_settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_row(message_id, search_group="Places"):
+    return {
+        "time": datetime(2026, 1, 2, tzinfo=timezone.utc),
+        "message": "hello",
+        "message_id": message_id,
+        "channel_id": 10,
+        "channel_title": "Channel",
+        "search_group": search_group,
+        "search_term": "Kyiv",
+        "link": f"https://t.me/c/10/{message_id}",
+    }
+
+
+class WorkQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.queue = WorkQueue(Path(self.temp_dir.name) / "queue.sqlite", lease_seconds=60, max_attempts=2, clock=self.clock)
+
+    def tearDown(self):
+        self.queue.close()
+        self.temp_dir.cleanup()
+
+    def test_publish_ignores_keys_that_are_already_queued(self):
+        self.assertEqual(self.queue.publish([("a", {"n": 1}), ("b", {"n": 2})]), 2)
+        self.assertEqual(self.queue.publish([("a", {"n": 1}), ("c", {"n": 3})]), 1)
+        self.assertEqual(self.queue.counts()["pending"], 3)
+
+    def test_leases_are_exclusive_until_they_expire(self):
+        self.queue.publish([("a", {"n": 1})])
+
+        item = self.queue.lease("worker-1")
+        self.assertEqual(item.payload, {"n": 1})
+        self.assertIsNone(self.queue.lease("worker-2"))
+        self.assertTrue(self.queue.has_open_jobs())
+
+        self.clock.now += 61
+        retry = self.queue.lease("worker-2")
+        self.assertEqual(retry.id, item.id)
+        self.assertEqual(retry.attempts, 2)
+        self.assertFalse(self.queue.heartbeat(item))
+        self.assertFalse(self.queue.complete(item, [make_row(1)]))
+        self.assertTrue(self.queue.complete(retry, [make_row(1)]))
+        self.assertEqual(self.queue.counts()["done"], 1)
+        self.assertFalse(self.queue.has_open_jobs())
+
+    def test_heartbeat_extends_the_lease(self):
+        self.queue.publish([("a", {"n": 1})])
+        item = self.queue.lease("worker-1")
+
+        self.clock.now += 50
+        self.assertTrue(self.queue.heartbeat(item))
+        self.clock.now += 50
+        self.assertIsNone(self.queue.lease("worker-2"))
+
+    def test_failed_units_are_retried_up_to_max_attempts(self):
+        self.queue.publish([("a", {"n": 1})])
+
+        self.queue.fail(self.queue.lease("worker-1"), "FloodWait")
+        self.assertEqual(self.queue.counts()["pending"], 1)
+        self.queue.fail(self.queue.lease("worker-1"), "FloodWait")
+
+        self.assertEqual(self.queue.counts()["failed"], 1)
+        self.assertIsNone(self.queue.lease("worker-1"))
+        self.assertFalse(self.queue.has_open_jobs())
+
+    def test_done_shards_are_read_back_in_publishing_order(self):
+        self.queue.publish([("a", {"n": 1}), ("b", {"n": 2})])
+        first = self.queue.lease("worker-1")
+        second = self.queue.lease("worker-2")
+        self.queue.complete(second, [make_row(2)])
+        self.queue.complete(first, [make_row(1)])
+
+        shards = list(self.queue.iter_done_shards())
+
+        self.assertEqual([payload["n"] for payload, _ in shards], [1, 2])
+        self.assertEqual(shards[0][1][0]["time"], "2026-01-02T00:00:00+00:00")
+
+    def test_resolve_settings(self):
+        self.assertEqual(
+            resolve_work_queue_settings({"WORK_QUEUE_LEASE_SECONDS": "30", "WORK_QUEUE_MAX_ATTEMPTS": "5"}),
+            (30, 5),
+        )
+        self.assertEqual(resolve_work_queue_settings({}), (600, 3))
+
+
+class DistributedRunTests(unittest.TestCase):
+    def test_build_queue_jobs_makes_one_unit_per_channel_and_term(self):
+        channels = [SimpleNamespace(title="A", channel_id=1), SimpleNamespace(title="B", channel_id=2)]
+        groups = [
+            SearchTermGroup(label="Places", terms=("Kyiv", "Odesa")),
+            SearchTermGroup(label="Ports", terms=("odesa",)),
+        ]
+
+        jobs = build_queue_jobs(channels, groups, datetime(2026, 1, 1, tzinfo=timezone.utc), None)
+
+        self.assertEqual(len(jobs), 4)
+        self.assertEqual(jobs[1][0], "1|odesa|2026-01-01T00:00:00+00:00|None")
+        self.assertEqual(
+            {key: jobs[1][1][key] for key in ("search_group", "search_term", "term_mask")},
+            {"search_group": "Places", "search_term": "Odesa", "term_mask": 2},
+        )
+        self.assertEqual(jobs[3][1]["channel"], {"title": "B", "channel_id": 2})
+
+    def test_search_queue_job_searches_its_term_once_with_the_term_mask(self):
+        searches = []
+        message = SimpleNamespace(
+            id=5, date=datetime(2026, 1, 2, tzinfo=timezone.utc), message="Odesa port", fwd_from=None
+        )
+
+        class Client:
+            async def iter_messages(self, entity, search=None, **kwargs):
+                searches.append(search)
+                yield message
+
+        channel = SimpleNamespace(title="A", entity="entity", channel_id=1)
+        shard = SimpleNamespace(client=Client(), rate_limiter=None, dialog_targets={"1": channel})
+        groups = [SearchTermGroup(label="Places", terms=("Kyiv", "Odesa")), SearchTermGroup(label="Ports", terms=("odesa",))]
+        _, payload = build_queue_jobs([channel], groups)[1]
+
+        rows = asyncio.run(search_queue_job(shard, payload))
+
+        self.assertEqual(searches, ["Odesa"])
+        self.assertEqual(
+            [(row["message_id"], row["search_group"], row["search_term"], row["term_mask"]) for row in rows],
+            [(5, "Places", "Odesa", 2)],
+        )
+
+    def test_lease_renewal_retries_after_queue_errors(self):
+        outcomes = [sqlite3.OperationalError("database is locked"), True, False]
+        sleeps = []
+
+        class Queue:
+            lease_seconds = 30
+
+            def heartbeat(self, item):
+                outcome = outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        with mock.patch("tg_keyword_trends.distributed.asyncio.sleep", fake_sleep), mock.patch(
+            "tg_keyword_trends.distributed.printC"
+        ):
+            asyncio.run(_renew_lease(Queue(), object()))
+
+        self.assertEqual(outcomes, [])
+        self.assertEqual(sleeps, [10, 10, 10])
+
+    def test_merge_builds_the_usual_outputs_from_finished_shards(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            queue_path = Path(temp_dir) / "queue.sqlite"
+            groups = [SearchTermGroup(label="Places", terms=("Kyiv",)), SearchTermGroup(label="Odesa", terms=("Odesa",))]
+            queue = WorkQueue(queue_path)
+            queue.set_run_value(
+                RUN_INPUTS_QUEUE_KEY,
+                RunInputs(
+                    now="20260102_030405",
+                    search_terms_file="terms.txt",
+                    search_terms_sha256="",
+                    search_term_groups=groups,
+                    channels=[{"title": "Channel", "channel_id": 10}],
+                    start_date=None,
+                    end_date=None,
+                ).to_record(),
+            )
+            queue.publish(build_queue_jobs([SimpleNamespace(title="Channel", channel_id=10)], groups))
+            queue.complete(queue.lease("worker-1"), [make_row(1), make_row(2)])
+            queue.complete(queue.lease("worker-1"), [make_row(3, search_group="Odesa")])
+            queue.close()
+
+            calls = []
+            output_folder = merge_queue_results(
+                queue_path,
+                lambda *args: calls.append(args),
+                output_folder=str(Path(temp_dir) / "out"),
+            )
+
+            all_results, dataframes_dict, channels, _, _, now, export_paths, rows_written = calls[0]
+            self.assertEqual(output_folder, Path(temp_dir) / "out")
+            self.assertEqual(now, "20260102_030405")
+            self.assertEqual(rows_written, 3)
+            self.assertEqual(all_results["message_id"].tolist(), [1, 2, 3])
+            self.assertIsInstance(all_results["time"][0], datetime)
+            self.assertEqual(len(dataframes_dict["Odesa"][0]), 1)
+            self.assertEqual(channels[0].title, "Channel")
+            self.assertEqual(len(export_paths["csv"].read_text(encoding="utf-8").splitlines()), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()